@@ -0,0 +1,394 @@
+"""
+Gemini based coding agent: client, tool dispatch and the tool loop
+Reads GEMINI_API_KEY, runs tool loop, returns final response. main.py is the CLI in front of it.
+"""
+
+import os
+import copy  
+import json
+import time
+import config
+import tool_registry
+import tool_executor
+import read_cache
+import output_capture
+import rate_limit
+import response_cache
+import tracing
+import workspace
+import result_budget
+import sessions
+
+from dotenv import load_dotenv
+from google import genai
+from google.genai import types
+from prompts import system_prompt
+from history import ConversationHistory
+from collections.abc import Iterator
+from typing import Any, NamedTuple
+
+my_funcs = tool_registry.dispatch()
+
+def build_client(cache_mode: str = config.RESPONSE_CACHE_MODE) -> genai.Client:
+    '''
+    requires env variable GEMINI_API_KEY (except in replay mode)
+    Returns a client that can make Gemini calls, rate limited and retried through rate_limit.SCHEDULER
+    and, unless cache_mode is "off", recorded to / replayed from the response cache
+    Raises: Runtime Error if API Key not found
+    '''
+
+    # Replay never touches the network, so it doesn't need a key
+    if cache_mode == "replay":
+        return response_cache.CachingClient(None, mode="replay")
+
+    load_dotenv()
+    api_key = os.environ.get(config.API_KEY_LOCATION)
+    if api_key is None:
+        raise RuntimeError("-- API Key Not Found --")
+
+    client = rate_limit.RateLimitedClient(genai.Client(api_key=api_key))
+    if cache_mode == "record":
+        client = response_cache.CachingClient(client, mode="record")
+    return client
+
+
+
+def call_function(function_call_part: Any, verbose: bool =False, working_directory: str = config.WORKING_DIR,
+                  quiet: bool = False) -> types.Content:
+    '''
+    Function that takes an instruction from LLM and will execute it
+    Constraint: We do not trust the model to detemrine working directory, so we inject it.
+    
+    :param function_call_part: Parts of the funciton call returned from Gemini
+    :param verbose: Boolean - Determines if extra output is needed
+    :param working_directory: Sandbox root injected into the tool, defaults to config.WORKING_DIR
+    :param quiet: Boolean - Suppresses the per-call console line (batch runs)
+    '''
+    function_name = function_call_part.name
+    function_args = copy.deepcopy(function_call_part.args) or {}
+
+
+    # This will return a response that basically says LLM gave me something it was not supoposed to
+    if function_name not in my_funcs:
+        return types.Content(
+            role="tool",
+            parts=[
+                types.Part.from_function_response(
+                name=function_name,
+                response={"error": f"Unknown function: {function_name}"},
+                )
+            ],
+        )
+
+    # Inject sandboxed working directory before executing tool
+    func_to_run = my_funcs[function_name]
+    bytes_in = len(json.dumps(function_args, default=str))
+    function_args['working_directory'] = working_directory
+    with tracing.TRACER.span("tool", function_name, bytes_in=bytes_in) as span:
+        # A copy-on-write workspace brings in what this call touches before the tool looks
+        workspace.prepare(working_directory, function_name, function_args)
+        raw_result = func_to_run(**function_args)
+        # Compact encoding first, then the tool's token budget
+        function_result = result_budget.BUDGET.fit(function_name, raw_result)
+        span["bytes_out"] = len(str(function_result).encode("utf-8", errors="replace"))
+        span["bytes_raw"] = len(str(raw_result).encode("utf-8", errors="replace"))
+
+
+    if verbose:
+        print(f"Calling function: {function_call_part.name}({function_call_part.args})")
+        if function_result != raw_result:
+            before, after = result_budget.estimate_tokens(raw_result), result_budget.estimate_tokens(function_result)
+            print(f"  result: {span['bytes_raw']} -> {span['bytes_out']} bytes, ~{before} -> ~{after} tokens")
+    elif not quiet:
+        print(f" - Calling function: {function_call_part.name}") 
+
+    # Return the response in a way I can give it back to the LLM 
+    return types.Content(
+        role="tool",
+        parts=[
+            types.Part.from_function_response(
+                name=function_name,
+                response={"result": function_result},
+            )
+        ],
+    )
+
+
+class Turn(NamedTuple):
+    contents: list[types.Content]
+    function_results: list[types.Content]
+    text: str | None
+    usage_metadata: Any
+
+
+def blocking_turn(client: genai.Client, messages: list[types.Content], llm_config: types.GenerateContentConfig,
+                  verbose: bool = False, working_directory: str = config.WORKING_DIR) -> Turn:
+    '''
+    One model call that waits for the full response, then runs any function calls it asked for
+    Returns: Turn with the candidates, tool results (in call order), final text and usage metadata
+    '''
+    with tracing.TRACER.span("model", config.MODEL, messages=len(messages)):
+        response = client.models.generate_content(
+            model=config.MODEL, 
+            contents=messages,
+            config=llm_config,
+        )
+        tracing.usage(response.usage_metadata)
+
+    results = []
+    text = None
+    if response.function_calls:
+        # Independent calls run concurrently, results still come back in the order the model asked for them
+        results = tool_executor.run_calls(
+            response.function_calls,
+            lambda part: call_function(part, verbose=verbose, working_directory=working_directory),
+        )
+    else:
+        text = response.text
+
+    contents = [candidate.content for candidate in response.candidates or []]
+    return Turn(contents, results, text, response.usage_metadata)
+
+
+def stream_turn(client: genai.Client, messages: list[types.Content], llm_config: types.GenerateContentConfig,
+                verbose: bool = False, working_directory: str = config.WORKING_DIR) -> Turn:
+    '''
+    One streamed model call. Text is printed as it arrives and each function call is dispatched as soon as
+    its part is complete, so tools run while the model is still generating.
+    Returns: Turn with the merged model message, tool results (in call order), text and usage metadata
+    '''
+    start = time.perf_counter()
+    first_token = first_tool = None
+    parts: list[types.Part] = []
+    text_chunks: list[str] = []
+    metadata = None
+    futures = []
+    open_line = False
+
+    workers = config.MAX_TOOL_WORKERS if config.PARALLEL_TOOL_CALLS else 1
+    run = lambda part: call_function(part, verbose=verbose, working_directory=working_directory)
+    with tool_executor.ToolCallScheduler(run, max_workers=workers) as scheduler:
+        with tracing.TRACER.span("model", config.MODEL, messages=len(messages), stream=True) as span:
+            for chunk in client.models.generate_content_stream(
+                model=config.MODEL,
+                contents=messages,
+                config=llm_config,
+            ):
+                if chunk.usage_metadata is not None:
+                    metadata = chunk.usage_metadata
+                if not chunk.candidates or chunk.candidates[0].content is None:
+                    continue
+
+                for part in chunk.candidates[0].content.parts or []:
+                    if first_token is None:
+                        first_token = time.perf_counter() - start
+                    if part.function_call:
+                        if first_tool is None:
+                            first_tool = time.perf_counter() - start
+                        if open_line:
+                            print()
+                            open_line = False
+                        futures.append(scheduler.submit(part.function_call))
+                    elif part.text and not part.thought:
+                        text_chunks.append(part.text)
+                        print(part.text, end="", flush=True)
+                        open_line = not part.text.endswith("\n")
+                    _merge_part(parts, part)
+            tracing.usage(metadata)
+            if first_token is not None:
+                span["ttft_ms"] = round(first_token * 1000, 3)
+
+    if open_line:
+        print()
+
+    if verbose:
+        ttft = "n/a" if first_token is None else f"{first_token * 1000:.0f}ms"
+        ttftool = "n/a" if first_tool is None else f"{first_tool * 1000:.0f}ms"
+        print(f"Time to first token: {ttft}, time to first tool: {ttftool}, total: {(time.perf_counter() - start) * 1000:.0f}ms")
+
+    contents = [types.Content(role="model", parts=parts)] if parts else []
+    text = "".join(text_chunks) or None
+    return Turn(contents, [f.result() for f in futures], text, metadata)
+
+
+def _merge_part(parts: list[types.Part], part: types.Part) -> None:
+    # Streamed text arrives in many small parts, history only needs one per run of text
+    previous = parts[-1] if parts else None
+    if (
+        previous is not None
+        and part.text is not None and previous.text is not None
+        and part.thought == previous.thought
+    ):
+        parts[-1] = previous.model_copy(update={"text": previous.text + part.text})
+    else:
+        parts.append(part)
+
+
+def build_llm_config() -> types.GenerateContentConfig:
+    '''
+    Returns the generation config shared by every model call: tool declarations plus the system prompt
+    '''
+    available_functions = types.Tool(
+    function_declarations=tool_registry.declarations(),
+    )
+
+    return types.GenerateContentConfig(
+        tools=[available_functions], system_instruction=system_prompt)
+
+
+def fit_turn_results(parts: list[types.Part]) -> list[types.Part]:
+    '''
+    Returns: parts with the largest tool results cut down until all of them fit config.TURN_RESULT_TOKENS
+    '''
+    results = [(part.function_response.name, part.function_response.response.get("result")) for part in parts]
+    texts = [(name, result) for name, result in results if isinstance(result, str)]
+    fitted = iter(result_budget.BUDGET.fit_turn(texts))
+    out = []
+    for part, (_, result) in zip(parts, results):
+        if not isinstance(result, str):
+            out.append(part)
+            continue
+        text = next(fitted)
+        if text is result:
+            out.append(part)
+            continue
+        response = part.function_response.model_copy(update={"response": {**part.function_response.response, "result": text}})
+        out.append(part.model_copy(update={"function_response": response}))
+    return out
+
+
+def record_turn(history: ConversationHistory, turn: Turn, verbose: bool = False) -> bool:
+    '''
+    Adds a finished turn (model output plus tool results) to the history
+    Returns: True if tools ran and the loop should call the model again, False once the model is done
+    Raises: RuntimeError if the API call returned no usage metadata
+    '''
+    metadata = turn.usage_metadata
+
+    if metadata is None:
+        raise RuntimeError ("--Failed API Call --")
+
+    prompt_tokens = metadata.prompt_token_count
+    response_tokens = metadata.candidates_token_count
+    history.observe(prompt_tokens)
+
+    # Append candidates prior to function calls in case there are multiple reponses that may come back         
+    for content in turn.contents:
+        history.append(content)
+
+    if verbose:
+        print(f"Prompt tokens: {prompt_tokens}")
+        print(f"Response tokens: {response_tokens}")
+
+    if not turn.function_results:
+        return False
+
+    response_list = []
+    for function_call_result in turn.function_results:
+
+        if not function_call_result.parts[0].function_response.response:
+            raise Exception ("ERROR: FATAL EXCEPTION - Something went wrong")
+        
+        response_list.append(function_call_result.parts[0])
+
+    # Each result already fits its tool's budget, together they also have to fit the turn's
+    response_list = fit_turn_results(response_list)
+    if verbose:
+        for part in response_list:
+            print(f"-> {part.function_response.response}")
+    
+    history.append(types.Content(role="user", parts=response_list))
+
+    saved = history.compact()
+    if verbose and saved:
+        print(f"History compacted: saved ~{saved} tokens this turn, ~{history.tokens_saved} total")
+    return True
+
+
+def run_loop(client: genai.Client, history: ConversationHistory, llm_config: types.GenerateContentConfig,
+             stream: bool = False, verbose: bool = False, working_directory: str = config.WORKING_DIR) -> Iterator[Turn]:
+    '''
+    The tool loop: calls the model with the history, runs the tools it asks for and records both, until the
+    model answers without tool calls or config.MAX_ITERATIONS is reached
+    Returns: Each turn once it has been recorded (the last one holds the answer, unless the limit was hit)
+
+    :param client: Client from build_client (or any stand-in with the same models API)
+    :param history: Conversation so far, grows as the loop runs
+    :param llm_config: From build_llm_config
+    :param stream: If set, turns are streamed and tools start before the model finishes
+    :param verbose: If set will put extra output to the console
+    :param working_directory: Sandbox root injected into every tool call
+    '''
+    run_turn = stream_turn if stream else blocking_turn
+    for _ in range (config.MAX_ITERATIONS):
+
+        # History carries every prior turn, compacted so stale tool output doesn't get resent forever
+        turn = run_turn(client, history.messages, llm_config, verbose=verbose, working_directory=working_directory)
+        more = record_turn(history, turn, verbose=verbose)
+        yield turn
+        if not more:
+            return
+
+
+def run(prompt: str, verbose: bool = False, stream: bool = config.STREAM_RESPONSES,
+        cache_mode: str = config.RESPONSE_CACHE_MODE, trace: str | None = config.TRACE_FILE,
+        session: str | None = None, client: Any = None) -> str | None:
+    '''
+    Run will send the user prompt to Gemini and complete actions based on LLM response
+    Constraint: LLM will run no more than config.MAX_ITERATIONS times.
+    Returns: The model's final answer, or None if it never gave one
+
+    :param prompt: What we want the LLM to do
+    :param verbose: If set will put extra output to the console
+    :param stream: If set, responses are streamed and tools start before the model finishes its turn
+    :param cache_mode: Response cache mode, one of response_cache.MODES
+    :param trace: If set, per-call spans are written to this JSONL file
+    :param session: If set, the conversation continues from (and is saved back to) this session id; "" starts
+        a new session with a fresh id
+    :param client: Client to use instead of building one (the agent server keeps one warm)
+    '''
+    if client is None:
+        client = build_client(cache_mode)
+    if session == "":
+        session = sessions.new_id()
+    history = sessions.load(session) if session else ConversationHistory()
+    history.append(types.Content(role="user", parts=[types.Part(text=prompt)]))
+
+    llm_config = build_llm_config()
+    
+    if verbose:
+        print(f"User prompt: {prompt}")
+        output_capture.set_live(True)
+
+    if trace:
+        tracing.TRACER.start(trace)
+
+    turn = None
+    try:
+        for turn in run_loop(client, history, llm_config, stream=stream, verbose=verbose):
+            pass
+    finally:
+        # Whatever happened, the session keeps what was done
+        if session:
+            sessions.save(session, history)
+
+    text = turn.text if turn is not None and not turn.function_results else None
+    # Streamed text has already been printed as it arrived
+    if text and not stream:
+        print (text)
+
+    if verbose:
+        print(read_cache.CACHE.stats())
+        print(rate_limit.SCHEDULER.stats())
+        print(result_budget.BUDGET.stats())
+        if isinstance(client, response_cache.CachingClient):
+            print(client.store.stats())
+        print(f"Tools imported: {', '.join(tool_registry.TOOLS.loaded()) or 'none'}")
+
+    if trace:
+        tracing.TRACER.close()
+        print(tracing.TRACER.summary())
+
+    if session:
+        print(f"Session: {session} (continue it with --session {session})")
+    return text
@@ -0,0 +1,203 @@
+"""
+Batch entry point: runs many agent tasks concurrently in one process on the async Gemini client.
+Reads prompts from a JSONL file, gives every task its own copy-on-write workspace over the working directory,
+and writes one JSONL result line per task (final text, tokens, timings, changed files) as tasks finish.
+"""
+
+import argparse
+import asyncio
+import json
+import shutil
+import sys
+import time
+from pathlib import Path
+from typing import Any, TextIO
+
+from google import genai
+from google.genai import types
+
+import config
+import output_capture
+import response_cache
+import tool_executor
+import tracing
+import workspace
+from agent import Turn, build_client, build_llm_config, call_function, record_turn
+from history import ConversationHistory
+
+
+async def async_turn(client: genai.Client, messages: list[types.Content], llm_config: types.GenerateContentConfig,
+                     working_directory: str) -> Turn:
+    '''
+    One model call on the async client, with the requested tools run on a worker thread
+    Returns: Turn with the candidates, tool results (in call order), final text and usage metadata
+    '''
+    with tracing.TRACER.span("model", config.MODEL, messages=len(messages)):
+        response = await client.aio.models.generate_content(
+            model=config.MODEL,
+            contents=messages,
+            config=llm_config,
+        )
+        tracing.usage(response.usage_metadata)
+
+    results = []
+    text = None
+    if response.function_calls:
+        run = lambda part: call_function(part, working_directory=working_directory, quiet=True)
+        results = await asyncio.to_thread(tool_executor.run_calls, response.function_calls, run)
+    else:
+        text = response.text
+
+    contents = [candidate.content for candidate in response.candidates or []]
+    return Turn(contents, results, text, response.usage_metadata)
+
+
+async def run_agent_async(client: genai.Client, prompt: str, working_directory: str,
+                          llm_config: types.GenerateContentConfig | None = None) -> dict[str, Any]:
+    '''
+    Runs the agent loop for one prompt without blocking the event loop
+    Returns: Dict with the final text, iteration count and token totals
+
+    :param client: Gemini client, its .aio side is used
+    :param prompt: The user prompt
+    :param working_directory: Sandbox root for this task's tools
+    :param llm_config: Shared generation config, built on demand if omitted
+    '''
+    llm_config = llm_config or build_llm_config()
+    history = ConversationHistory()
+    history.append(types.Content(role="user", parts=[types.Part(text=prompt)]))
+
+    result: dict[str, Any] = {"result": None, "iterations": 0, "prompt_tokens": 0, "response_tokens": 0}
+    for _ in range(config.MAX_ITERATIONS):
+        turn = await async_turn(client, history.messages, llm_config, working_directory)
+        result["iterations"] += 1
+        if turn.usage_metadata is not None:
+            result["prompt_tokens"] += turn.usage_metadata.prompt_token_count or 0
+            result["response_tokens"] += turn.usage_metadata.candidates_token_count or 0
+
+        if not record_turn(history, turn):
+            result["result"] = turn.text
+            break
+
+    result["tokens_saved"] = history.tokens_saved
+    return result
+
+
+def read_tasks(path: str) -> list[dict[str, Any]]:
+    '''
+    Loads tasks from a JSONL file, one {"prompt": ..., "id": optional} object per line
+    Returns: List of tasks, each with an id (line number when not given)
+    '''
+    tasks = []
+    with open(path, encoding="utf-8") as f:
+        for line_no, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            task = json.loads(line)
+            if "prompt" not in task:
+                raise ValueError(f"{path}:{line_no}: task has no prompt")
+            task.setdefault("id", str(line_no))
+            tasks.append(task)
+    return tasks
+
+
+async def run_task(client: genai.Client, task: dict[str, Any], llm_config: types.GenerateContentConfig,
+                   limit: asyncio.Semaphore, keep_dir: Path | None, commit: bool = False) -> dict[str, Any]:
+    async with limit:
+        record: dict[str, Any] = {"id": task["id"], "prompt": task["prompt"]}
+        # Every task edits its own workspace so concurrent agents never see each other's writes;
+        # it starts empty and only brings in the files the task's tool calls touch
+        session = workspace.open_workspace(config.WORKING_DIR, str(task["id"]))
+        start = time.perf_counter()
+        try:
+            # Spans from this task (including its tool threads) are tagged with the task id
+            with tracing.session(str(task["id"])):
+                record.update(await run_agent_async(client, task["prompt"], str(session.root), llm_config))
+            record["error"] = None
+        except Exception as e:
+            record["error"] = f"{type(e).__name__}: {e}"
+        record["elapsed_s"] = round(time.perf_counter() - start, 3)
+
+        changes = await asyncio.to_thread(session.diff)
+        record["changes"] = [f"{change.kind} {change.path}" for change in changes]
+        if commit and record["error"] is None and changes:
+            try:
+                await asyncio.to_thread(session.commit)
+            except workspace.WorkspaceConflict as e:
+                record["error"] = f"{type(e).__name__}: {e}"
+        if keep_dir is not None:
+            target = keep_dir / str(task["id"])
+            shutil.rmtree(target, ignore_errors=True)
+            await asyncio.to_thread(session.export, target)
+            record["workspace"] = str(target)
+        else:
+            session.close()
+        return record
+
+
+async def run_batch(tasks: list[dict[str, Any]], output: TextIO, concurrency: int, keep_dir: Path | None = None,
+                    client: genai.Client | None = None, cache_mode: str = config.RESPONSE_CACHE_MODE,
+                    commit: bool = False) -> list[dict[str, Any]]:
+    '''
+    Runs every task with at most `concurrency` in flight, writing each result line as soon as it finishes
+    With commit, each task that finishes without an error applies its changes to config.WORKING_DIR
+    (a task whose files another task changed first gets a WorkspaceConflict error instead).
+    Returns: The result records in completion order
+    '''
+    client = client or build_client(cache_mode)
+    llm_config = build_llm_config()
+    limit = asyncio.Semaphore(concurrency)
+    if keep_dir is not None:
+        keep_dir.mkdir(parents=True, exist_ok=True)
+
+    records = []
+    pending = [asyncio.create_task(run_task(client, task, llm_config, limit, keep_dir, commit)) for task in tasks]
+    for finished in asyncio.as_completed(pending):
+        record = await finished
+        output.write(json.dumps(record) + "\n")
+        output.flush()
+        records.append(record)
+    return records
+
+
+def main() -> None:
+    '''
+    CLI: python batch.py prompts.jsonl [--output results.jsonl] [--concurrency N] [--keep-workspaces DIR] [--commit]
+    '''
+    parser = argparse.ArgumentParser(description="Run many agent prompts concurrently")
+    parser.add_argument("prompts", type=str, help="JSONL file, one {\"prompt\": ..., \"id\": ...} per line")
+    parser.add_argument("--output", type=str, default="-", help="Where to write result lines (default stdout)")
+    parser.add_argument("--concurrency", type=int, default=config.BATCH_CONCURRENCY, help="Tasks in flight at once")
+    parser.add_argument("--keep-workspaces", type=str, default=None, help="Keep each task's working directory under this path")
+    parser.add_argument("--commit", action="store_true",
+                        help="Apply each successful task's changes to the working directory as it finishes")
+    parser.add_argument("--cache", choices=response_cache.MODES, default=config.RESPONSE_CACHE_MODE,
+                        help="Record model responses to disk, or replay them without calling the API")
+    parser.add_argument("--trace", metavar="PATH", default=config.TRACE_FILE,
+                        help="Append a JSONL span per model/tool call to PATH and print a summary to stderr")
+    args = parser.parse_args()
+
+    tasks = read_tasks(args.prompts)
+    keep_dir = Path(args.keep_workspaces) if args.keep_workspaces else None
+    output_capture.set_live(False)
+    if args.trace:
+        tracing.TRACER.start(args.trace)
+
+    start = time.perf_counter()
+    if args.output == "-":
+        records = asyncio.run(run_batch(tasks, sys.stdout, args.concurrency, keep_dir, cache_mode=args.cache,
+                                        commit=args.commit))
+    else:
+        with open(args.output, "w", encoding="utf-8") as output:
+            records = asyncio.run(run_batch(tasks, output, args.concurrency, keep_dir, cache_mode=args.cache,
+                                            commit=args.commit))
+
+    failed = sum(1 for r in records if r["error"])
+    print(f"{len(records)} tasks, {failed} failed, {time.perf_counter() - start:.1f}s", file=sys.stderr)
+    if args.trace:
+        tracing.TRACER.close()
+        print(tracing.TRACER.summary(), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,299 @@
+"""
+The agent loop's own overhead, offline: agent.run_loop (model call, call_function dispatch with its argument
+deepcopy, tool execution, result budgets, history accumulation and compaction) driven by a scripted FakeClient
+through canned multi-turn sessions over synthetic repos of several sizes.
+Reports per-iteration latency (and how much of it is not the model), growth of the message history in bytes,
+estimated tokens and traced memory, and tool throughput. Results are saved as JSON under
+config.BENCH_RESULTS_DIR/agent_loop/ and compared with the previous saved run (or --compare FILE).
+Usage: python bench_agent_loop.py [--sizes 50,1000,10000] [--repeat 5] [--stream] [--latency SECONDS]
+                                  [--compare FILE] [--no-save]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any
+
+import agent
+import code_index
+import config
+import tracing
+from fake_client import FakeClient, call_response, text_response
+from google.genai import types
+from history import ConversationHistory
+
+RESULTS = Path(config.BENCH_RESULTS_DIR) / "agent_loop"
+
+CORE = "def add(a, b):\n    return a + b\n\n\ndef scale(values, k):\n    return [v * k for v in values]\n"
+TESTS = ("import unittest\nfrom pkg.core import add, scale\n\n\nclass TestCore(unittest.TestCase):\n"
+         "    def test_add(self):\n        self.assertEqual(add(2, 3), 5)\n\n"
+         "    def test_scale(self):\n        self.assertEqual(scale([1, 2], 3), [3, 6])\n")
+MAIN = "from pkg.core import add\n\nfor n in range(20):\n    print(n, add(n, n))\n"
+
+
+def module_path(n: int) -> str:
+    return f"pkg/mod{n // 20:03d}/file{n}.py"
+
+
+def build_repo(root: Path, files: int) -> None:
+    # Small modules, 20 per package, plus a core module with tests and a script that uses it
+    for n in range(files):
+        path = root / module_path(n)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(f"from pkg.core import add\n\n\ndef f{n}(x):\n    '''Adds {n}'''\n    return add(x, {n})\n")
+    (root / "pkg" / "__init__.py").write_text("")
+    (root / "pkg" / "core.py").write_text(CORE)
+    (root / "test_core.py").write_text(TESTS)
+    (root / "main.py").write_text(MAIN)
+
+
+# A session is the model's side of a conversation: the calls it asks for each turn, then its answer
+Session = list[list[tuple[str, dict[str, Any]]] | str]
+
+
+def sessions(files: int) -> dict[str, Session]:
+    explore: Session = [
+        [("get_files_info", {"directory": ".", "recursive": True})],
+        [("search_code", {"query": "def f1("}), ("get_files_info", {"directory": "pkg/mod000"})],
+        [("read_files", {"file_paths": ["pkg/core.py", module_path(0), "main.py"]})],
+        [("get_file_content", {"file_path": "pkg/core.py"})],
+        "pkg.core adds numbers; every module builds on it.",
+    ]
+    edit: Session = [
+        [("get_file_content", {"file_path": "pkg/core.py"})],
+        [("apply_edit", {"file_path": "pkg/core.py", "edits": [{"search": "return a + b", "replace": "return b + a"}]})],
+        [("run_tests", {})],
+        [("run_python_file", {"file_path": "main.py"}),
+         ("write_file", {"file_path": "notes/summary.txt", "content": "add() is now commutative by construction\n"})],
+        # Put the file back so every repetition starts from the same tree
+        [("apply_edit", {"file_path": "pkg/core.py", "edits": [{"search": "return b + a", "replace": "return a + b"}]})],
+        "Done, tests pass.",
+    ]
+    # Close to config.MAX_ITERATIONS turns of reading and searching, to show how the history grows
+    long: Session = [
+        [("get_file_content", {"file_path": module_path(n * 7 % files)}), ("search_code", {"query": f"return add(x, {n})"})]
+        for n in range(config.MAX_ITERATIONS - 2)
+    ]
+    long.append("Read them all.")
+    return {"explore": explore, "edit": edit, "long": long}
+
+
+class Script:
+    '''
+    Responder for FakeClient that plays a session turn by turn. It counts its own calls rather than reading
+    the history, which compaction may shorten.
+    '''
+
+    def __init__(self, session: Session):
+        self.session = session
+        self.turn = 0
+
+    def __call__(self, contents: list[types.Content]) -> types.GenerateContentResponse:
+        step = self.session[min(self.turn, len(self.session) - 1)]
+        self.turn += 1
+        return text_response(step) if isinstance(step, str) else call_response(step)
+
+
+def message_bytes(history: ConversationHistory) -> int:
+    return sum(len(content.model_dump_json(exclude_none=True)) for content in history.messages)
+
+
+def run_session(root: Path, session: Session, llm_config: types.GenerateContentConfig, stream: bool,
+                latency: float, memory: bool = False) -> dict[str, Any]:
+    '''
+    Plays one session through agent.run_loop
+    Returns: Per-iteration wall, model and tool times, tool spans, and message sizes after each iteration
+    (plus traced memory if memory is set, which slows everything down so it gets its own run)
+    '''
+    client = FakeClient(Script(session), latency=latency)
+    history = ConversationHistory()
+    history.append(types.Content(role="user", parts=[types.Part(text="Look around the repo and do the task.")]))
+    trace = tempfile.NamedTemporaryFile(prefix="bench-agent-loop-", suffix=".jsonl", delete=False)
+    trace.close()
+    tracing.TRACER.start(trace.name)
+    if memory:
+        tracemalloc.start()
+        baseline = tracemalloc.get_traced_memory()[0]
+
+    wall, sizes, tokens, traced = [], [], [], []
+    turns = agent.run_loop(client, history, llm_config, stream=stream, working_directory=str(root))
+    # Tools print a line per call; keep the cost, drop the noise
+    with contextlib.redirect_stdout(io.StringIO()):
+        while True:
+            started = time.perf_counter()
+            turn = next(turns, None)
+            elapsed = time.perf_counter() - started
+            if turn is None:
+                break
+            wall.append(elapsed * 1000)
+            if memory:
+                traced.append(tracemalloc.get_traced_memory()[0] - baseline)
+            sizes.append(message_bytes(history))
+            tokens.append(history.token_count())
+
+    if memory:
+        tracemalloc.stop()
+    tracing.TRACER.close()
+    with open(trace.name, encoding="utf-8") as f:
+        spans = [json.loads(line) for line in f]
+    Path(trace.name).unlink()
+
+    return {
+        "wall_ms": wall,
+        "model_ms": [span["wall_ms"] for span in spans if span["kind"] == "model"],
+        "tools": [(span["name"], span["wall_ms"], span.get("bytes_out", 0)) for span in spans if span["kind"] == "tool"],
+        "message_bytes": sizes,
+        "message_tokens": tokens,
+        "traced_bytes": traced,
+    }
+
+
+def summarize(runs: list[dict[str, Any]], memory: dict[str, Any]) -> dict[str, Any]:
+    per_iteration = [ms for run in runs for ms in run["wall_ms"]]
+    model = [ms for run in runs for ms in run["model_ms"]]
+    tools: dict[str, dict[str, float]] = {}
+    for run in runs:
+        for name, ms, size in run["tools"]:
+            totals = tools.setdefault(name, {"calls": 0, "ms": 0.0, "bytes_out": 0})
+            totals["calls"] += 1
+            totals["ms"] += ms
+            totals["bytes_out"] += size
+    for totals in tools.values():
+        totals["per_s"] = round(totals["calls"] / (totals["ms"] / 1000), 1) if totals["ms"] else 0.0
+        totals["mean_ms"] = round(totals["ms"] / totals["calls"], 3)
+        totals["ms"] = round(totals["ms"], 3)
+    tool_calls = sum(t["calls"] for t in tools.values())
+    total_ms = sum(per_iteration)
+    quantiles = statistics.quantiles(per_iteration, n=20) if len(per_iteration) > 1 else per_iteration * 19
+    return {
+        "iterations": len(runs[0]["wall_ms"]),
+        "iteration_ms": {
+            "median": round(statistics.median(per_iteration), 3),
+            "p95": round(quantiles[18], 3),
+            "max": round(max(per_iteration), 3),
+        },
+        # Everything that is not the (fake) model call: dispatch, tools, budgets, history
+        "loop_ms_per_iteration": round((total_ms - sum(model)) / len(per_iteration), 3),
+        "session_ms": round(total_ms / len(runs), 3),
+        "tool_calls_per_s": round(tool_calls / (total_ms / 1000), 1) if total_ms else 0.0,
+        "tools": dict(sorted(tools.items())),
+        "message_bytes": memory["message_bytes"],
+        "message_tokens": memory["message_tokens"],
+        "traced_bytes": memory["traced_bytes"],
+    }
+
+
+def git_revision() -> str:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    return commit + ("-dirty" if dirty else "")
+
+
+def latest_result() -> Path | None:
+    saved = sorted(RESULTS.glob("*.json")) if RESULTS.is_dir() else []
+    return saved[-1] if saved else None
+
+
+def report(results: list[dict[str, Any]]) -> None:
+    print(f"{'repo':>7} {'session':<8} {'iters':>5} {'median':>9} {'p95':>9} {'loop/iter':>10} {'tools/s':>9} "
+          f"{'messages':>10} {'~tokens':>8} {'traced':>9}")
+    for r in results:
+        print(f"{r['files']:>7,} {r['session']:<8} {r['iterations']:>5} {r['iteration_ms']['median']:>7.2f}ms "
+              f"{r['iteration_ms']['p95']:>7.2f}ms {r['loop_ms_per_iteration']:>8.2f}ms {r['tool_calls_per_s']:>9,.0f} "
+              f"{r['message_bytes'][-1] / 1024:>8.1f}KB {r['message_tokens'][-1]:>8,} {r['traced_bytes'][-1] / 1024:>7.0f}KB")
+    growth = [r for r in results if r["session"] == "long"]
+    for r in growth:
+        steps = r["message_bytes"]
+        marks = sorted({0, len(steps) // 4, len(steps) // 2, 3 * len(steps) // 4, len(steps) - 1})
+        print(f"  history growth, long session, {r['files']:,} files: "
+              + ", ".join(f"iter {i + 1}: {steps[i] / 1024:.1f}KB" for i in marks))
+    tools: dict[str, list[float]] = {}
+    for r in results:
+        for name, totals in r["tools"].items():
+            tools.setdefault(name, []).append(totals["mean_ms"])
+    print("  mean tool call: " + ", ".join(f"{name} {statistics.mean(ms):.2f}ms" for name, ms in sorted(tools.items())))
+
+
+def compare(results: list[dict[str, Any]], previous: dict[str, Any], args: argparse.Namespace) -> None:
+    before = {(r["files"], r["session"]): r for r in previous["results"]}
+    print(f"Compared with {previous['revision']} ({previous['date']}), negative is faster / smaller:")
+    for setting in ("stream", "latency", "repeat"):
+        if previous["args"].get(setting) != getattr(args, setting):
+            print(f"  note: that run used {setting}={previous['args'].get(setting)}, this one {getattr(args, setting)}")
+    for r in results:
+        old = before.get((r["files"], r["session"]))
+        if old is None:
+            continue
+        deltas = []
+        for label, new_value, old_value in (
+            ("median", r["iteration_ms"]["median"], old["iteration_ms"]["median"]),
+            ("loop/iter", r["loop_ms_per_iteration"], old["loop_ms_per_iteration"]),
+            ("messages", r["message_bytes"][-1], old["message_bytes"][-1]),
+            ("traced", r["traced_bytes"][-1], old["traced_bytes"][-1]),
+        ):
+            deltas.append(f"{label} {100 * (new_value - old_value) / old_value:+6.1f}%" if old_value else f"{label}    n/a")
+        print(f"  {r['files']:>7,} {r['session']:<8} " + "  ".join(deltas))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the agent loop offline with a scripted fake model")
+    parser.add_argument("--sizes", default="50,1000,10000", help="comma separated file counts of the synthetic repos")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs of every session")
+    parser.add_argument("--stream", action="store_true", help="drive the streaming turn instead of the blocking one")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds every fake model call takes")
+    parser.add_argument("--compare", help="saved result to compare with (default: the latest saved run)")
+    parser.add_argument("--no-save", action="store_true", help="don't save this run's results")
+    args = parser.parse_args()
+
+    previous_path = Path(args.compare) if args.compare else latest_result()
+    llm_config = agent.build_llm_config()
+    results = []
+    for files in (int(size) for size in args.sizes.split(",")):
+        root = Path(tempfile.mkdtemp(prefix="bench-agent-loop-")).resolve()
+        store = tempfile.mkdtemp(prefix="bench-agent-loop-index-")
+        try:
+            build_repo(root, files)
+            # Keep the search index out of the repo's own .code_index
+            code_index._INDEXES[str(root)] = code_index.CodeIndex(root, store)
+            for name, session in sessions(files).items():
+                # The first run builds indexes and fills caches; the timed ones measure a warm session
+                run_session(root, session, llm_config, args.stream, args.latency)
+                runs = [run_session(root, session, llm_config, args.stream, args.latency) for _ in range(args.repeat)]
+                memory = run_session(root, session, llm_config, args.stream, args.latency, memory=True)
+                results.append({"files": files, "session": name, **summarize(runs, memory)})
+        finally:
+            code_index._INDEXES.pop(str(root), None)
+            shutil.rmtree(root, ignore_errors=True)
+            shutil.rmtree(store, ignore_errors=True)
+
+    report(results)
+    saved = {
+        "revision": git_revision(),
+        "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "args": vars(args),
+        "results": results,
+    }
+    if previous_path is not None and previous_path.is_file():
+        compare(results, json.loads(previous_path.read_text()), args)
+    if not args.no_save:
+        RESULTS.mkdir(parents=True, exist_ok=True)
+        path = RESULTS / f"{time.strftime('%Y%m%d-%H%M%S')}-{saved['revision']}.json"
+        path.write_text(json.dumps(saved, indent=2))
+        print(f"Saved {path}")
+
+
+if __name__ == "__main__":
+    main()
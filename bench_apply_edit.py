@@ -0,0 +1,78 @@
+"""
+Tool-call payload and latency of a one-line change to a large file: write_file (whole file) vs apply_edit.
+Payload tokens are estimated the same way the history does (JSON chars / CHARS_PER_TOKEN), and are what the
+model has to generate as output for the call.
+Usage: python bench_apply_edit.py [lines]   (default 2000)
+"""
+
+import json
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+import config
+from functions.apply_edit import apply_edit
+from functions.write_file import write_file
+
+
+def tokens(args: dict) -> int:
+    return len(json.dumps(args)) // config.CHARS_PER_TOKEN
+
+
+def timed(fn, runs: int = 20) -> float:
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = fn()
+        timings.append((time.perf_counter() - start) * 1000)
+        if result.startswith("Error"):
+            raise RuntimeError(result)
+    return statistics.median(timings)
+
+
+def main() -> None:
+    lines = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    root = tempfile.mkdtemp(prefix="edit-bench-")
+    try:
+        original = "".join(f"def function_{n}(value):\n    return value * {n}\n\n" for n in range(lines // 3))
+        write_file(root, "big.py", original)
+
+        middle = lines // 6
+        old_line = f"    return value * {middle}\n"
+        new_line = f"    return value * {middle} + 1\n"
+        rewritten = original.replace(old_line, new_line)
+
+        full = {"file_path": "big.py", "content": rewritten}
+        edit = {"file_path": "big.py", "edits": [{"search": f"def function_{middle}(value):\n{old_line}",
+                                                  "replace": f"def function_{middle}(value):\n{new_line}"}]}
+
+        # Toggle between the two versions so every call really changes the file
+        state = [False]
+        def flip_write():
+            state[0] = not state[0]
+            return write_file(root, "big.py", rewritten if state[0] else original)
+        def flip_edit():
+            state[0] = not state[0]
+            search, replace = edit["edits"][0]["search"], edit["edits"][0]["replace"]
+            if not state[0]:
+                search, replace = replace, search
+            return apply_edit(root, "big.py", [{"search": search, "replace": replace}])
+
+        write_file(root, "big.py", original)
+        write_ms = timed(flip_write)
+        write_file(root, "big.py", original)
+        state[0] = False
+        edit_ms = timed(flip_edit)
+
+        print(f"one-line change to a {lines}-line file ({len(original)} chars)")
+        print(f"write_file  payload ~{tokens(full):6d} tokens  apply {write_ms:6.2f}ms")
+        print(f"apply_edit  payload ~{tokens(edit):6d} tokens  apply {edit_ms:6.2f}ms")
+        print(f"output tokens saved: {tokens(full) / tokens(edit):.0f}x")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Cost of each calculator numeric backend: float, decimal (default precision and 50 digits) and fraction, for a
+repeated expression (compile cache hit), distinct expressions (every call compiles), evaluate_many, and
+rendering the results with the JsonLinesWriter. Rates are evaluations/sec with the slowdown against float.
+Usage: python bench_backends.py [evaluations]   (default 100000)
+"""
+
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / "calculator"))
+
+from pkg.calculator import Calculator  # noqa: E402
+from pkg.render import JsonLinesWriter  # noqa: E402
+
+BACKENDS = [("float", {}), ("decimal", {}), ("decimal", {"precision": 50}), ("fraction", {})]
+SHAPE = "1.5 + 2 * 3 - 8 / 7 + 0.1 * (3 - x)"
+
+
+def best(work, repeats: int = 3) -> float:
+    # Best of a few runs, the first one also pays for warming caches
+    fastest = float("inf")
+    for _ in range(repeats):
+        started = time.perf_counter()
+        work()
+        fastest = min(fastest, time.perf_counter() - started)
+    return fastest
+
+
+def render(expressions, results) -> None:
+    with open(os.devnull, "w", encoding="utf-8") as stream, JsonLinesWriter(stream, pretty=False) as writer:
+        for expression, result in zip(expressions, results):
+            writer.write(expression, result)
+
+
+def main() -> None:
+    evaluations = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    variables = {"x": 0.25}
+    repeated = [SHAPE] * evaluations
+    distinct = [SHAPE.replace("1.5", str(n)) for n in range(evaluations)]
+    print(f"{SHAPE!r} with x = 0.25, {evaluations:,} evaluations (evals/s, times slower than float):")
+    print(f"  {'backend':<20}" + "".join(f"{column:>18}" for column in ("repeated", "distinct", "evaluate_many", "render")))
+    baseline = None
+    for backend, options in BACKENDS:
+        calculator = Calculator(backend, **options)
+        results = list(calculator.evaluate_many(distinct, variables))
+        timings = [
+            best(lambda: [calculator.evaluate(expression, variables) for expression in repeated]),
+            best(lambda: [calculator.evaluate(expression, variables) for expression in distinct]),
+            best(lambda: list(calculator.evaluate_many(distinct, variables))),
+            best(lambda: render(distinct, results)),
+        ]
+        baseline = baseline or timings
+        label = backend + (f" ({options['precision']} digits)" if options else "")
+        cells = "".join(
+            f"{evaluations / elapsed:>12,.0f}" + (f" {elapsed / base:4.1f}x" if baseline is not timings else " " * 6)
+            for elapsed, base in zip(timings, baseline)
+        )
+        print(f"  {label:<20}{cells}   = {str(results[0])[:40]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Calculator throughput in evaluations/sec: the old split + shunting-yard evaluator vs the compiled programs,
+for a repeated expression (compile cache hit) and for distinct expressions (every call compiles), then
+evaluate_many over distinct expressions of a few shapes (vectorized when NumPy is installed).
+Usage: python bench_calculator.py [evaluations]   (default 200000)
+"""
+
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / "calculator"))
+
+from pkg import batch  # noqa: E402
+from pkg.calculator import Calculator, compile_expression  # noqa: E402
+
+
+class LegacyCalculator:
+    # The evaluator before expressions were compiled: str.split() tokens, lambda dispatch, re-parsed on every call
+    def __init__(self):
+        self.operators = {
+            "+": lambda a, b: a + b,
+            "-": lambda a, b: a - b,
+            "*": lambda a, b: a * b,
+            "/": lambda a, b: a / b,
+        }
+        self.precedence = {"+": 1, "-": 1, "*": 2, "/": 2}
+
+    def evaluate(self, expression):
+        if not expression or expression.isspace():
+            return None
+        values = []
+        operators = []
+        for token in expression.strip().split():
+            if token in self.operators:
+                while operators and self.precedence[operators[-1]] >= self.precedence[token]:
+                    self._apply_operator(operators, values)
+                operators.append(token)
+            else:
+                values.append(float(token))
+        while operators:
+            self._apply_operator(operators, values)
+        return values[0]
+
+    def _apply_operator(self, operators, values):
+        operator = operators.pop()
+        b = values.pop()
+        a = values.pop()
+        values.append(self.operators[operator](a, b))
+
+
+def rate(evaluate, expressions: list[str], repeats: int = 3) -> float:
+    # Best of a few runs, the first one also pays for warming caches
+    best = float("inf")
+    for _ in range(repeats):
+        started = time.perf_counter()
+        for expression in expressions:
+            evaluate(expression)
+        best = min(best, time.perf_counter() - started)
+    return len(expressions) / best
+
+
+def rate_many(calculator, expressions: list[str], repeats: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeats):
+        started = time.perf_counter()
+        for _ in calculator.evaluate_many(expressions):
+            pass
+        best = min(best, time.perf_counter() - started)
+    return len(expressions) / best
+
+
+def main() -> None:
+    evaluations = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    legacy = LegacyCalculator()
+    calculator = Calculator()
+
+    # Only + - * / and spaces between tokens, so the old evaluator can run them too
+    shapes = ["3 + 5", "2 * 3 - 8 / 2 + 5", "1 + 2 * 3 - 4 / 5 + 6 * 7 - 8 / 9 + 10 * 11 - 12"]
+    for shape in shapes:
+        repeated = [shape] * evaluations
+        assert legacy.evaluate(shape) == calculator.evaluate(shape)
+        print(f"{shape!r} ({len(shape.split())} tokens), repeated:")
+        old, new = rate(legacy.evaluate, repeated), rate(calculator.evaluate, repeated)
+        print(f"  shunting-yard {old:>12,.0f} evals/s")
+        print(f"  compiled      {new:>12,.0f} evals/s   {new / old:.1f}x")
+
+        # Distinct numbers defeat the expression cache (repeats re-miss it too, it only holds the last CACHE_SIZE)
+        distinct = [shape.replace("3", str(n + 3)) for n in range(evaluations // 4)]
+        old, new = rate(legacy.evaluate, distinct), rate(calculator.evaluate, distinct)
+        print(f"  distinct expressions: shunting-yard {old:,.0f} evals/s, compiled {new:,.0f} evals/s ({new / old:.1f}x)")
+    print(f"compile cache: {compile_expression.cache_info()}")
+
+    # The batch API: every expression is distinct, but there are only three shapes
+    expressions = [shapes[n % 3].replace("3", str(n)) for n in range(evaluations)]
+    print(f"{len(expressions):,} distinct expressions, 3 shapes:")
+    old = rate(legacy.evaluate, expressions)
+    single = rate(calculator.evaluate, expressions)
+    many = rate_many(calculator, expressions)
+    print(f"  shunting-yard {old:>12,.0f} evals/s")
+    print(f"  evaluate      {single:>12,.0f} evals/s")
+    print(f"  evaluate_many {many:>12,.0f} evals/s   {many / old:.1f}x  ({'NumPy' if batch.np else 'no NumPy, one at a time'})")
+
+
+if __name__ == "__main__":
+    main()
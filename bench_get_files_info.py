@@ -0,0 +1,76 @@
+"""
+Recursive get_files_info over a synthetic tree: the old iterdir + stat + is_dir walk vs the scandir index,
+cold, warm, and after a write_file.
+Usage: python bench_get_files_info.py [files]   (default 100000)
+"""
+
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import read_cache
+from dir_index import INDEX
+from functions.get_files_info import get_files_info
+from functions.write_file import write_file
+
+
+def build_tree(root: Path, files: int) -> None:
+    # 100 top-level packages, 10 modules dirs each, files spread evenly
+    per_dir = max(files // 1000, 1)
+    for package in range(100):
+        for module in range(10):
+            directory = root / f"pkg{package:03d}" / f"mod{module}"
+            directory.mkdir(parents=True)
+            for n in range(per_dir):
+                suffix = ".py" if n % 4 else ".txt"
+                (directory / f"file{n:04d}{suffix}").write_bytes(b"x" * (n % 64))
+
+
+def legacy_walk(target: Path, prefix: str = "") -> list[str]:
+    # What a recursive version of the old listing cost: iterdir, then stat() and is_dir() per entry
+    lines = []
+    for p in sorted(target.iterdir(), key=lambda p: p.name):
+        lines.append(f"- {prefix}{p.name}: file_size={p.stat().st_size}, is_dir={p.is_dir()}")
+        if p.is_dir():
+            lines.extend(legacy_walk(p, f"{prefix}{p.name}/"))
+    return lines
+
+
+def timed(label: str, fn) -> object:
+    start = time.perf_counter()
+    result = fn()
+    print(f"{label:<36} {(time.perf_counter() - start) * 1000:9.1f}ms")
+    return result
+
+
+def main() -> None:
+    files = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    root = Path(tempfile.mkdtemp(prefix="listing-bench-"))
+    try:
+        build_tree(root, files)
+        # Let the racy-mtime window pass so the index keeps what it scans
+        time.sleep(0.05)
+        print(f"{files} files in 1000 directories under {root}")
+
+        lines = timed("legacy iterdir walk (all entries)", lambda: legacy_walk(root))
+        print(f"{'':<36} {len(lines)} entries")
+
+        first = timed("index cold, first page", lambda: get_files_info(str(root), ".", recursive=True))
+        timed("index warm, same page (cached)", lambda: get_files_info(str(root), ".", recursive=True))
+        timed("index warm, page at offset 50000", lambda: get_files_info(str(root), ".", recursive=True, offset=50000))
+        timed("index warm, *.txt under pkg05*", lambda: get_files_info(str(root), ".", recursive=True, pattern="pkg05*/*/*.txt"))
+        timed("index warm, .py only, max_depth=2", lambda: get_files_info(str(root), ".", recursive=True, extensions=[".py"], max_depth=2))
+
+        write_file(str(root), "pkg042/mod3/new_module.py", "print('hi')\n")
+        read_cache.CACHE.clear()
+        timed("after write_file, full walk", lambda: get_files_info(str(root), ".", recursive=True, offset=1))
+        print(first.splitlines()[-1])
+        print(INDEX.stats())
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Rendering calculator results: format_json_output (json.dumps with indent=2 per result), one compact json.dumps
+per line, and the streaming JsonLinesWriter (one reusable encoder, buffered writes), all written to os.devnull.
+Usage: python bench_render.py [results]   (default 1000000)
+"""
+
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / "calculator"))
+
+from pkg.render import JsonLinesWriter, format_json_output  # noqa: E402
+
+
+def make_results(count: int) -> list[tuple[str, object]]:
+    # Mostly whole numbers (rendered as ints), some fractions, and an error every 100
+    results = []
+    for n in range(count):
+        if n % 100 == 99:
+            results.append((f"{n} / 0", ZeroDivisionError("float division by zero")))
+        elif n % 3:
+            results.append((f"{n} + {n % 7}", float(n + n % 7)))
+        else:
+            results.append((f"{n} / 7", n / 7))
+    return results
+
+
+def timed(label: str, render, results, baseline: float | None = None) -> float:
+    with open(os.devnull, "w", encoding="utf-8") as stream:
+        started = time.perf_counter()
+        render(results, stream)
+        elapsed = time.perf_counter() - started
+    speedup = f"   {baseline / elapsed:.1f}x" if baseline else ""
+    print(f"  {label:<28} {elapsed:7.2f}s  {len(results) / elapsed:>12,.0f} results/s{speedup}")
+    return elapsed
+
+
+def per_result_pretty(results, stream) -> None:
+    for expression, result in results:
+        if isinstance(result, Exception):
+            stream.write(json.dumps({"expression": expression, "error": str(result)}, indent=2) + "\n")
+        else:
+            stream.write(format_json_output(expression, result) + "\n")
+
+
+def per_result_compact(results, stream) -> None:
+    for expression, result in results:
+        if isinstance(result, Exception):
+            data = {"expression": expression, "error": str(result)}
+        else:
+            data = {"expression": expression, "result": int(result) if result.is_integer() else result}
+        stream.write(json.dumps(data, separators=(",", ":")) + "\n")
+
+
+def streaming(results, stream) -> None:
+    with JsonLinesWriter(stream, pretty=False) as writer:
+        for expression, result in results:
+            writer.write(expression, result)
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    results = make_results(count)
+    print(f"{count:,} results:")
+    baseline = timed("format_json_output", per_result_pretty, results)
+    timed("json.dumps per line", per_result_compact, results, baseline)
+    timed("JsonLinesWriter", streaming, results, baseline)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Tool results before and after result_budget: bytes and estimated tokens for a large directory listing, a
+search over the repo, a script that logs the same failure many times and a test run with many failures, plus the
+time the encoding takes.
+Usage: python bench_result_budget.py
+"""
+
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+import result_budget
+from functions.get_files_info import get_files_info
+from functions.run_python_file import run_python_file
+from functions.run_tests import run_tests
+from functions.search_code import search_code
+
+NOISY = '''
+import logging, traceback
+def parse(row):
+    raise ValueError(f"bad row {row}")
+def load(rows):
+    for row in rows:
+        try:
+            parse(row)
+        except ValueError:
+            traceback.print_exc()
+            print("skipping row, retrying with defaults")
+load(range(40))
+'''
+
+FAILING = '''
+import unittest
+def check(value):
+    assert value == 0, value
+class T(unittest.TestCase):
+''' + "".join(f"    def test_{n}(self): check({n % 3 + 1})\n" for n in range(12))
+
+
+def measure(label: str, function_name: str, result: str) -> None:
+    started = time.perf_counter()
+    fitted = result_budget.BUDGET.fit(function_name, result)
+    elapsed = time.perf_counter() - started
+    before, after = result_budget.estimate_tokens(result), result_budget.estimate_tokens(fitted)
+    print(f"  {label:<26} {len(result):>8,} -> {len(fitted):>7,} bytes   ~{before:>6,} -> ~{after:>6,} tokens "
+          f"({100 * (before - after) / before:4.0f}% saved)  {elapsed * 1000:6.2f}ms")
+
+
+def main() -> None:
+    scratch = Path(tempfile.mkdtemp(prefix="bench-result-budget-"))
+    try:
+        for n in range(150):
+            (scratch / "pkg" / f"mod{n // 10}").mkdir(parents=True, exist_ok=True)
+            (scratch / "pkg" / f"mod{n // 10}" / f"file{n}.py").write_text(f"def f{n}():\n    return {n}\n")
+        (scratch / "noisy.py").write_text(NOISY)
+        (scratch / "test_many.py").write_text(FAILING)
+
+        print("Result sizes, raw -> compact (budgets applied):")
+        measure("get_files_info (recursive)", "get_files_info", get_files_info(str(scratch), ".", recursive=True))
+        measure("search_code", "search_code", search_code(".", "def ", max_results=200))
+        measure("run_python_file (noisy)", "run_python_file", run_python_file(str(scratch), "noisy.py"))
+        measure("run_tests (12 failures)", "run_tests", run_tests(str(scratch)))
+        print(result_budget.BUDGET.stats())
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
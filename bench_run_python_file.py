@@ -0,0 +1,49 @@
+"""
+Cold spawn vs warm worker latency for run_python_file over the calculator tests.
+Usage: python bench_run_python_file.py [runs]
+"""
+
+import statistics
+import sys
+import time
+
+import config
+from functions.run_python_file import run_python_file
+from worker_pool import POOL
+
+
+def measure(runs: int) -> list[float]:
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        output = run_python_file(config.WORKING_DIR, "tests.py")
+        timings.append(time.perf_counter() - start)
+        if "OK" not in output:
+            raise RuntimeError(f"Unexpected test output: {output}")
+    return timings
+
+
+def report(label: str, timings: list[float]) -> None:
+    ms = sorted(t * 1000 for t in timings)
+    print(f"{label:<12} mean={statistics.mean(ms):7.1f}ms  p50={ms[len(ms) // 2]:7.1f}ms  max={ms[-1]:7.1f}ms")
+
+
+def main() -> None:
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+
+    config.PYTHON_WORKERS = 0
+    cold = measure(runs)
+
+    config.PYTHON_WORKERS = 1
+    POOL.warm()
+    warm = measure(runs)
+    POOL.close()
+
+    print(f"run_python_file tests.py x{runs}")
+    report("cold spawn", cold)
+    report("warm worker", warm)
+    print(f"speedup: {statistics.mean(cold) / statistics.mean(warm):.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+search_code over a synthetic tree of Python-like files: index build, reload from disk, and query latency.
+Usage: python bench_search_code.py [files]   (default 50000)
+"""
+
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import code_index
+import config
+from functions.search_code import search_code
+from functions.write_file import write_file
+
+WORDS = ["value", "total", "parse", "render", "token", "buffer", "config", "index", "result", "stream",
+         "client", "handler", "request", "session", "cache", "worker", "queue", "state", "record", "entry"]
+
+
+def build_tree(root: Path, files: int) -> None:
+    rng = random.Random(42)
+    for n in range(files):
+        directory = root / f"pkg{n // 1000:03d}" / f"mod{n // 100 % 10}"
+        directory.mkdir(parents=True, exist_ok=True)
+        lines = [f"# module {n}", "import os", ""]
+        for f in range(rng.randint(5, 15)):
+            name = f"{rng.choice(WORDS)}_{rng.choice(WORDS)}_{rng.randint(0, 9999)}"
+            lines += [f"def {name}(self, {rng.choice(WORDS)}):",
+                      f"    {rng.choice(WORDS)} = self.{rng.choice(WORDS)}.get({rng.randint(0, 99)})",
+                      f"    return {rng.choice(WORDS)}", ""]
+        (directory / f"file{n % 100:02d}.py").write_text("\n".join(lines))
+
+
+def timed_queries(root: Path, queries: list[tuple[str, dict]], runs: int) -> None:
+    for query, kwargs in queries:
+        timings = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            output = search_code(str(root), query, **kwargs)
+            timings.append((time.perf_counter() - start) * 1000)
+        hits = 0 if output.startswith("No matches") else output.count("\n") + 1
+        label = f"{query!r} {kwargs or ''}"
+        print(f"  {label:<44} p50={statistics.median(timings):7.1f}ms  max={max(timings):7.1f}ms  lines={hits}")
+
+
+def main() -> None:
+    files = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    root = Path(tempfile.mkdtemp(prefix="search-bench-"))
+    store = tempfile.mkdtemp(prefix="search-bench-index-")
+    config.CODE_INDEX_DIR = store
+    try:
+        build_tree(root, files)
+        time.sleep(0.05)
+        print(f"{files} files under {root}")
+
+        start = time.perf_counter()
+        index = code_index.CodeIndex(root, store)
+        index.refresh()
+        print(f"cold build:                  {time.perf_counter() - start:7.2f}s  {index.stats()}")
+
+        # A new session: the segment is loaded from disk and checked against the tree
+        start = time.perf_counter()
+        index = code_index.CodeIndex(root, store)
+        index.refresh()
+        print(f"reload + refresh (warm fs):  {time.perf_counter() - start:7.2f}s")
+        code_index._INDEXES[str(root)] = index
+
+        queries = [
+            ("buffer_stream_4242", {}),
+            ("def cache_worker_", {}),
+            (r"def (\w+)_handler_12\d\d\(", {"regex": True}),
+            ("RECORD_ENTRY_77", {"ignore_case": True}),
+            ("return", {}),
+            ("no_such_identifier_anywhere", {}),
+        ]
+        print("queries:")
+        timed_queries(root, queries, runs=20)
+
+        write_file(str(root), "pkg007/mod3/file42.py", "def freshly_written_marker():\n    return 1\n")
+        print("after write_file:")
+        timed_queries(root, [("freshly_written_marker", {})], runs=20)
+        print(index.stats())
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+        shutil.rmtree(store, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Cold vs warm request latency: the same three-turn session (list, read, run a script) answered by a fresh
+`main.py` process each time, and by a warm server.py through the thin CLI (`main.py --server`) and through
+server.submit from an already running process.
+The session is recorded once from a scripted fake model into the response cache, and both sides replay it, so
+no API key is needed and the model costs the same everywhere; the recorded entries are removed afterwards.
+Usage: python bench_server.py [runs]   (default 5)
+"""
+
+import contextlib
+import io
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import agent
+import config
+import server
+from fake_client import FakeClient, call_response, text_response
+from response_cache import CachingClient
+
+PROMPT = "bench_server: what is in the calculator, and what does 3 + 5 give?"
+SCRIPT = [
+    call_response([("get_files_info", {"directory": "."}), ("get_file_content", {"file_path": "main.py", "length": 400})]),
+    call_response([("run_python_file", {"file_path": "main.py", "args": ["3 + 5"]})]),
+    text_response("It is an expression calculator with JSON output; 3 + 5 gives 8."),
+]
+
+
+def record() -> None:
+    turns = iter(SCRIPT)
+    client = CachingClient(FakeClient(lambda contents: next(turns)), mode="record")
+    with contextlib.redirect_stdout(io.StringIO()):
+        agent.run(PROMPT, client=client)
+
+
+def timed_process(command: list[str]) -> float:
+    started = time.perf_counter()
+    result = subprocess.run(command, capture_output=True, text=True)
+    elapsed = time.perf_counter() - started
+    if result.returncode != 0 or "gives 8" not in result.stdout:
+        raise RuntimeError(f"{' '.join(command)} failed:\n{result.stdout}{result.stderr}")
+    return elapsed
+
+
+def wait_for(path: str, process: subprocess.Popen, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"server.py exited: {process.stderr.read()}")
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(path)
+            return
+        except (FileNotFoundError, ConnectionRefusedError):
+            time.sleep(0.005)
+        finally:
+            probe.close()
+    raise RuntimeError("server.py did not start listening in time")
+
+
+def line(label: str, samples: list[float], baseline: float | None = None) -> None:
+    median = statistics.median(samples)
+    speedup = f"   {baseline / median:5.1f}x" if baseline else ""
+    print(f"  {label:<40} median {median * 1000:8.1f}ms   min {min(samples) * 1000:8.1f}ms{speedup}")
+
+
+def main() -> None:
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    store = Path(config.RESPONSE_CACHE_DIR)
+    created = not store.exists()
+    before = set(store.rglob("*.json")) if store.is_dir() else set()
+    record()
+    recorded = set(store.rglob("*.json")) - before
+    socket_path = os.path.join(tempfile.mkdtemp(prefix="bench-server-"), "agent.sock")
+    python = [sys.executable, "main.py", PROMPT]
+    process = None
+    try:
+        cold = [timed_process([*python, "--cache", "replay"]) for _ in range(runs)]
+
+        started = time.perf_counter()
+        process = subprocess.Popen([sys.executable, "server.py", "--socket", socket_path, "--cache", "replay"],
+                                   stderr=subprocess.PIPE, text=True)
+        wait_for(socket_path, process)
+        startup = time.perf_counter() - started
+
+        def submit() -> float:
+            started = time.perf_counter()
+            reply = server.submit({"op": "run", "prompt": PROMPT}, socket_path, out=io.StringIO())
+            if "error" in reply:
+                raise RuntimeError(reply["error"])
+            return time.perf_counter() - started
+
+        first = submit()
+        warm_cli = [timed_process([*python, "--server", socket_path]) for _ in range(runs)]
+        warm = [submit() for _ in range(runs)]
+
+        print(f"One {len(SCRIPT)}-turn replayed session, {runs} runs each:")
+        line("cold: main.py --cache replay", cold)
+        line("server.py startup until listening", [startup])
+        line("warm: first request after startup", [first], statistics.median(cold))
+        line("warm: main.py --server", warm_cli, statistics.median(cold))
+        line("warm: server.submit in process", warm, statistics.median(cold))
+        print(server.submit({"op": "stats"}, socket_path)["stats"])
+    finally:
+        if process is not None:
+            with contextlib.suppress(ConnectionError):
+                server.submit({"op": "shutdown"}, socket_path)
+            process.wait(timeout=10)
+        for path in recorded:
+            path.unlink(missing_ok=True)
+            with contextlib.suppress(OSError):
+                path.parent.rmdir()
+        if created:
+            with contextlib.suppress(OSError):
+                store.rmdir()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+CLI startup cost, measured with `python -X importtime`: median wall time and import time of the steps a short-lived
+run goes through, from argument parsing to importing the whole agent, against a bare interpreter.
+`main.py --help` must not import google.genai and must spend at most config.STARTUP_IMPORT_BUDGET_MS on imports
+beyond what the bare interpreter imports; the script exits with status 1 otherwise, so it doubles as a regression check.
+Usage: python bench_startup.py [runs]   (default 10)
+"""
+
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import config
+
+ROOT = Path(__file__).resolve().parent
+
+STEPS = [
+    ("bare interpreter", ["-c", "pass"]),
+    ("main.py --help", ["main.py", "--help"]),
+    ("import tool_registry", ["-c", "import tool_registry, tool_executor"]),
+    ("first dispatch", ["-c", "import tool_registry; tool_registry.TOOLS['get_files_info']"]),
+    ("declarations", ["-c", "import tool_registry; tool_registry.declarations()"]),
+    ("import agent", ["-c", "import agent"]),
+]
+
+
+def measure(args: list[str]) -> tuple[float, float, set[str]]:
+    '''
+    Runs one step in a fresh interpreter
+    Returns: (wall ms, import ms summed over top-level imports, names of every module imported)
+    '''
+    started = time.perf_counter()
+    completed = subprocess.run([sys.executable, "-X", "importtime", *args], cwd=ROOT, capture_output=True, text=True)
+    wall = (time.perf_counter() - started) * 1000
+    total = 0
+    modules = set()
+    # "import time: self [us] | cumulative | name", nested imports are indented under the module importing them
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|", 2)
+        if not cumulative.strip().isdigit():
+            continue
+        modules.add(name.strip())
+        if not name[1:].startswith(" "):
+            total += int(cumulative)
+    return wall, total / 1000, modules
+
+
+def main() -> None:
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    results = {}
+    print(f"Startup, median of {runs} runs:")
+    for label, args in STEPS:
+        samples = [measure(args) for _ in range(runs)]
+        wall = statistics.median(sample[0] for sample in samples)
+        imports = statistics.median(sample[1] for sample in samples)
+        modules = samples[-1][2]
+        results[label] = (wall, imports, modules)
+        genai = "google.genai" if "google.genai" in modules else "-"
+        print(f"  {label:<22} wall {wall:7.1f}ms   imports {imports:7.1f}ms   {len(modules):4} modules   {genai}")
+
+    bare = results["bare interpreter"][1]
+    wall, imports, modules = results["main.py --help"]
+    extra = imports - bare
+    failures = []
+    if "google.genai" in modules:
+        failures.append("main.py --help imports google.genai")
+    if extra > config.STARTUP_IMPORT_BUDGET_MS:
+        failures.append(f"main.py --help imports take {extra:.1f}ms over a bare interpreter "
+                        f"(budget {config.STARTUP_IMPORT_BUDGET_MS}ms)")
+    for failure in failures:
+        print(f"REGRESSION: {failure}")
+    if failures:
+        sys.exit(1)
+    print(f"OK: main.py --help imports {extra:.1f}ms over a bare interpreter (budget {config.STARTUP_IMPORT_BUDGET_MS}ms)")
+
+
+if __name__ == "__main__":
+    main()
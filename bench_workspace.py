@@ -0,0 +1,82 @@
+"""
+Per-session working directories over a synthetic tree: the old full copy (shutil.copytree) vs a copy-on-write
+workspace, for setup alone, for a top-level listing, for a session that reads and edits a few files and diffs
+them, and for a session that runs code (which gives it a private copy of every file, so that step is O(tree) and
+costs about as much as the copytree).
+Usage: python bench_workspace.py [files]   (default 20000)
+"""
+
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import workspace
+from functions.get_file_content import get_file_content
+from functions.write_file import write_file
+
+
+def build_tree(root: Path, files: int) -> None:
+    # 50 packages of 20 directories, files spread evenly, a few KB each
+    per_dir = max(files // 1000, 1)
+    for package in range(50):
+        for module in range(20):
+            directory = root / f"pkg{package:02d}" / f"mod{module:02d}"
+            directory.mkdir(parents=True)
+            for n in range(per_dir):
+                (directory / f"file{n:03d}.py").write_bytes(b"x = 1\n" * (200 + n))
+
+
+def timed(label: str, work, baseline: float | None = None) -> float:
+    started = time.perf_counter()
+    work()
+    elapsed = time.perf_counter() - started
+    speedup = f"   {baseline / elapsed:,.0f}x" if baseline else ""
+    print(f"  {label:<40} {elapsed * 1000:9.1f}ms{speedup}")
+    return elapsed
+
+
+def edit_session(root: str) -> None:
+    # What a typical short session touches: a few reads and two edits
+    for n in range(5):
+        get_file_content(root, f"pkg{n:02d}/mod00/file000.py", length=100)
+    write_file(root, "pkg00/mod00/file000.py", "x = 2\n")
+    write_file(root, "pkg01/new.py", "y = 1\n")
+
+
+def main() -> None:
+    files = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    scratch = Path(tempfile.mkdtemp(prefix="bench-workspace-"))
+    base = scratch / "base"
+    try:
+        build_tree(base, files)
+        print(f"{files:,} files:")
+
+        copy = scratch / "copy"
+        baseline = timed("copytree setup", lambda: shutil.copytree(base, copy))
+        timed("copytree setup + edits", lambda: (shutil.rmtree(copy), shutil.copytree(base, copy), edit_session(str(copy))))
+        shutil.rmtree(copy)
+
+        sessions = []
+        timed("workspace setup", lambda: sessions.append(workspace.open_workspace(str(base), "bench")), baseline)
+        session = sessions[-1]
+        timed("workspace listing of '.'", lambda: session.prepare("get_files_info", {"directory": "."}), baseline)
+
+        def edits() -> None:
+            for path in [f"pkg{n:02d}/mod00/file000.py" for n in range(5)] + ["pkg01/new.py"]:
+                session.materialize(path)
+            edit_session(str(session.root))
+            print(f"    {session.diff()}")
+
+        timed("workspace edits + diff", edits, baseline)
+        isolate = timed(f"workspace first exec (copies all {files:,})", session.isolate)
+        print(f"    first exec is O(tree): {isolate / files * 1e6:.1f}us per file, {isolate / baseline:.2f}x copytree")
+        timed("workspace commit", session.commit)
+        session.close()
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,45 @@
 # calculator/main.py
 
+import json
 import sys
-from pkg.calculator import Calculator
-from pkg.render import format_json_output
+from decimal import Decimal
+from itertools import islice
+
+from pkg.batch import CHUNK_SIZE
+from pkg.calculator import BACKENDS, DEFAULT_PRECISION, Calculator
+from pkg.render import format_json_output, write_json_lines
 
 
 def main():
-    calculator = Calculator()
-    if len(sys.argv) <= 1:
+    try:
+        backend, precision, args = parse_options(sys.argv[1:])
+        calculator = Calculator(backend, precision)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return
+    if not args:
         print("Calculator App")
-        print('Usage: python main.py "<expression>"')
+        print('Usage: python main.py [options] "<expression>"')
+        print('       python main.py [options] --batch [file]   (one expression per line, or {"expression": ..., "variables": {...}}; default stdin)')
+        print(f"Options: --backend {{{','.join(BACKENDS)}}} (default float), --precision N (decimal digits, default {DEFAULT_PRECISION})")
         print('Example: python main.py "3 + 5"')
         return
 
-    expression = " ".join(sys.argv[1:])
+    if args[0] == "--batch":
+        source = args[1] if len(args) > 1 else "-"
+        try:
+            stream = sys.stdin if source == "-" else open(source, encoding="utf-8")
+        except OSError as e:
+            print(f"Error: {e}")
+            return
+        # Exact backends read JSON numbers as Decimal so variables keep every digit
+        parse_float = None if calculator.number is float else Decimal
+        with stream:
+            records = (parse_line(line, parse_float) for line in stream if line.strip())
+            write_json_lines(evaluate_records(calculator, records), sys.stdout)
+        return
+
+    expression = " ".join(args)
     try:
         result = calculator.evaluate(expression)
         if result is not None:
@@ -25,5 +51,47 @@ def main():
         print(f"Error: {e}")
 
 
+def parse_options(args):
+    # Leading --backend NAME and --precision N; returns (backend, precision, the remaining arguments)
+    backend = "float"
+    precision = DEFAULT_PRECISION
+    while len(args) >= 2 and args[0] in ("--backend", "--precision"):
+        if args[0] == "--backend":
+            backend = args[1]
+        else:
+            try:
+                precision = int(args[1])
+            except ValueError:
+                raise ValueError(f"--precision must be a whole number, not {args[1]!r}") from None
+            if precision < 1:
+                raise ValueError("--precision must be at least 1")
+        args = args[2:]
+    return backend, precision, args
+
+
+def parse_line(line, parse_float=None):
+    # Returns (expression, variables, error)
+    line = line.strip()
+    if not line.startswith("{"):
+        return line, None, None
+    try:
+        record = json.loads(line, parse_float=parse_float)
+        expression = record["expression"]
+        variables = record.get("variables")
+    except (ValueError, KeyError, TypeError, AttributeError):
+        return line, None, ValueError('expected {"expression": ..., "variables": {...}}')
+    if not isinstance(expression, str) or not (variables is None or isinstance(variables, dict)):
+        return line, None, ValueError('expected {"expression": ..., "variables": {...}}')
+    return expression, variables, None
+
+
+def evaluate_records(calculator, records):
+    while chunk := list(islice(records, CHUNK_SIZE)):
+        expressions = ["" if error else expression for expression, _, error in chunk]
+        results = calculator.evaluate_many(expressions, [variables for _, variables, _ in chunk], return_exceptions=True)
+        for (expression, _, error), result in zip(chunk, results):
+            yield expression, error or result
+
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,165 @@
+# calculator/pkg/batch.py
+
+from collections.abc import Mapping
+from decimal import localcontext
+from itertools import islice
+
+from .calculator import (
+    _SLOT, CONSTANT, NEGATE, Variable, _power, compile_constants, compile_skeleton, execute, skeletons, variable,
+)
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+CHUNK_SIZE = 4096
+# Smaller groups are cheaper to run one expression at a time than to turn into arrays
+VECTOR_MIN = 16
+
+_ERRORS = (ValueError, ArithmeticError)
+
+
+def evaluate_many(expressions, variables=None, return_exceptions=False, number=float, context=None):
+    # Expressions are read CHUNK_SIZE at a time. Within a chunk those with the same shape share one compiled
+    # program, which runs once over arrays of their constants and variables when NumPy is installed (float only).
+    # A decimal context applies while a chunk is evaluated, never across a yield.
+    expressions = iter(expressions)
+    per_expression = variables is not None and not isinstance(variables, Mapping)
+    bindings = iter(variables) if per_expression else None
+    while chunk := list(islice(expressions, CHUNK_SIZE)):
+        if per_expression:
+            chunk_variables = list(islice(bindings, len(chunk)))
+            if len(chunk_variables) != len(chunk):
+                raise ValueError("fewer variable mappings than expressions")
+        else:
+            chunk_variables = [variables] * len(chunk)
+        if context is None:
+            results = _evaluate_chunk(chunk, chunk_variables, number)
+        else:
+            with localcontext(context):
+                results = _evaluate_chunk(chunk, chunk_variables, number)
+        for result in results:
+            if isinstance(result, Exception) and not return_exceptions:
+                raise result
+            yield result
+
+
+def _evaluate_chunk(expressions, variables, number=float):
+    results = [None] * len(expressions)
+    # Program -> rows of (index, constants), constants being an offset into numbers or a list for odd expressions
+    groups = {}
+    simple = []
+    for index, expression in enumerate(expressions):
+        if "\n" in expression or _SLOT in expression:
+            _add(groups, results, index, expression, number)
+        elif expression and not expression.isspace():
+            simple.append(index)
+
+    shapes, numbers = skeletons([expressions[i] for i in simple])
+    numbers = list(map(number, numbers))
+    by_skeleton = {}
+    offset = 0
+    for index, skeleton in zip(simple, shapes):
+        by_skeleton.setdefault(skeleton, []).append((index, offset))
+        offset += skeleton.count(_SLOT)
+    for skeleton, rows in by_skeleton.items():
+        try:
+            code = compile_skeleton(skeleton)
+        except _ERRORS as e:
+            for index, _ in rows:
+                results[index] = e
+            continue
+        if code is None:
+            for index, _ in rows:
+                _add(groups, results, index, expressions[index], number)
+        else:
+            groups.setdefault(code, []).extend(rows)
+
+    for code, rows in groups.items():
+        width = code.count(CONSTANT)
+        if np is not None and number is float and len(rows) >= VECTOR_MIN:
+            try:
+                if numbers.__class__ is list:
+                    numbers = np.array(numbers, dtype=float)
+                values = _run_columns(code, _constants(rows, numbers, width), [variables[index] for index, _ in rows])
+            except _ERRORS:
+                # A bad binding somewhere in the group, let each row report its own error
+                values = None
+            if values is not None:
+                for (index, _), value in zip(rows, values.tolist()):
+                    results[index] = value
+                # NumPy gives inf/nan where Python raises, so those rows are rerun to get the same answer
+                for row in np.flatnonzero(~np.isfinite(values)).tolist():
+                    index, constants = rows[row]
+                    results[index] = _run_one(code, _row(constants, numbers, width), variables[index], number)
+                continue
+        for index, constants in rows:
+            results[index] = _run_one(code, _row(constants, numbers, width), variables[index], number)
+    return results
+
+
+def _add(groups, results, index, expression, number):
+    try:
+        code, constants = compile_constants(expression, number)
+    except _ERRORS as e:
+        results[index] = e
+        return
+    groups.setdefault(code, []).append((index, constants))
+
+
+def _row(constants, numbers, width):
+    if constants.__class__ is not int:
+        return constants
+    row = numbers[constants:constants + width]
+    return row if row.__class__ is list else row.tolist()
+
+
+def _constants(rows, numbers, width):
+    # (rows x width) matrix, gathered straight from the flat numbers when every row is an offset
+    if all(constants.__class__ is int for _, constants in rows):
+        offsets = np.fromiter((constants for _, constants in rows), dtype=np.intp, count=len(rows))
+        return numbers[offsets[:, None] + np.arange(width)]
+    return np.array([_row(constants, numbers, width) for _, constants in rows], dtype=float).reshape(len(rows), width)
+
+
+def _run_one(code, constants, variables, number=float):
+    try:
+        return execute(code, variables, constants, number)
+    except _ERRORS as e:
+        return e
+
+
+def _run_columns(code, constants, variables):
+    columns = iter(constants.T)
+    bound = {}
+    stack = []
+    with np.errstate(all="ignore"):
+        for instruction in code:
+            if instruction is CONSTANT:
+                stack.append(next(columns))
+            elif instruction is NEGATE:
+                stack[-1] = -stack[-1]
+            elif instruction.__class__ is Variable:
+                name = instruction.name
+                if name not in bound:
+                    bound[name] = np.array([variable(values, name) for values in variables], dtype=float)
+                stack.append(bound[name])
+            elif instruction is _power:
+                # NumPy's ** can differ from the C library's pow in the last place, so powers run one element at
+                # a time through the same function as evaluate(); a failed one becomes nan and its row is rerun
+                b = stack.pop()
+                stack[-1] = np.fromiter(
+                    (_power_or_nan(x, y) for x, y in zip(stack[-1].tolist(), b.tolist())), dtype=float, count=len(b),
+                )
+            else:
+                b = stack.pop()
+                stack[-1] = instruction(stack[-1], b)
+    return stack[0]
+
+
+def _power_or_nan(a, b):
+    try:
+        return _power(a, b)
+    except _ERRORS:
+        return float("nan")
@@ -1,61 +1,300 @@
 # calculator/pkg/calculator.py
 
-class Calculator:
-    def __init__(self):
-        self.operators = {
-            "+": lambda a, b: a + b,
-            "-": lambda a, b: a - b,
-            "*": lambda a, b: a * b,
-            "/": lambda a, b: a / b,
-        }
-        self.precedence = {
-            "+": 1,
-            "-": 1,
-            "*": 2,
-            "/": 2,
-        }
-
-    def evaluate(self, expression):
-        if not expression or expression.isspace():
-            return None
-        tokens = expression.strip().split()
-        return self._evaluate_infix(tokens)
-
-    def _evaluate_infix(self, tokens):
-        values = []
-        operators = []
-
-        for token in tokens:
-            if token in self.operators:
-                while (
-                    operators
-                    and operators[-1] in self.operators
-                    and self.precedence[operators[-1]] >= self.precedence[token]
-                ):
-                    self._apply_operator(operators, values)
-                operators.append(token)
+import operator
+import re
+from decimal import Context, Decimal, DecimalException, InvalidOperation, Overflow, localcontext
+from fractions import Fraction
+from functools import lru_cache, partial
+from typing import NamedTuple
+
+CACHE_SIZE = 1024
+# Largest numerator or denominator a fraction power may build, about the 4300 digits Python will print
+FRACTION_MAX_BITS = 14_000
+
+# Numbers, operators, variable names, or a run of anything else (reported as an invalid token)
+_TOKEN = re.compile(r"(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?|\*\*|[-+*/^()#]|[A-Za-z_]\w*|[^\s\w+\-*/^()#]+")
+# A number standing on its own, which the skeleton of an expression replaces with _SLOT
+# (the leading lookahead lets the regex engine skip to candidate positions quickly)
+_NUMBER = re.compile(r"(?=[\d.])(?<![\w.])((?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)(?![\w.])")
+_SLOT = "#"
+
+
+def _power(a, b):
+    if b.__class__ is Fraction:
+        if b.denominator != 1:
+            # Fraction would hand back a float, exact results only take whole exponents
+            raise ValueError(f"{a} ** {b} is not exact, fraction exponents must be whole numbers")
+        if max(a.numerator.bit_length(), a.denominator.bit_length()) * abs(b.numerator) > FRACTION_MAX_BITS:
+            raise OverflowError("result is too large")
+    try:
+        result = a ** b
+    except InvalidOperation:
+        # Decimal's answer to a negative base with a fractional exponent
+        raise ValueError(f"{a} ** {b} is not a real number") from None
+    if isinstance(result, complex):
+        raise ValueError(f"{a} ** {b} is not a real number")
+    if result.__class__ is Decimal and not result.is_finite():
+        raise ZeroDivisionError(f"{a} cannot be raised to a negative power")
+    return result
+
+
+OPERATORS = {
+    "+": operator.add,
+    "-": operator.sub,
+    "*": operator.mul,
+    "/": operator.truediv,
+    "**": _power,
+    "^": _power,
+}
+
+# Numeric backends: the type every number of an expression and every variable becomes
+BACKENDS = {"float": float, "decimal": Decimal, "fraction": Fraction}
+DEFAULT_PRECISION = 28
+
+_NUMBER_START = frozenset("0123456789.")
+NEGATE = "neg"
+# Stands for the next number of the expression in a shape and in the code compiled from it
+CONSTANT = object()
+
+# Operator -> (pop bound, (precedence, instruction)). Pending operators whose precedence is at least the bound
+# are emitted first: the bound is the precedence itself for left-associative operators and one more for
+# right-associative ones. Unary minus binds tighter than * and /, but looser than ** so -2 ** 2 is -(2 ** 2).
+_BINARY = {
+    "+": (1, (1, operator.add)),
+    "-": (1, (1, operator.sub)),
+    "*": (2, (2, operator.mul)),
+    "/": (2, (2, operator.truediv)),
+    "**": (5, (4, _power)),
+    "^": (5, (4, _power)),
+}
+_UNARY_MINUS = (3, NEGATE)
+_OPEN = (0, "(")
+
+
+class Variable(NamedTuple):
+    name: str
+
+
+class Program(NamedTuple):
+    expression: str
+    # Postfix instructions: a number is pushed, a Variable pushes its bound value, an operator function pops
+    # two values and pushes the result, NEGATE flips the sign of the top value
+    code: tuple
+    # float, Decimal or Fraction, the type of the numbers in code
+    number: type = float
+
+
+def tokenize(expression, number=float):
+    # Most expressions are written with spaces between tokens, only chunks like "(3+5" need the regex.
+    # Numbers come back converted by number, anything else as its text.
+    tokens = []
+    for chunk in expression.split():
+        if chunk.isdecimal():
+            tokens.append(number(chunk))
+        elif chunk in _BINARY or chunk == "(" or chunk == ")":
+            tokens.append(chunk)
+        else:
+            for token in _TOKEN.findall(chunk):
+                if token[0] in _NUMBER_START:
+                    try:
+                        token = number(token)
+                    except (ValueError, InvalidOperation):
+                        pass
+                tokens.append(token)
+    return tokens
+
+
+def split_constants(tokens):
+    # "3 * x + 4" and "5 * x + 1" have the same shape, (CONSTANT, "*", "x", "+", CONSTANT), and differ only in constants
+    shape = []
+    constants = []
+    for token in tokens:
+        if token.__class__ is not str:
+            shape.append(CONSTANT)
+            constants.append(token)
+        else:
+            shape.append(token)
+    return tuple(shape), constants
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def compile_shape(shape):
+    # Checks and converts the tokens to postfix in one pass (shunting-yard with operand/operator states).
+    # Operands keep their order, so the constants of an expression fill the CONSTANT slots left to right.
+    code = []
+    emit = code.append
+    pending = []
+    expect_operand = True
+    last_operator = None
+    for token in shape:
+        if token is CONSTANT or token.isidentifier():
+            if not expect_operand:
+                raise ValueError("invalid expression")
+            emit(token if token is CONSTANT else Variable(token))
+            expect_operand = False
+            continue
+        binary = _BINARY.get(token)
+        if binary is not None:
+            last_operator = token
+            if expect_operand:
+                if token != "-":
+                    raise ValueError(f"not enough operands for operator {token}")
+                pending.append(_UNARY_MINUS)
+                continue
+            bound = binary[0]
+            while pending and pending[-1][0] >= bound:
+                emit(pending.pop()[1])
+            pending.append(binary[1])
+            expect_operand = True
+        elif token == "(":
+            if not expect_operand:
+                raise ValueError("invalid expression")
+            pending.append(_OPEN)
+        elif token == ")":
+            if expect_operand:
+                if pending and pending[-1] is _OPEN:
+                    raise ValueError("empty parentheses")
+                raise ValueError(f"not enough operands for operator {last_operator}" if last_operator else "unbalanced parentheses")
+            while pending and pending[-1] is not _OPEN:
+                emit(pending.pop()[1])
+            if not pending:
+                raise ValueError("unbalanced parentheses")
+            pending.pop()
+        else:
+            raise ValueError(f"invalid token: {token}")
+
+    if expect_operand:
+        raise ValueError(f"not enough operands for operator {last_operator}" if last_operator else "invalid expression")
+    while pending:
+        entry = pending.pop()
+        if entry is _OPEN:
+            raise ValueError("unbalanced parentheses")
+        emit(entry[1])
+    return tuple(code)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def compile_skeleton(skeleton):
+    # None when the skeleton still holds a number the regex left alone (like "1e"), the caller tokenizes instead
+    shape = tuple(CONSTANT if token == _SLOT else token for token in tokenize(skeleton))
+    if any(token.__class__ is float for token in shape):
+        return None
+    return compile_shape(shape)
+
+
+def skeletons(expressions):
+    # One regex pass over many expressions (none may hold a newline or _SLOT).
+    # Returns (their skeletons, all of their numbers as text, in order); skeleton.count(_SLOT) says how many are its own.
+    parts = _NUMBER.split("\n".join(expressions))
+    return _SLOT.join(parts[0::2]).split("\n"), parts[1::2]
+
+
+def compile_constants(expression, number=float):
+    # Returns (code with CONSTANT slots, the expression's constants). "3 + 5" and "4 + 1" have the same
+    # skeleton, "# + #", so after the first one this is two regex passes and a cache hit.
+    if _SLOT not in expression:
+        # split() alternates text and numbers: ["", "3", " + ", "5", ""]
+        parts = _NUMBER.split(expression)
+        code = compile_skeleton(_SLOT.join(parts[0::2]))
+        if code is not None:
+            return code, [number(text) for text in parts[1::2]]
+    shape, constants = split_constants(tokenize(expression, number))
+    return compile_shape(shape), constants
+
+
+def bind(code, constants):
+    if not constants:
+        return code
+    values = iter(constants)
+    return tuple(next(values) if instruction is CONSTANT else instruction for instruction in code)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def compile_expression(expression, number=float):
+    # Shapes are shared by every backend, only the constants bound into the program are of type number
+    code, constants = compile_constants(expression, number)
+    return Program(expression, bind(code, constants), number)
+
+
+def variable(variables, name, number=float):
+    try:
+        value = variables[name]
+    except (KeyError, TypeError):
+        raise ValueError(f"unknown variable: {name}") from None
+    try:
+        if number is float:
+            return float(value)
+        # A float binding (say 0.1 read from JSON) means the number it prints as, not its binary expansion
+        return number(repr(value)) if value.__class__ is float else number(value)
+    except (TypeError, ValueError, InvalidOperation):
+        raise ValueError(f"variable {name} is not a number: {value!r}") from None
+
+
+def run(program, variables=None):
+    return execute(program.code, variables, (), program.number)
+
+
+def execute(code, variables=None, constants=(), number=float):
+    # Runs compiled code; CONSTANT slots (code straight from compile_shape) take the constants in order
+    stack = []
+    push = stack.append
+    pop = stack.pop
+    values = iter(constants)
+    try:
+        for instruction in code:
+            if instruction.__class__ is number:
+                push(instruction)
+            elif instruction is CONSTANT:
+                push(next(values))
+            elif instruction is NEGATE:
+                stack[-1] = -stack[-1]
+            elif instruction.__class__ is Variable:
+                push(variable(variables, instruction.name, number))
             else:
-                try:
-                    values.append(float(token))
-                except ValueError:
-                    raise ValueError(f"invalid token: {token}")
+                b = pop()
+                stack[-1] = instruction(stack[-1], b)
+    except ArithmeticError as e:
+        if number is float:
+            raise
+        raise _readable(e) from None
+    return stack[0]
+
 
-        while operators:
-            self._apply_operator(operators, values)
+def _readable(error):
+    # Decimal signals print as a list of classes and a Fraction divided by zero as "Fraction(1, 0)". Past _power,
+    # the only invalid decimal operation left is 0 / 0.
+    if isinstance(error, InvalidOperation) or (
+        isinstance(error, ZeroDivisionError) and (isinstance(error, DecimalException) or str(error).startswith("Fraction("))
+    ):
+        return ZeroDivisionError("division by zero")
+    if isinstance(error, Overflow):
+        return OverflowError("result is too large")
+    return error
 
-        if len(values) != 1:
-            raise ValueError("invalid expression")
 
-        return values[0]
+class Calculator:
+    # backend is "float" (the default and fastest), "decimal" (rounded to precision significant digits,
+    # in this calculator only) or "fraction" (exact rationals)
+    def __init__(self, backend="float", precision=DEFAULT_PRECISION):
+        if backend not in BACKENDS:
+            raise ValueError(f"unknown backend: {backend} (choose from {', '.join(BACKENDS)})")
+        self.backend = backend
+        self.number = BACKENDS[backend]
+        self.context = Context(prec=precision) if self.number is Decimal else None
+        self.operators = OPERATORS
+        # A lone str argument is its own cache key, so floats keep the cheapest lookup
+        self.compile = compile_expression if self.number is float else partial(compile_expression, number=self.number)
 
-    def _apply_operator(self, operators, values):
-        if not operators:
-            return
+    def evaluate(self, expression, variables=None):
+        if not expression or expression.isspace():
+            return None
+        if self.context is None:
+            return run(self.compile(expression), variables)
+        with localcontext(self.context):
+            return run(self.compile(expression), variables)
 
-        operator = operators.pop()
-        if len(values) < 2:
-            raise ValueError(f"not enough operands for operator {operator}")
+    def evaluate_many(self, expressions, variables=None, return_exceptions=False):
+        # Yields results in order; variables is one mapping for every expression or one per expression
+        from .batch import evaluate_many
 
-        b = values.pop()
-        a = values.pop()
-        values.append(self.operators[operator](a, b))
\ No newline at end of file
+        return evaluate_many(expressions, variables, return_exceptions, self.number, self.context)
@@ -1,16 +1,103 @@
 # calculator/pkg/render.py
 
 import json
+import math
+import sys
+from decimal import Decimal
+from fractions import Fraction
+from functools import lru_cache
+from json.encoder import encode_basestring_ascii
 
+EMPTY_EXPRESSION = "Expression is empty or contains only whitespace."
+# Lines held before a write to the underlying stream when it isn't a terminal
+BUFFER_LINES = 4096
 
-def format_json_output(expression: str, result: float, indent: int = 2) -> str:
+
+# Encoded in the result's place, then swapped for its exact JSON text (the json module has no raw numbers)
+_RESULT = "\0result\0"
+_RESULT_JSON = json.dumps(_RESULT)
+
+
+def result_json(result) -> str:
+    # Whole numbers print without a fraction part. Decimals keep every digit, as a JSON number; a fraction that
+    # isn't whole can't be a JSON number, so it is the string "numerator/denominator".
+    if result.__class__ is Decimal:
+        if not result.is_finite():
+            return "NaN" if result.is_nan() else ("-Infinity" if result < 0 else "Infinity")
+        if result == result.to_integral_value():
+            return format(result.to_integral_value(), "f")
+        return str(result)
+    if result.__class__ is Fraction:
+        return str(result.numerator) if result.denominator == 1 else f'"{result}"'
     if isinstance(result, float) and result.is_integer():
-        result_to_dump = int(result)
-    else:
-        result_to_dump = result
-
-    output_data = {
-        "expression": expression,
-        "result": result_to_dump,
-    }
-    return json.dumps(output_data, indent=indent)
\ No newline at end of file
+        return str(int(result))
+    return json.dumps(result)
+
+
+_COMPACT = json.JSONEncoder(separators=(",", ":"), check_circular=False)
+
+
+@lru_cache(maxsize=None)
+def _encoder(indent):
+    # Same output as json.dumps(..., indent=indent)
+    return json.JSONEncoder(indent=indent)
+
+
+def _encode(encoder, expression, result) -> str:
+    if isinstance(result, Exception):
+        return encoder.encode({"expression": expression, "error": str(result)})
+    if result is None:
+        return encoder.encode({"expression": expression, "error": EMPTY_EXPRESSION})
+    # The result comes last, so its placeholder is the last match even if the expression holds the same text
+    head, _, tail = encoder.encode({"expression": expression, "result": _RESULT}).rpartition(_RESULT_JSON)
+    return head + result_json(result) + tail
+
+
+def format_json_output(expression: str, result, indent: int = 2) -> str:
+    # result is a float, Decimal or Fraction, written without losing a digit
+    return _encode(_encoder(indent), expression, result)
+
+
+class JsonLinesWriter:
+    # Streams one JSON object per result. Compact NDJSON through one reusable encoder, buffered BUFFER_LINES at a
+    # time; on a terminal (or with pretty=True) each result is indented and written as soon as it arrives.
+
+    def __init__(self, stream=None, pretty=None):
+        self.stream = stream if stream is not None else sys.stdout
+        interactive = bool(getattr(self.stream, "isatty", lambda: False)())
+        self.pretty = interactive if pretty is None else pretty
+        self.interactive = interactive
+        self._encoder = _encoder(2) if self.pretty else _COMPACT
+        self._lines = []
+
+    def write(self, expression, result):
+        # The usual record, a finite float result, is put together directly: the same text the encoder writes
+        if not self.pretty and result.__class__ is float and expression.__class__ is str and math.isfinite(result):
+            number = str(int(result)) if result.is_integer() else float.__repr__(result)
+            self._lines.append(f'{{"expression":{encode_basestring_ascii(expression)},"result":{number}}}')
+            if self.interactive or len(self._lines) >= BUFFER_LINES:
+                self.flush()
+            return
+        self._lines.append(_encode(self._encoder, expression, result))
+        if self.interactive or len(self._lines) >= BUFFER_LINES:
+            self.flush()
+
+    def flush(self):
+        if self._lines:
+            self._lines.append("")
+            self.stream.write("\n".join(self._lines))
+            self._lines.clear()
+        self.stream.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.flush()
+
+
+def write_json_lines(results, stream=None, pretty=None) -> None:
+    # One JSON object per (expression, result) pair; an exception result is written as an error
+    with JsonLinesWriter(stream, pretty) as writer:
+        for expression, result in results:
+            writer.write(expression, result)
@@ -1,7 +1,12 @@
 # calculator/tests.py
 
+import io
+import json
 import unittest
+from decimal import Decimal
+from fractions import Fraction
 from pkg.calculator import Calculator
+from pkg.render import JsonLinesWriter, format_json_output
 
 
 class TestCalculator(unittest.TestCase):
@@ -32,6 +37,59 @@ class TestCalculator(unittest.TestCase):
         result = self.calculator.evaluate("2 * 3 - 8 / 2 + 5")
         self.assertEqual(result, 7)
 
+    def test_without_spaces(self):
+        result = self.calculator.evaluate("3+5*2")
+        self.assertEqual(result, 13)
+
+    def test_parentheses(self):
+        result = self.calculator.evaluate("(3 + 5) * (2 - 4)")
+        self.assertEqual(result, -16)
+
+    def test_unary_minus(self):
+        result = self.calculator.evaluate("-3 * -(2 + 1)")
+        self.assertEqual(result, 9)
+
+    def test_exponentiation(self):
+        self.assertEqual(self.calculator.evaluate("2 ** 3 ** 2"), 512)
+        self.assertEqual(self.calculator.evaluate("-2 ^ 2"), -4)
+        self.assertEqual(self.calculator.evaluate("2 ** -1"), 0.5)
+
+    def test_compiled_expression_is_reused(self):
+        program = self.calculator.compile("1 + 2 * 3")
+        self.assertIs(self.calculator.compile("1 + 2 * 3"), program)
+        self.assertEqual(self.calculator.evaluate("1 + 2 * 3"), 7)
+
+    def test_variables(self):
+        result = self.calculator.evaluate("x * 2 + y", {"x": 3, "y": 0.5})
+        self.assertEqual(result, 6.5)
+
+    def test_unknown_variable(self):
+        with self.assertRaises(ValueError):
+            self.calculator.evaluate("x + 1")
+
+    def test_evaluate_many(self):
+        expressions = ["3 + 5", "x * 2", "", "4 + 1", "x * 3"] * 10
+        results = list(self.calculator.evaluate_many(expressions, {"x": 2}))
+        self.assertEqual(results[:5], [8, 4, None, 5, 6])
+        self.assertEqual(len(results), 50)
+
+    def test_evaluate_many_matches_evaluate(self):
+        expressions = [f"{n} / (x - {n % 3}) ** 2" for n in range(40)]
+        expressions += [f"{n} ** 0.5 / x - 0.5" for n in range(300)] + [f"(x - 2) ^ {n / 7}" for n in range(40)]
+        bindings = [{"x": n % 4} for n in range(len(expressions))]
+        results = list(self.calculator.evaluate_many(expressions, bindings, return_exceptions=True))
+        for expression, variables, result in zip(expressions, bindings, results):
+            try:
+                expected = self.calculator.evaluate(expression, variables)
+            except (ZeroDivisionError, ValueError) as e:
+                self.assertIsInstance(result, type(e))
+            else:
+                self.assertEqual(result, expected)
+
+    def test_evaluate_many_raises(self):
+        with self.assertRaises(ValueError):
+            list(self.calculator.evaluate_many(["1 + 1", "$ 3 5"]))
+
     def test_empty_expression(self):
         result = self.calculator.evaluate("")
         self.assertIsNone(result)
@@ -44,6 +102,93 @@ class TestCalculator(unittest.TestCase):
         with self.assertRaises(ValueError):
             self.calculator.evaluate("+ 3")
 
+    def test_unbalanced_parentheses(self):
+        for expression in ("(3 + 5", "3 + 5)", "()"):
+            with self.assertRaises(ValueError):
+                self.calculator.evaluate(expression)
+
+
+class TestBackends(unittest.TestCase):
+    def test_decimal(self):
+        calculator = Calculator("decimal")
+        self.assertEqual(calculator.evaluate("0.1 + 0.2"), Decimal("0.3"))
+        self.assertEqual(Calculator("decimal", precision=40).evaluate("2 ** 100 + 1"), 2**100 + 1)
+        self.assertEqual(calculator.evaluate("x * 3", {"x": 0.1}), Decimal("0.3"))
+
+    def test_decimal_precision(self):
+        self.assertEqual(Calculator("decimal", precision=5).evaluate("1 / 3"), Decimal("0.33333"))
+        self.assertEqual(Calculator("decimal", precision=40).evaluate("1 / 3"), Decimal("0." + "3" * 40))
+
+    def test_fraction(self):
+        calculator = Calculator("fraction")
+        self.assertEqual(calculator.evaluate("1 / 3 + 1 / 6"), Fraction(1, 2))
+        self.assertEqual(calculator.evaluate("(2 / 3) ** -2"), Fraction(9, 4))
+        with self.assertRaises(ValueError):
+            calculator.evaluate("2 ** 0.5")
+
+    def test_errors(self):
+        for backend in ("decimal", "fraction"):
+            calculator = Calculator(backend)
+            for expression in ("1 / 0", "0 / 0"):
+                with self.assertRaisesRegex(ZeroDivisionError, "division by zero"):
+                    calculator.evaluate(expression)
+            with self.assertRaises(OverflowError):
+                calculator.evaluate("10 ** 10 ** 10")
+        with self.assertRaises(ValueError):
+            Calculator("complex")
+
+    def test_evaluate_many_matches_evaluate(self):
+        expressions = [f"{n} / (x - {n % 3}) + 0.1" for n in range(40)]
+        bindings = [{"x": n % 4} for n in range(40)]
+        for backend in ("decimal", "fraction"):
+            calculator = Calculator(backend, precision=12)
+            results = list(calculator.evaluate_many(expressions, bindings, return_exceptions=True))
+            for expression, variables, result in zip(expressions, bindings, results):
+                try:
+                    expected = calculator.evaluate(expression, variables)
+                except ZeroDivisionError:
+                    self.assertIsInstance(result, ZeroDivisionError)
+                else:
+                    self.assertEqual(result, expected)
+                    self.assertIs(result.__class__, calculator.number)
+
+    def test_backends_share_compiled_shapes(self):
+        self.assertEqual(Calculator().evaluate("0.1 + 0.2"), 0.1 + 0.2)
+        self.assertEqual(Calculator("fraction").evaluate("0.1 + 0.2"), Fraction(3, 10))
+        self.assertEqual(Calculator().evaluate("0.1 + 0.2"), 0.1 + 0.2)
+
+
+class TestRender(unittest.TestCase):
+    def test_json_lines(self):
+        stream = io.StringIO()
+        with JsonLinesWriter(stream) as writer:
+            writer.write("3 + 5", 8.0)
+            writer.write("1 / 3", 1 / 3)
+            writer.write("1 / 0", ZeroDivisionError("float division by zero"))
+            writer.write("", None)
+        lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+        self.assertEqual(lines[0], {"expression": "3 + 5", "result": 8})
+        self.assertEqual(lines[1]["result"], 1 / 3)
+        self.assertEqual(lines[2], {"expression": "1 / 0", "error": "float division by zero"})
+        self.assertIn("error", lines[3])
+
+    def test_pretty(self):
+        stream = io.StringIO()
+        with JsonLinesWriter(stream, pretty=True) as writer:
+            writer.write("3 + 5", 8.0)
+        self.assertEqual(stream.getvalue(), '{\n  "expression": "3 + 5",\n  "result": 8\n}\n')
+
+    def test_exact_results(self):
+        digits = "0." + "3" * 40
+        self.assertEqual(json.loads(format_json_output("1 / 3", Decimal(digits)), parse_float=Decimal)["result"], Decimal(digits))
+        self.assertEqual(json.loads(format_json_output("8", Decimal("8.0")))["result"], 8)
+        self.assertEqual(json.loads(format_json_output("1 / 3", Fraction(1, 3)))["result"], "1/3")
+        self.assertEqual(json.loads(format_json_output("big", Fraction(2**80)))["result"], 2**80)
+        stream = io.StringIO()
+        with JsonLinesWriter(stream) as writer:
+            writer.write("0.1 + 0.2", Decimal("0.3"))
+        self.assertEqual(stream.getvalue(), '{"expression":"0.1 + 0.2","result":0.3}\n')
+
 
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
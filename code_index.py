@@ -0,0 +1,544 @@
+"""
+Persistent trigram index of a working directory for search_code.
+Every text file is reduced to the set of (case-folded) 3-byte sequences it contains; a query only opens the files
+that contain every trigram of the literals its pattern requires, then confirms matches with the real regex.
+
+On disk (config.CODE_INDEX_DIR/<hash of root>/) a segment holds sorted trigrams, offsets and posting lists of file
+ids, plus meta.json with the file table. Files changed since the segment was written live in an in-memory overlay
+and are folded into a new segment once there are more than config.CODE_INDEX_OVERLAY_FILES of them. Indexes whose
+root directory is gone are deleted by prune(), which the first index_for call of a process runs.
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+from re import _parser as sre_parse
+from typing import NamedTuple
+
+import config
+import dir_index
+import tracing
+
+_VERSION = 1
+_LINE_CHARS = 200
+# Same reasoning as dir_index: a file written within the current mtime tick may change again unnoticed
+_RACY_NS = 10_000_000
+# Rough cost of one binary search probe relative to hashing one posting list entry
+_PROBE_COST = 16
+
+
+class FileRecord(NamedTuple):
+    path: str
+    mtime_ns: int
+    size: int
+    is_text: bool
+
+
+class Match(NamedTuple):
+    path: str
+    line: int
+    text: str
+
+
+def trigrams(data: bytes) -> set[int]:
+    '''
+    Returns: Every 3-byte sequence in data as a 24-bit int
+    '''
+    # Collecting the distinct slices first keeps int conversion off the per-byte path
+    return {int.from_bytes(t, "big") for t in {data[i:i + 3] for i in range(len(data) - 2)}}
+
+
+def _normalize(text: str) -> bytes:
+    return text.casefold().encode("utf-8")
+
+
+def required_literals(pattern: str, is_regex: bool) -> list[str]:
+    '''
+    Works out literal strings every match of pattern must contain, from the pattern as the re module parses it
+    (so escapes, classes and flags mean what they mean to the regex). Conservative: only runs of plain
+    characters count, and nothing is taken from alternatives, optional repeats, negative lookarounds or
+    conditionals.
+    Returns: The literal runs (possibly empty, meaning every file has to be searched)
+
+    :param pattern: Query as given by the model
+    :param is_regex: False when pattern is a plain substring
+    '''
+    if not is_regex:
+        return [pattern]
+    try:
+        parsed = sre_parse.parse(pattern)
+    except (re.error, RecursionError, OverflowError):
+        return []
+    runs: list[str] = []
+    current: list[str] = []
+    _collect(parsed, runs, current)
+    if current:
+        runs.append("".join(current))
+    return runs
+
+
+def _collect(items, runs: list[str], current: list[str]) -> None:
+    # Appends to current while the items are consecutive literal characters; anything else ends the run
+    def end_run() -> None:
+        if current:
+            runs.append("".join(current))
+            current.clear()
+
+    for op, av in items:
+        if op is sre_parse.LITERAL:
+            current.append(chr(av))
+        elif op is sre_parse.SUBPATTERN:
+            # (group, add_flags, del_flags, items): a group is just its items in sequence
+            _collect(av[3], runs, current)
+        elif op is sre_parse.ATOMIC_GROUP:
+            _collect(av, runs, current)
+        elif op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT, sre_parse.POSSESSIVE_REPEAT):
+            end_run()
+            low, _, body = av
+            if low >= 1:
+                # Repeated at least once, so one copy of the body is in every match
+                _collect(body, runs, current)
+                end_run()
+        elif op is sre_parse.ASSERT:
+            # A positive lookaround's text is in the file too, just not next to the surrounding runs
+            end_run()
+            _collect(av[1], runs, current)
+            end_run()
+        else:
+            # Classes, anchors, alternation, negative lookarounds, back references and conditionals
+            end_run()
+
+
+def _contains(sorted_ids: array, file_id: int) -> bool:
+    i = bisect_left(sorted_ids, file_id)
+    return i < len(sorted_ids) and sorted_ids[i] == file_id
+
+
+def _read_text(path: Path) -> str | None:
+    # None for binary files, which are tracked but never searched
+    with open(path, "rb") as f:
+        data = f.read()
+    if b"\0" in data[:8192]:
+        return None
+    return data.decode("utf-8", errors="replace")
+
+
+def _atomic_write(path: Path, data: bytes) -> None:
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+class CodeIndex:
+    '''
+    Trigram index of one root directory. Paths are relative to root and use "/".
+
+    :param root: Resolved directory to index
+    :param store: Directory holding the on-disk segments of every root
+    '''
+
+    def __init__(self, root: Path, store: str = config.CODE_INDEX_DIR):
+        self.root = root
+        self.directory = Path(store) / hashlib.sha256(str(root).encode("utf-8")).hexdigest()[:16]
+        self._lock = threading.RLock()
+        self._generation = 0
+        self._files: list[FileRecord | None] = []
+        self._ids: dict[str, int] = {}
+        self._lexicon = array("I")
+        self._offsets = array("Q", [0])
+        self._postings: mmap.mmap | bytes = b""
+        self._overlay: dict[str, tuple[FileRecord, frozenset[int]]] = {}
+        self._stale = True
+        self._load()
+
+    # --- segment on disk ---
+
+    def _segment(self, generation: int) -> Path:
+        return self.directory / f"segment-{generation}"
+
+    def _load(self) -> None:
+        try:
+            meta = json.loads((self.directory / "meta.json").read_text(encoding="utf-8"))
+        except (FileNotFoundError, json.JSONDecodeError):
+            return
+        if meta.get("version") != _VERSION or meta.get("root") != str(self.root):
+            return
+        segment = self._segment(meta["generation"])
+        lexicon = array("I")
+        offsets = array("Q")
+        try:
+            lexicon.frombytes((segment / "lexicon.bin").read_bytes())
+            offsets.frombytes((segment / "offsets.bin").read_bytes())
+            postings = self._map(segment / "postings.bin")
+        except FileNotFoundError:
+            return
+        self._generation = meta["generation"]
+        self._files = [FileRecord(*f) if f else None for f in meta["files"]]
+        self._ids = {f.path: i for i, f in enumerate(self._files) if f is not None}
+        self._lexicon, self._offsets, self._postings = lexicon, offsets, postings
+
+    @staticmethod
+    def _map(path: Path) -> mmap.mmap | bytes:
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return b""
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def _posting(self, trigram: int) -> array:
+        ids = array("I")
+        i = bisect_left(self._lexicon, trigram)
+        if i < len(self._lexicon) and self._lexicon[i] == trigram:
+            ids.frombytes(self._postings[self._offsets[i] * ids.itemsize:self._offsets[i + 1] * ids.itemsize])
+        return ids
+
+    def _write_segment(self, bulk: list[tuple[str, int, int]] = ()) -> None:
+        '''
+        Writes a new segment holding everything in the old one plus the overlay and any bulk files, which are
+        read here and never kept as per-file trigram sets. Overlay and bulk files get fresh ids, larger than
+        every existing id, so posting lists stay sorted by appending. Ids of replaced or deleted files stay in
+        old posting lists and are skipped at query time; the segment is rebuilt when they outnumber live files.
+
+        :param bulk: (relative path, size, mtime_ns) of files to index straight into the segment
+        '''
+        added: dict[int, array] = {}
+        pending = {relative: None for relative in self._overlay}
+        pending.update({relative: (size, mtime_ns) for relative, size, mtime_ns in bulk})
+        for relative in sorted(pending):
+            if relative in self._overlay:
+                record, grams = self._overlay[relative]
+            else:
+                try:
+                    record, grams = self._record(relative, *pending[relative])
+                except OSError:
+                    continue
+            file_id = len(self._files)
+            self._files.append(record)
+            self._ids[relative] = file_id
+            for trigram in grams:
+                ids = added.get(trigram)
+                if ids is None:
+                    ids = added[trigram] = array("I")
+                ids.append(file_id)
+        self._overlay.clear()
+
+        generation = self._generation + 1
+        segment = self._segment(generation)
+        shutil.rmtree(segment, ignore_errors=True)
+        segment.mkdir(parents=True)
+        lexicon = array("I")
+        offsets = array("Q", [0])
+        itemsize = lexicon.itemsize
+        old = {trigram: i for i, trigram in enumerate(self._lexicon)}
+        with open(segment / "postings.bin", "wb") as out:
+            for trigram in sorted(old.keys() | added.keys()):
+                count = 0
+                i = old.get(trigram)
+                if i is not None:
+                    # Unchanged lists are copied as raw bytes
+                    out.write(self._postings[self._offsets[i] * itemsize:self._offsets[i + 1] * itemsize])
+                    count += self._offsets[i + 1] - self._offsets[i]
+                new_ids = added.get(trigram)
+                if new_ids is not None:
+                    out.write(new_ids.tobytes())
+                    count += len(new_ids)
+                lexicon.append(trigram)
+                offsets.append(offsets[-1] + count)
+        (segment / "lexicon.bin").write_bytes(lexicon.tobytes())
+        (segment / "offsets.bin").write_bytes(offsets.tobytes())
+
+        meta = {"version": _VERSION, "root": str(self.root), "generation": generation,
+                "files": [list(f) if f else None for f in self._files]}
+        _atomic_write(self.directory / "meta.json", json.dumps(meta).encode("utf-8"))
+        if not (self.directory / "root").exists():
+            # Lets prune() find the root without reading the whole file table
+            _atomic_write(self.directory / "root", str(self.root).encode("utf-8"))
+
+        previous, mapped = self._segment(self._generation), self._postings
+        self._generation = generation
+        self._lexicon, self._offsets = lexicon, offsets
+        self._postings = self._map(segment / "postings.bin")
+        if isinstance(mapped, mmap.mmap):
+            mapped.close()
+        shutil.rmtree(previous, ignore_errors=True)
+
+    def delete(self) -> None:
+        '''
+        Removes the index from disk, for a root that is going away; the index must not be used afterwards
+        '''
+        with self._lock:
+            mapped, self._postings = self._postings, b""
+            if isinstance(mapped, mmap.mmap):
+                mapped.close()
+            shutil.rmtree(self.directory, ignore_errors=True)
+
+    def _rebuild(self, files: list[tuple[str, int, int]]) -> None:
+        # Starts from an empty segment so dead ids are gone from every posting list
+        self._files, self._ids, self._overlay = [], {}, {}
+        self._lexicon, self._offsets, self._postings = array("I"), array("Q", [0]), b""
+        self._write_segment(files)
+
+    # --- keeping up with the working directory ---
+
+    def _record(self, relative: str, entry_size: int, mtime_ns: int) -> tuple[FileRecord, frozenset[int]]:
+        path = self.root / relative
+        text = _read_text(path) if entry_size <= config.CODE_INDEX_MAX_FILE_BYTES else None
+        # A racy mtime is stored as -1 so the next refresh reads the file again
+        if time.time_ns() - mtime_ns <= _RACY_NS:
+            mtime_ns = -1
+        record = FileRecord(relative, mtime_ns, entry_size, text is not None)
+        return record, frozenset(trigrams(_normalize(text))) if text is not None else frozenset()
+
+    def _current(self, relative: str) -> FileRecord | None:
+        if relative in self._overlay:
+            return self._overlay[relative][0]
+        file_id = self._ids.get(relative)
+        return self._files[file_id] if file_id is not None else None
+
+    def _put(self, relative: str, entry_size: int, mtime_ns: int) -> None:
+        file_id = self._ids.pop(relative, None)
+        if file_id is not None:
+            self._files[file_id] = None
+        self._overlay[relative] = self._record(relative, entry_size, mtime_ns)
+
+    def _drop(self, relative: str) -> None:
+        file_id = self._ids.pop(relative, None)
+        if file_id is not None:
+            self._files[file_id] = None
+        self._overlay.pop(relative, None)
+
+    def _maybe_commit(self) -> None:
+        if len(self._overlay) > config.CODE_INDEX_OVERLAY_FILES:
+            self._write_segment()
+
+    def refresh(self) -> None:
+        '''
+        Brings the index up to date with the disk. The directory walk comes from dir_index, so on a warm
+        session this costs one stat per directory plus reading the files that actually changed.
+        Many changes at once (first build, a checkout) go straight into a new segment.
+        '''
+        with self._lock:
+            seen: dict[str, tuple[str, int, int]] = {}
+            changed = []
+            for relative, entry in dir_index.INDEX.walk(str(self.root), None, config.LISTING_SKIP_DIRS):
+                # Symlinks may point outside the working directory
+                if entry.is_dir or entry.is_link:
+                    continue
+                seen[relative] = (relative, entry.size, entry.mtime_ns)
+                current = self._current(relative)
+                if current is None or current.mtime_ns != entry.mtime_ns or current.size != entry.size:
+                    changed.append(seen[relative])
+            for relative in [*self._ids, *self._overlay]:
+                if relative not in seen:
+                    self._drop(relative)
+
+            dead = len(self._files) - len(self._ids)
+            if len(changed) + dead > max(len(seen), 1) // 2:
+                self._rebuild(list(seen.values()))
+            elif len(changed) + len(self._overlay) > config.CODE_INDEX_OVERLAY_FILES:
+                for relative, _, _ in changed:
+                    self._drop(relative)
+                self._write_segment(changed)
+            else:
+                for relative, size, mtime_ns in changed:
+                    try:
+                        self._put(relative, size, mtime_ns)
+                    except OSError:
+                        self._drop(relative)
+            self._stale = False
+
+    def update(self, relative: str) -> None:
+        '''
+        Re-indexes one file that was just written
+        '''
+        if any(part in config.LISTING_SKIP_DIRS for part in relative.split("/")[:-1]):
+            return
+        with self._lock:
+            try:
+                st = os.stat(self.root / relative)
+                self._put(relative, st.st_size, st.st_mtime_ns)
+            except OSError:
+                self._drop(relative)
+            self._maybe_commit()
+
+    def mark_stale(self) -> None:
+        '''
+        Makes the next search refresh first, e.g. after running code that may have changed files
+        '''
+        with self._lock:
+            self._stale = True
+
+    # --- queries ---
+
+    def candidates(self, literals: list[str], prefix: str = "") -> list[str]:
+        '''
+        Returns: Sorted relative paths of text files that may match (every file under prefix if there are no trigrams)
+
+        :param literals: Strings every match contains
+        :param prefix: Only paths starting with this ("" for all)
+        '''
+        grams: set[int] = set()
+        for literal in literals:
+            grams |= trigrams(_normalize(literal))
+
+        with self._lock:
+            if self._stale:
+                self.refresh()
+            if grams:
+                lists = sorted((self._posting(t) for t in grams), key=len)
+                ids = set(lists[0])
+                for other in lists[1:]:
+                    if len(ids) * _PROBE_COST < len(other):
+                        # Few candidates left: binary search beats hashing the whole list
+                        ids = {i for i in ids if _contains(other, i)}
+                    else:
+                        ids.intersection_update(other)
+                records = [self._files[i] for i in ids]
+                records += [record for record, file_grams in self._overlay.values() if grams <= file_grams]
+            else:
+                records = [f for f in self._files if f is not None] + [record for record, _ in self._overlay.values()]
+        return sorted(r.path for r in records if r is not None and r.is_text and r.path.startswith(prefix))
+
+    def search(self, regex: re.Pattern, literals: list[str], max_results: int,
+               prefix: str = "") -> tuple[list[Match], bool]:
+        '''
+        Returns: (matches in path then line order, True if more matches were left out)
+
+        :param regex: Compiled query
+        :param literals: Strings every match contains, used to narrow the files opened
+        :param max_results: Stop after this many matching lines
+        :param prefix: Only search paths starting with this
+        '''
+        paths = self.candidates(literals, prefix)
+        matches: list[Match] = []
+        scanned = 0
+        for relative in paths:
+            try:
+                text = _read_text(self.root / relative)
+            except OSError:
+                continue
+            scanned += 1
+            if text is None:
+                continue
+            line_no = 1
+            last = 0
+            last_line = -1
+            for found in regex.finditer(text):
+                line_no += text.count("\n", last, found.start())
+                last = found.start()
+                if line_no == last_line:
+                    continue
+                last_line = line_no
+                if len(matches) == max_results:
+                    tracing.annotate(candidates=len(paths), files_read=scanned)
+                    return matches, True
+                start = text.rfind("\n", 0, found.start()) + 1
+                end = text.find("\n", found.start())
+                line = text[start:end if end != -1 else len(text)].rstrip("\r")
+                matches.append(Match(relative, line_no, line[:_LINE_CHARS]))
+        tracing.annotate(candidates=len(paths), files_read=scanned)
+        return matches, False
+
+    def stats(self) -> str:
+        live = sum(1 for f in self._files if f is not None)
+        return (f"Code index: {live} files in segment {self._generation}, {len(self._overlay)} in overlay, "
+                f"{len(self._lexicon)} trigrams ({self.directory})")
+
+
+_INDEXES: dict[str, CodeIndex] = {}
+_INDEXES_LOCK = threading.Lock()
+# Stores already pruned by this process
+_PRUNED: set[str] = set()
+
+
+def index_for(root: Path) -> CodeIndex:
+    '''
+    Returns: The session's index of root, loaded from disk (or created) on first use
+
+    :param root: Resolved working directory
+    '''
+    with _INDEXES_LOCK:
+        index = _INDEXES.get(str(root))
+        if index is None:
+            if config.CODE_INDEX_DIR not in _PRUNED:
+                _PRUNED.add(config.CODE_INDEX_DIR)
+                prune(config.CODE_INDEX_DIR)
+            index = _INDEXES[str(root)] = CodeIndex(root)
+        return index
+
+
+def prune(store: str = config.CODE_INDEX_DIR) -> int:
+    '''
+    Deletes the on-disk indexes whose root directory no longer exists (temp directories, workspaces closed by
+    another process, moved checkouts). index_for runs it once per process, before opening its first index.
+    Returns: How many indexes were deleted
+
+    :param store: Directory holding the on-disk segments of every root
+    '''
+    try:
+        directories = [d for d in Path(store).iterdir() if d.is_dir()]
+    except FileNotFoundError:
+        return 0
+    removed = 0
+    for directory in directories:
+        root = _stored_root(directory)
+        if root is not None and not os.path.isdir(root):
+            shutil.rmtree(directory, ignore_errors=True)
+            removed += 1
+    return removed
+
+
+def _stored_root(directory: Path) -> str | None:
+    # None for a directory that holds no finished segment yet (or isn't an index), which is left alone
+    try:
+        return (directory / "root").read_text(encoding="utf-8")
+    except FileNotFoundError:
+        pass
+    try:
+        return json.loads((directory / "meta.json").read_text(encoding="utf-8")).get("root")
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def forget(root: Path) -> None:
+    '''
+    Drops the session's index of root and deletes it from disk, if root was ever searched
+
+    :param root: Resolved working directory that is being removed
+    '''
+    with _INDEXES_LOCK:
+        index = _INDEXES.pop(str(root), None)
+    if index is not None:
+        index.delete()
+
+
+def update(target: Path) -> None:
+    '''
+    Re-indexes a written file in every open index whose root contains it
+
+    :param target: Resolved path that was just written
+    '''
+    with _INDEXES_LOCK:
+        indexes = list(_INDEXES.values())
+    for index in indexes:
+        if index.root in target.parents:
+            index.update(target.relative_to(index.root).as_posix())
+
+
+def mark_stale() -> None:
+    '''
+    Makes every open index refresh before its next query
+    '''
+    with _INDEXES_LOCK:
+        indexes = list(_INDEXES.values())
+    for index in indexes:
+        index.mark_stale()
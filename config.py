@@ -7,4 +7,57 @@ WORKING_DIR: str = "./calculator"
 MAX_ITERATIONS: int = 20
 MODEL: str='gemini-2.5-flash'
 MAX_CHARS: int = 10000
-TIMEOUT: int = 30
\ No newline at end of file
+TIMEOUT: int = 30
+PARALLEL_TOOL_CALLS: bool = True
+MAX_TOOL_WORKERS: int = 4
+MAX_PROMPT_TOKENS: int = 100000
+HISTORY_KEEP_RECENT: int = 4
+HISTORY_PREVIEW_CHARS: int = 120
+CHARS_PER_TOKEN: int = 4
+READ_CACHE_BYTES: int = 8 * 1024 * 1024
+READ_CACHE_UNCHANGED_NOTICE: bool = False
+LINE_INDEX_BLOCK: int = 64 * 1024
+LINE_INDEX_FILES: int = 32
+PYTHON_WORKERS: int = 0
+WORKER_PRELOAD: tuple[str, ...] = ("unittest", "json")
+OUTPUT_HEAD_BYTES: int = 4 * 1024
+OUTPUT_TAIL_BYTES: int = 8 * 1024
+OUTPUT_CHUNK_BYTES: int = 64 * 1024
+OUTPUT_DRAIN_TIMEOUT: float = 1.0
+STREAM_RESPONSES: bool = False
+BATCH_CONCURRENCY: int = 8
+REQUESTS_PER_MINUTE: int = 60
+TOKENS_PER_MINUTE: int = 1000000
+MAX_RETRIES: int = 5
+BACKOFF_BASE: float = 1.0
+BACKOFF_MAX: float = 60.0
+RESPONSE_CACHE_MODE: str = "off"
+RESPONSE_CACHE_DIR: str = ".response_cache"
+RESPONSE_CACHE_KEY_TOOL_RESULTS: bool = True
+TRACE_FILE: str | None = None
+LISTING_PAGE_SIZE: int = 200
+LISTING_SKIP_DIRS: tuple[str, ...] = (".git", "__pycache__", ".venv", "node_modules")
+CODE_INDEX_DIR: str = ".code_index"
+CODE_INDEX_MAX_FILE_BYTES: int = 1024 * 1024
+CODE_INDEX_OVERLAY_FILES: int = 256
+SEARCH_MAX_RESULTS: int = 50
+READ_FILES_TOTAL_CHARS: int = 3 * MAX_CHARS
+READ_FILES_MAX_FILES: int = 32
+RUN_TESTS_TIMEOUT: int = 120
+RUN_TESTS_MAX_FAILURES: int = 10
+RUN_TESTS_SLOWEST: int = 5
+RUN_TESTS_SLOW_SECONDS: float = 0.1
+RESPONSE_CACHE_MODES: tuple[str, ...] = ("off", "record", "replay")
+STARTUP_IMPORT_BUDGET_MS: float = 100
+WORKSPACE_DIR: str | None = None
+WORKSPACE_IGNORE: tuple[str, ...] = ("__pycache__",)
+COMPACT_TOOL_RESULTS: bool = True
+TOOL_RESULT_TOKENS: int = 2500
+TOOL_RESULT_TOKENS_BY_TOOL: dict[str, int] = {
+    "get_file_content": MAX_CHARS * 3 // 2 // CHARS_PER_TOKEN,
+    "read_files": READ_FILES_TOTAL_CHARS * 3 // 2 // CHARS_PER_TOKEN,
+}
+TURN_RESULT_TOKENS: int = 16000
+BENCH_RESULTS_DIR: str = ".bench_results"
+SESSION_DIR: str = ".sessions"
+SERVER_SOCKET: str = ".agent.sock"
@@ -0,0 +1,191 @@
+"""
+Per-session index of directory contents for get_files_info.
+Each directory is scanned once with os.scandir and kept until its mtime changes, so listing a large tree again
+only costs one stat per directory. write_file patches the entry it touched instead of forcing a rescan.
+"""
+
+import fnmatch
+import os
+import re
+import stat
+import threading
+import time
+from collections.abc import Callable, Iterator
+from pathlib import Path
+from typing import NamedTuple
+
+# mtime only moves once per clock tick, a directory changed within the last few ms may change again unnoticed
+_RACY_NS = 10_000_000
+
+
+class DirEntry(NamedTuple):
+    name: str
+    size: int
+    is_dir: bool
+    is_link: bool
+    mtime_ns: int
+
+
+class _Scanned(NamedTuple):
+    mtime_ns: int
+    stamp: int
+    entries: tuple[DirEntry, ...]
+
+
+def _scan(directory: str) -> tuple[DirEntry, ...]:
+    entries = []
+    with os.scandir(directory) as it:
+        for entry in it:
+            # is_dir() comes from the dirent type, so each entry costs a single stat for its size
+            try:
+                st = entry.stat()
+                is_dir = entry.is_dir()
+            except OSError:
+                # Dangling symlink, report the link itself
+                st = entry.stat(follow_symlinks=False)
+                is_dir = False
+            entries.append(DirEntry(entry.name, st.st_size, is_dir, entry.is_symlink(), st.st_mtime_ns))
+    entries.sort()
+    return tuple(entries)
+
+
+class DirectoryIndex:
+    '''
+    Cache of scanned directories keyed on their path, validated by directory mtime on every use.
+    Each stored scan gets a stamp, so a listing can tell whether anything it covered has changed.
+    '''
+
+    def __init__(self):
+        self._dirs: dict[str, _Scanned] = {}
+        self._lock = threading.Lock()
+        self._next_stamp = 0
+        self.scans = 0
+        self.reuses = 0
+
+    def _store(self, directory: str, mtime_ns: int, entries: tuple[DirEntry, ...]) -> _Scanned:
+        with self._lock:
+            self._next_stamp += 1
+            scanned = _Scanned(mtime_ns, self._next_stamp, entries)
+            if time.time_ns() - mtime_ns > _RACY_NS:
+                self._dirs[directory] = scanned
+            return scanned
+
+    def scanned(self, directory: str) -> _Scanned:
+        '''
+        Returns: The current contents of directory, rescanning it only if its mtime moved
+
+        :param directory: Absolute path of the directory
+        '''
+        mtime_ns = os.stat(directory).st_mtime_ns
+        with self._lock:
+            cached = self._dirs.get(directory)
+            if cached is not None and cached.mtime_ns == mtime_ns:
+                self.reuses += 1
+                return cached
+            self.scans += 1
+        return self._store(directory, mtime_ns, _scan(directory))
+
+    def _try_scan(self, directory: str) -> _Scanned | None:
+        try:
+            return self.scanned(directory)
+        except (FileNotFoundError, NotADirectoryError, PermissionError):
+            return None
+
+    def walk(self, root: str, max_depth: int | None = None, skip_dirs: tuple[str, ...] = (),
+             visited: list[int] | None = None) -> Iterator[tuple[str, DirEntry]]:
+        '''
+        Depth-first walk in name order, a directory's contents follow straight after its own entry
+        Returns: (yields) (path relative to root using "/", entry)
+
+        :param root: Absolute path of the directory to list
+        :param max_depth: Levels to descend, 1 lists only root, None is unlimited
+        :param skip_dirs: Directory names that are listed but not descended into
+        :param visited: If given, the stamp of every directory scan used is appended to it
+        '''
+        scanned = self._try_scan(root)
+        if scanned is None:
+            return
+        if visited is not None:
+            visited.append(scanned.stamp)
+        stack = [(iter(scanned.entries), root, "", 1)]
+        while stack:
+            entries, directory, prefix, depth = stack[-1]
+            entry = next(entries, None)
+            if entry is None:
+                stack.pop()
+                continue
+            relative = prefix + entry.name
+            yield relative, entry
+            # Symlinked directories are not followed, they could loop or lead out of the working directory
+            if (not entry.is_dir or entry.is_link or entry.name in skip_dirs
+                    or (max_depth is not None and depth >= max_depth)):
+                continue
+            path = os.path.join(directory, entry.name)
+            scanned = self._try_scan(path)
+            if scanned is None:
+                continue
+            if visited is not None:
+                visited.append(scanned.stamp)
+            stack.append((iter(scanned.entries), path, relative + "/", depth + 1))
+
+    def update(self, path: Path) -> None:
+        '''
+        Refreshes the entry for a path that was just written, without rescanning its directory.
+        Newly created parent directories are picked up on the next listing because their parent's mtime moved.
+
+        :param path: Resolved path of the written file
+        '''
+        parent = str(path.parent)
+        with self._lock:
+            cached = self._dirs.get(parent)
+        if cached is None:
+            return
+        try:
+            st = os.stat(path)
+            is_link = path.is_symlink()
+            parent_mtime = os.stat(parent).st_mtime_ns
+        except OSError:
+            self.forget(parent)
+            return
+        entries = {e.name: e for e in cached.entries}
+        entries[path.name] = DirEntry(path.name, st.st_size, stat.S_ISDIR(st.st_mode), is_link, st.st_mtime_ns)
+        self._store(parent, parent_mtime, tuple(sorted(entries.values())))
+
+    def forget(self, directory: str) -> None:
+        with self._lock:
+            self._dirs.pop(directory, None)
+
+    def clear(self) -> None:
+        '''
+        Drops every scan. Used after running code, which can change file sizes without touching directory mtimes.
+        '''
+        with self._lock:
+            self._dirs.clear()
+
+    def stats(self) -> str:
+        return f"Directory index: {len(self._dirs)} directories, {self.scans} scans, {self.reuses} reused"
+
+
+def matcher(pattern: str | None, extensions: list[str] | None) -> Callable[[str, DirEntry], bool]:
+    '''
+    Builds the entry filter for a listing
+    Returns: predicate(relative path, entry) -> bool
+
+    :param pattern: Glob matched against the name, or against the relative path when it contains "/"
+    :param extensions: File extensions to keep (with or without the leading dot), directories never match
+    '''
+    regex = re.compile(fnmatch.translate(pattern)) if pattern else None
+    on_path = bool(pattern) and "/" in pattern
+    suffixes = tuple(e if e.startswith(".") else f".{e}" for e in extensions) if extensions else None
+
+    def keep(relative: str, entry: DirEntry) -> bool:
+        if suffixes is not None and (entry.is_dir or not entry.name.endswith(suffixes)):
+            return False
+        if regex is not None and not regex.match(relative if on_path else entry.name):
+            return False
+        return True
+
+    return keep
+
+
+INDEX = DirectoryIndex()
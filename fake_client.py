@@ -0,0 +1,110 @@
+"""
+Offline stand-in for genai.Client, for tests and benchmarks that must not hit the live API.
+Responses come from a responder function; latency and API errors (e.g. 429) can be injected per call.
+"""
+
+import asyncio
+import threading
+import time
+from collections.abc import Callable, Iterator, Sequence
+from types import SimpleNamespace
+from typing import Any
+
+from google.genai import errors, types
+
+Responder = Callable[[list[types.Content]], types.GenerateContentResponse]
+
+
+def text_response(text: str, prompt_tokens: int = 100, response_tokens: int = 10) -> types.GenerateContentResponse:
+    '''
+    Returns: A response whose only candidate is a text answer
+    '''
+    return types.GenerateContentResponse(
+        candidates=[types.Candidate(content=types.Content(role="model", parts=[types.Part(text=text)]))],
+        usage_metadata=types.GenerateContentResponseUsageMetadata(
+            prompt_token_count=prompt_tokens, candidates_token_count=response_tokens,
+            total_token_count=prompt_tokens + response_tokens,
+        ),
+    )
+
+
+def call_response(calls: Sequence[tuple[str, dict[str, Any]]], prompt_tokens: int = 100,
+                  response_tokens: int = 10) -> types.GenerateContentResponse:
+    '''
+    Returns: A response asking for the given (function name, args) calls, in order
+    '''
+    parts = [types.Part(function_call=types.FunctionCall(name=name, args=args)) for name, args in calls]
+    return types.GenerateContentResponse(
+        candidates=[types.Candidate(content=types.Content(role="model", parts=parts))],
+        usage_metadata=types.GenerateContentResponseUsageMetadata(
+            prompt_token_count=prompt_tokens, candidates_token_count=response_tokens,
+            total_token_count=prompt_tokens + response_tokens,
+        ),
+    )
+
+
+def api_error(code: int) -> errors.APIError:
+    status = {429: "RESOURCE_EXHAUSTED", 500: "INTERNAL", 503: "UNAVAILABLE"}.get(code, "UNKNOWN")
+    body = {"error": {"code": code, "message": "injected by FakeClient", "status": status}}
+    return errors.ClientError(code, body) if code < 500 else errors.ServerError(code, body)
+
+
+class FakeModels:
+    def __init__(self, client: "FakeClient"):
+        self._client = client
+
+    def generate_content(self, *, model: str, contents: list[types.Content], config: Any = None) -> types.GenerateContentResponse:
+        self._client._begin()
+        time.sleep(self._client.latency)
+        return self._client.responder(contents)
+
+    def generate_content_stream(self, *, model: str, contents: list[types.Content], config: Any = None) -> Iterator[types.GenerateContentResponse]:
+        self._client._begin()
+        time.sleep(self._client.latency)
+        response = self._client.responder(contents)
+        # One chunk per part, usage metadata on the last chunk like the real stream
+        parts = response.candidates[0].content.parts
+        for n, part in enumerate(parts):
+            last = n == len(parts) - 1
+            yield types.GenerateContentResponse(
+                candidates=[types.Candidate(content=types.Content(role="model", parts=[part]))],
+                usage_metadata=response.usage_metadata if last else None,
+            )
+
+
+class FakeAsyncModels:
+    def __init__(self, client: "FakeClient"):
+        self._client = client
+
+    async def generate_content(self, *, model: str, contents: list[types.Content], config: Any = None) -> types.GenerateContentResponse:
+        self._client._begin()
+        await asyncio.sleep(self._client.latency)
+        return self._client.responder(contents)
+
+
+class FakeClient:
+    '''
+    Mimics the parts of genai.Client the agent uses: models.generate_content, models.generate_content_stream
+    and aio.models.generate_content.
+
+    :param responder: Builds the response for a given history
+    :param latency: Seconds each call takes
+    :param failures: Error code to raise on the n-th call (None or past the end means succeed)
+    '''
+
+    def __init__(self, responder: Responder, latency: float = 0.0, failures: Sequence[int | None] = ()):
+        self.responder = responder
+        self.latency = latency
+        self.failures = list(failures)
+        self.calls = 0
+        self._lock = threading.Lock()
+        self.models = FakeModels(self)
+        self.aio = SimpleNamespace(models=FakeAsyncModels(self))
+
+    def _begin(self) -> None:
+        with self._lock:
+            n = self.calls
+            self.calls += 1
+        code = self.failures[n] if n < len(self.failures) else None
+        if code is not None:
+            raise api_error(code)
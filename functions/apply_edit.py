@@ -0,0 +1,158 @@
+"""
+All of the relevant information with regards to the apply_edit function.
+This function will change part of a file with search/replace blocks instead of rewriting all of it.
+"""
+
+from pathlib import Path
+from typing import Any
+from google.genai import types
+from functions.write_file import write_atomic
+
+# Lines of each side of a change shown in the summary before it is shortened
+_SUMMARY_LINES = 6
+
+
+schema_apply_edit: types.FunctionDeclaration = types.FunctionDeclaration(
+    name="apply_edit",
+    description="Edits an existing file in place with search/replace blocks, constrained to the working directory. "
+                "Prefer this over write_file for changes to existing files: send only the lines that change. "
+                "Each search text must appear exactly once in the file (copy it exactly, including indentation) "
+                "unless replace_all is set. Edits apply in order and either all succeed or none do.",
+    parameters=types.Schema(
+        type=types.Type.OBJECT,
+        properties={
+            "file_path": types.Schema(
+                type=types.Type.STRING,
+                description="The file path to edit, relative to the working directory.",
+            ),
+            "edits": types.Schema(
+                type=types.Type.ARRAY,
+                description="Search/replace blocks applied one after another.",
+                items=types.Schema(
+                    type=types.Type.OBJECT,
+                    properties={
+                        "search": types.Schema(
+                            type=types.Type.STRING,
+                            description="Exact existing text to replace. Include enough surrounding lines to make it unique.",
+                        ),
+                        "replace": types.Schema(
+                            type=types.Type.STRING,
+                            description="Text to put in its place. Empty deletes the search text.",
+                        ),
+                        "replace_all": types.Schema(
+                            type=types.Type.BOOLEAN,
+                            description="Replace every occurrence instead of requiring exactly one. Defaults to false.",
+                        ),
+                    },
+                    required=["search", "replace"],
+                ),
+            ),
+        },
+        required=["file_path", "edits"],
+    ),
+)
+
+
+def apply_edit(working_directory: str, file_path: str, edits: list[dict[str, Any]]) -> str:
+    '''
+    A function to replace parts of a file in working directory named file_path
+    Returns: A short summary with the changed lines of every edit, or Error: (nothing is written on error)
+
+    :param working_directory: The base of our working area
+    :param file_path: The relative path of the file we want to edit
+    :param edits: List of {"search", "replace", optional "replace_all"} applied in order
+    '''
+    try:
+        base = Path(working_directory).resolve()
+        target = (base / file_path).resolve(strict=False)
+
+        if target != base and base not in target.parents:
+            return f'Error: Cannot edit "{file_path}" as it is outside the permitted working directory'
+
+        if not target.is_file():
+            return f'Error: File not found or is not a regular file: "{file_path}" (use write_file to create it)'
+
+        if not edits:
+            return "Error: No edits given"
+
+        before = target.stat()
+        with open(target, encoding="utf-8", newline="") as f:
+            original = f.read()
+
+        content = original
+        hunks = []
+        for number, edit in enumerate(edits, start=1):
+            search = edit.get("search") or ""
+            replace = edit.get("replace") or ""
+            if not search:
+                return f"Error: Edit {number} has an empty search text"
+            # The model writes \n, keep the file's own line endings
+            if "\r\n" in content and "\r\n" not in search:
+                search, replace = search.replace("\n", "\r\n"), replace.replace("\n", "\r\n")
+
+            positions = _find_all(content, search)
+            if not positions:
+                return f'Error: Edit {number}: search text not found in "{file_path}"{_near_miss(content, search)}'
+            if len(positions) > 1 and not edit.get("replace_all"):
+                lines = ", ".join(str(content.count("\n", 0, p) + 1) for p in positions[:10])
+                return (f'Error: Edit {number}: search text appears {len(positions)} times in "{file_path}" '
+                        f"(lines {lines}). Add surrounding lines to make it unique, or set replace_all")
+
+            hunks.append((content.count("\n", 0, positions[0]) + 1, len(positions), search, replace))
+            content = content.replace(search, replace)
+
+        if content == original:
+            return f'No changes: the edits leave "{file_path}" as it was'
+
+        # Refuse to overwrite changes made by someone else since we read the file
+        after = target.stat()
+        if (after.st_mtime_ns, after.st_size) != (before.st_mtime_ns, before.st_size):
+            return f'Error: "{file_path}" changed while the edit was being applied, read it again and retry'
+
+        write_atomic(target, content)
+
+    except Exception as e:
+        return f"Error: {e}"
+
+    return _summary(file_path, original, content, hunks)
+
+
+def _find_all(content: str, search: str) -> list[int]:
+    positions = []
+    start = content.find(search)
+    while start != -1:
+        positions.append(start)
+        start = content.find(search, start + len(search))
+    return positions
+
+
+def _near_miss(content: str, search: str) -> str:
+    # Most misses are whitespace: point at the line that matches once indentation is ignored
+    first = next((" ".join(line.split()) for line in search.splitlines() if line.strip()), "")
+    if not first:
+        return ""
+    for number, line in enumerate(content.splitlines(), start=1):
+        if " ".join(line.split()) == first:
+            return f". Line {number} matches its first line apart from whitespace: {line!r}"
+    return ". Read the file again, it may differ from what you expect"
+
+
+def _side(sign: str, text: str) -> list[str]:
+    lines = text.splitlines()
+    shown = [f"{sign}{line}" for line in lines[:_SUMMARY_LINES]]
+    if len(lines) > _SUMMARY_LINES:
+        shown.append(f"{sign}[... {len(lines) - _SUMMARY_LINES} more lines]")
+    return shown
+
+
+def _summary(file_path: str, original: str, content: str, hunks: list[tuple[int, int, str, str]]) -> str:
+    added = removed = 0
+    body = []
+    for line, count, search, replace in hunks:
+        removed += len(search.splitlines()) * count
+        added += len(replace.splitlines()) * count
+        body.append(f"@@ line {line}" + (f" ({count} occurrences)" if count > 1 else ""))
+        body += _side("-", search) + _side("+", replace)
+    header = (f'Applied {len(hunks)} edit{"s" if len(hunks) != 1 else ""} to "{file_path}" '
+              f"(+{added} -{removed} lines, {len(original)} -> {len(content)} characters)")
+    return "\n".join([header, *body])
@@ -6,12 +6,15 @@ This function will capture the contents of the file.
 from pathlib import Path
 from google.genai import types
 import config
+import read_cache
+import ranged_reader
 
 
 
 schema_get_file_content: types.FunctionDeclaration = types.FunctionDeclaration(
     name="get_file_content",
-    description="Lists the contents of specificed file, constrained to the working directory. Files will be Truncated at 10k characters",
+    description="Lists the contents of specificed file, constrained to the working directory. Files will be Truncated at 10k characters. "
+                "To read further into a large file pass either a byte offset (with an optional length) or a line range.",
     parameters=types.Schema(
         type=types.Type.OBJECT,
         properties={
@@ -19,18 +22,39 @@ schema_get_file_content: types.FunctionDeclaration = types.FunctionDeclaration(
                 type=types.Type.STRING,
                 description="The file path that we are going to gather contents for.",
             ),
+            "offset": types.Schema(
+                type=types.Type.INTEGER,
+                description="Byte offset to start reading from. Truncation notes tell you the offset to continue with.",
+            ),
+            "length": types.Schema(
+                type=types.Type.INTEGER,
+                description="Maximum number of bytes to return, at most 10k.",
+            ),
+            "start_line": types.Schema(
+                type=types.Type.INTEGER,
+                description="First line to return (1-based). Takes precedence over offset.",
+            ),
+            "end_line": types.Schema(
+                type=types.Type.INTEGER,
+                description="Last line to return (inclusive). Defaults to reading as far as the size limit allows.",
+            ),
         },
         required=["file_path"],
     ),
 )
 
-def get_file_content(working_directory: str, file_path:str) -> str: 
+def get_file_content(working_directory: str, file_path:str, offset: int | None=None, length: int | None=None,
+                     start_line: int | None=None, end_line: int | None=None) -> str: 
     '''
     A function to gather the contents of the file
-    Returns: String with contents of first 10k characters in file or Error:
+    Returns: String with contents of first 10k characters in file (or of the requested range) or Error:
     
     :param working_directory: The directory we are working from
     :param file_path: The file path of the file we want to read
+    :param offset: Optional byte offset to read from
+    :param length: Optional maximum number of bytes to return
+    :param start_line: Optional first line (1-based) to read from
+    :param end_line: Optional last line (inclusive) to read to
     '''
     try:
         base = Path(working_directory).resolve()
@@ -42,11 +66,20 @@ def get_file_content(working_directory: str, file_path:str) -> str:
         if not target.is_file():
             return f'Error: File not found or is not a regular file: "{file_path}"'
 
-        with open(target, "r", encoding="utf-8", errors="replace") as f:
-            file_content_string = f.read(config.MAX_CHARS + 1)
-            # After reading the first config.MAX_CHARS...
-            if len(file_content_string) > config.MAX_CHARS:
-                file_content_string = file_content_string[:config.MAX_CHARS] + f'[...File "{file_path}" truncated at {config.MAX_CHARS} characters]'
+        # Gemini sends JSON numbers, which may arrive as floats
+        offset, length, start_line, end_line = (None if v is None else int(v) for v in (offset, length, start_line, end_line))
+        ranged = any(v is not None for v in (offset, length, start_line, end_line))
+
+        stat = target.stat()
+        key = ("file", str(target), stat.st_mtime_ns, stat.st_size, config.MAX_CHARS, offset, length, start_line, end_line)
+        if ranged:
+            load = lambda: ranged_reader.read_range(target, file_path, offset, length, start_line, end_line)
+        else:
+            load = lambda: _read_head(target, file_path)
+        file_content_string, seen = read_cache.CACHE.fetch(key, load)
+
+        if seen and config.READ_CACHE_UNCHANGED_NOTICE:
+            return f'File "{file_path}" is unchanged since your last read of it'
     
     except Exception as e:
         return f"Error: {e}"
@@ -54,3 +87,14 @@ def get_file_content(working_directory: str, file_path:str) -> str:
 
     return file_content_string
 
+
+def _read_head(target: Path, file_path: str) -> str:
+    with open(target, "r", encoding="utf-8", errors="replace") as f:
+        file_content_string = f.read(config.MAX_CHARS + 1)
+        # After reading the first config.MAX_CHARS...
+        if len(file_content_string) > config.MAX_CHARS:
+            file_content_string = (
+                file_content_string[:config.MAX_CHARS]
+                + f'[...File "{file_path}" truncated at {config.MAX_CHARS} characters, use start_line or offset to read further]'
+            )
+    return file_content_string
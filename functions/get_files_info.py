@@ -3,16 +3,19 @@ All of the relevant information with regards to the get_files_info function.
 This function will the contents of a directory
 """
 
-import os
+import config
 from pathlib import Path
 from google.genai import types
+import dir_index
+import read_cache
 
 
 
 
 schema_get_files_info: types.FunctionDeclaration = types.FunctionDeclaration(
     name="get_files_info",
-    description="Lists files in the specified directory along with their sizes, constrained to the working directory.",
+    description="Lists files in the specified directory along with their sizes, constrained to the working directory. "
+                "Can list a whole tree recursively, filtered by glob or extension. Long listings are paged.",
     parameters=types.Schema(
         type=types.Type.OBJECT,
         properties={
@@ -20,6 +23,31 @@ schema_get_files_info: types.FunctionDeclaration = types.FunctionDeclaration(
                 type=types.Type.STRING,
                 description="The directory to list files from, relative to the working directory. If not provided, lists files in the working directory itself.",
             ),
+            "recursive": types.Schema(
+                type=types.Type.BOOLEAN,
+                description="List subdirectories too, paths are shown relative to the directory. Defaults to false.",
+            ),
+            "max_depth": types.Schema(
+                type=types.Type.INTEGER,
+                description="With recursive, how many levels to list (1 is just the directory itself). Defaults to unlimited.",
+            ),
+            "pattern": types.Schema(
+                type=types.Type.STRING,
+                description="Glob such as \"test_*.py\", matched against names, or against relative paths if it contains \"/\".",
+            ),
+            "extensions": types.Schema(
+                type=types.Type.ARRAY,
+                items=types.Schema(type=types.Type.STRING),
+                description="Only list files with these extensions, e.g. [\".py\", \".md\"].",
+            ),
+            "offset": types.Schema(
+                type=types.Type.INTEGER,
+                description="Number of matching entries to skip. Truncation notes tell you the offset to continue with.",
+            ),
+            "limit": types.Schema(
+                type=types.Type.INTEGER,
+                description="Maximum number of entries to return.",
+            ),
         },
     ),
 )
@@ -27,13 +55,21 @@ schema_get_files_info: types.FunctionDeclaration = types.FunctionDeclaration(
 
 
 
-def get_files_info(working_directory: str, directory: str=".") -> str:
+def get_files_info(working_directory: str, directory: str=".", recursive: bool=False, max_depth: int | None=None,
+                   pattern: str | None=None, extensions: list[str] | None=None, offset: int=0,
+                   limit: int | None=None) -> str:
     '''
     A function to gather the contents of a directory
-    Returns: String with contents of the directory or Error
+    Returns: String with contents of the directory (one page of it) or Error
     
     :param working_directory: The base directory we are working from
     :param directory: The le path of the directory we want to read
+    :param recursive: Optional, list the whole tree below directory
+    :param max_depth: Optional, levels to list when recursive
+    :param pattern: Optional glob entries must match
+    :param extensions: Optional list of file extensions to keep
+    :param offset: Optional number of matching entries to skip
+    :param limit: Optional maximum number of entries, defaults to config.LISTING_PAGE_SIZE
     '''
 
     try: 
@@ -46,10 +82,51 @@ def get_files_info(working_directory: str, directory: str=".") -> str:
         if not target.is_dir():
             return f'Error: "{directory}" is not a directory'
 
-        entries = sorted(target.iterdir(), key=lambda p: p.name)
-        lines = [f"- {p.name}: file_size={p.stat().st_size}, is_dir={p.is_dir()}" for p in entries]
-        
-        return "\n".join(lines)
+        # Gemini sends JSON numbers, which may arrive as floats
+        max_depth = None if max_depth is None else int(max_depth)
+        depth = (max_depth if recursive else 1)
+        offset = max(int(offset or 0), 0)
+        limit = max(int(limit), 1) if limit else config.LISTING_PAGE_SIZE
+        extensions = tuple(extensions) if extensions else None
+
+        # Walk through the index first, the stamps it visited say whether the listing can have changed
+        visited: list[int] = []
+        keep = dir_index.matcher(pattern, extensions)
+        # Only the requested page is kept, the rest of the walk just counts matches
+        page = []
+        total = 0
+        for relative, entry in dir_index.INDEX.walk(str(target), depth, config.LISTING_SKIP_DIRS, visited):
+            if keep(relative, entry):
+                if offset <= total < offset + limit:
+                    page.append((relative, entry))
+                total += 1
+
+        key = ("listing", str(target), tuple(visited), depth, pattern, extensions, offset, limit, config.MAX_CHARS)
+        listing, seen = read_cache.CACHE.fetch(key, lambda: _render(directory, page, total, offset))
+
+        if seen and config.READ_CACHE_UNCHANGED_NOTICE:
+            return f'Directory "{directory}" is unchanged since your last listing of it'
+
+        return listing
 
     except Exception as e:
         return f"Error: {e}"
+
+
+def _render(directory: str, page: list[tuple[str, dir_index.DirEntry]], total: int, offset: int) -> str:
+    lines = []
+    chars = 0
+    end = offset
+    for relative, entry in page:
+        line = f"- {relative}: file_size={entry.size}, is_dir={entry.is_dir}"
+        # A page also stops at the character limit, there is always at least one line
+        if lines and chars + len(line) + 1 > config.MAX_CHARS:
+            break
+        lines.append(line)
+        chars += len(line) + 1
+        end += 1
+    if end < total:
+        lines.append(f'[...Showing entries {offset + 1}-{end} of {total} in "{directory}", continue with offset={end}]')
+    elif not lines and offset:
+        lines.append(f'[...No entries past offset={offset}, "{directory}" has {total}]')
+    return "\n".join(lines)
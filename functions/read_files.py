@@ -0,0 +1,103 @@
+"""
+All of the relevant information with regards to the read_files function.
+This function will read several files in one call, sharing one character budget between them.
+"""
+
+import contextvars
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from google.genai import types
+import config
+from functions.get_file_content import get_file_content
+
+
+schema_read_files: types.FunctionDeclaration = types.FunctionDeclaration(
+    name="read_files",
+    description="Reads several files in one call, constrained to the working directory. Use this instead of "
+                "several get_file_content calls. The files share a total size limit: small files are returned "
+                "whole and what they leave over goes to the larger ones, which are cut with a note saying how "
+                "to read further.",
+    parameters=types.Schema(
+        type=types.Type.OBJECT,
+        properties={
+            "file_paths": types.Schema(
+                type=types.Type.ARRAY,
+                items=types.Schema(type=types.Type.STRING),
+                description="The files to read, relative to the working directory.",
+            ),
+            "max_chars_per_file": types.Schema(
+                type=types.Type.INTEGER,
+                description="Optional lower cap for each file, e.g. to skim the start of many files.",
+            ),
+        },
+        required=["file_paths"],
+    ),
+)
+
+
+def budgets(sizes: list[int], total: int, per_file: int) -> list[int]:
+    '''
+    Splits a character budget between files: every file gets an equal share, and the share a small file
+    does not need is handed on to the larger ones
+    Returns: Budget per file, in the order of sizes
+
+    :param sizes: Size of each file (bytes, an upper bound on characters)
+    :param total: Characters available for all files together
+    :param per_file: No file gets more than this
+    '''
+    result = [0] * len(sizes)
+    remaining = total
+    order = sorted(range(len(sizes)), key=lambda i: sizes[i])
+    for n, i in enumerate(order):
+        share = remaining // (len(order) - n)
+        result[i] = min(sizes[i], share, per_file)
+        remaining -= result[i]
+    return result
+
+
+def _size(base: Path, file_path: str) -> int:
+    try:
+        return os.stat(base / file_path).st_size
+    except (OSError, ValueError):
+        # get_file_content reports the problem, it needs no budget
+        return 0
+
+
+def read_files(working_directory: str, file_paths: list[str], max_chars_per_file: int | None=None) -> str:
+    '''
+    A function to gather the contents of several files at once
+    Returns: One section per file, "==> path <==" followed by its content (or Error: ...), in the order given
+
+    :param working_directory: The directory we are working from
+    :param file_paths: The file paths of the files we want to read
+    :param max_chars_per_file: Optional cap per file, below config.MAX_CHARS
+    '''
+    try:
+        if not file_paths:
+            return "Error: No file paths given"
+        if len(file_paths) > config.READ_FILES_MAX_FILES:
+            return f"Error: At most {config.READ_FILES_MAX_FILES} files can be read in one call, got {len(file_paths)}"
+
+        base = Path(working_directory).resolve()
+        # Gemini sends JSON numbers, which may arrive as floats
+        per_file = min(int(max_chars_per_file), config.MAX_CHARS) if max_chars_per_file else config.MAX_CHARS
+        sizes = [_size(base, p) for p in file_paths]
+        shares = budgets(sizes, config.READ_FILES_TOTAL_CHARS, per_file)
+
+        def read(file_path: str, size: int, share: int) -> str:
+            if share >= size:
+                return get_file_content(working_directory, file_path)
+            return get_file_content(working_directory, file_path, offset=0, length=max(share, 1))
+
+        workers = min(len(file_paths), config.MAX_TOOL_WORKERS)
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="read_files") as pool:
+            # Each read runs in a copy of our context so cache hits are still counted on this call's trace span
+            futures = [pool.submit(contextvars.copy_context().run, read, p, size, share)
+                       for p, size, share in zip(file_paths, sizes, shares)]
+            contents = [f.result() for f in futures]
+
+    except Exception as e:
+        return f"Error: {e}"
+
+    return "\n".join(f"==> {p} <==\n{content}" for p, content in zip(file_paths, contents))
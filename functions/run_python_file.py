@@ -4,9 +4,14 @@ This function will run a python program with presented arguments
 """
 
 
-import subprocess
+import code_index
 import config
+import dir_index
+import output_capture
+import read_cache
 import sys
+import tracing
+import worker_pool
 
 from google.genai import types
 from pathlib import Path
@@ -56,25 +61,42 @@ def run_python_file(working_directory: str, file_path, args: Sequence[str] | Non
         if not file_path.endswith('.py'):
             return f'Error: "{file_path}" is not a Python file'
 
-        command = [sys.executable, str(target)]
+        command = [str(target)]
         if args:
             if isinstance(args,str):
                 args = [args]
             command.extend(args)
     
-        result = subprocess.run(command, capture_output=True, text=True, timeout=config.TIMEOUT, cwd=str(base))
+        # Output is drained while the script runs and capped at a head + tail, so a chatty script can't flood memory or context
+        stdout = output_capture.BoundedOutput("stdout")
+        stderr = output_capture.BoundedOutput("stderr")
+        try:
+            # Warm workers skip interpreter startup, they need fork so other platforms always spawn
+            if config.PYTHON_WORKERS and worker_pool.available():
+                returncode, timed_out, cpu = worker_pool.POOL.run(command, str(base), config.TIMEOUT, stdout, stderr)
+            else:
+                returncode, timed_out, cpu = output_capture.run_process([sys.executable, *command], str(base), config.TIMEOUT, stdout, stderr)
+            tracing.annotate(cpu_ms=round(cpu * 1000, 3), output_bytes=stdout.total + stderr.total)
+        finally:
+            # The script may have changed files without touching directory mtimes
+            read_cache.CACHE.invalidate_listings()
+            dir_index.INDEX.clear()
+            code_index.mark_stale()
         
         return_string_lines= []
 
-        if result.returncode != 0:
-            return_string_lines.append(f'Process exited with code {result.returncode}')
+        if timed_out:
+            return_string_lines.append(f'Error: "{file_path}" timed out after {config.TIMEOUT} seconds')
 
-        if not result.stdout and not result.stderr:
+        elif returncode != 0:
+            return_string_lines.append(f'Process exited with code {returncode}')
+
+        if not stdout.total and not stderr.total:
             return_string_lines.append("No Output Produced")
         
         else:
-            return_string_lines.append(f'STDOUT: {result.stdout}')
-            return_string_lines.append(f'STDERR: {result.stderr}')
+            return_string_lines.append(f'STDOUT: {stdout.text()}')
+            return_string_lines.append(f'STDERR: {stderr.text()}')
 
         return "\n".join(return_string_lines)
 
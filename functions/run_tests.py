@@ -0,0 +1,189 @@
+"""
+All of the relevant information with regards to the run_tests function.
+This function will run the unittest/pytest tests of the working directory that are affected by changes since the last run.
+"""
+
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+from typing import Any
+
+from google.genai import types
+
+import code_index
+import config
+import dir_index
+import output_capture
+import read_cache
+import suite
+import tracing
+import worker_pool
+
+_WORKER_SCRIPT = str(Path(__file__).resolve().parent.parent / "suite_worker.py")
+
+
+schema_run_tests: types.FunctionDeclaration = types.FunctionDeclaration(
+    name="run_tests",
+    description="Runs the unittest/pytest tests in the working directory and returns a pass/fail summary with "
+                "failure tracebacks and the slowest tests. Only test files that import something changed since the "
+                "last run are run again, the rest report their previous results. Use this instead of "
+                "run_python_file to check your changes.",
+    parameters=types.Schema(
+        type=types.Type.OBJECT,
+        properties={
+            "file_paths": types.Schema(
+                type=types.Type.ARRAY,
+                description="Test files or directories to limit the run to, relative to the working directory. "
+                            "Defaults to every test file (test_*.py, *_test.py, tests.py).",
+                items=types.Schema(type=types.Type.STRING),
+            ),
+            "rerun_all": types.Schema(
+                type=types.Type.BOOLEAN,
+                description="Run every selected test file even if nothing it imports has changed. Defaults to false.",
+            ),
+        },
+    ),
+)
+
+
+def run_tests(working_directory: str, file_paths: list[str] | None = None, rerun_all: bool = False) -> str:
+    '''
+    A function to run the tests affected by changes in working directory
+    Returns: A summary line with counts, the changed files, failures with the end of their tracebacks, and the slowest tests
+
+    :param working_directory: The base of our working area
+    :param file_paths: Test files or directories to limit the run to, defaults to all test files
+    :param rerun_all: Ignore what is known from the last run and run every selected file
+    '''
+    try:
+        base = Path(working_directory).resolve()
+        tests = suite.suite_for(base)
+        discovered = tests.discover()
+
+        if file_paths:
+            if isinstance(file_paths, str):
+                file_paths = [file_paths]
+            selected = []
+            for file_path in file_paths:
+                target = (base / file_path).resolve(strict=False)
+                if target != base and base not in target.parents:
+                    return f'Error: Cannot run tests in "{file_path}" as it is outside the permitted working directory'
+                if target.is_file():
+                    if target.suffix != ".py":
+                        return f'Error: "{file_path}" is not a Python file'
+                    selected.append(target.relative_to(base).as_posix())
+                elif target.is_dir():
+                    prefix = "" if target == base else target.relative_to(base).as_posix() + "/"
+                    selected += [f for f in discovered if f.startswith(prefix)]
+                else:
+                    return f'Error: "{file_path}" does not exist'
+            selected = sorted(set(selected))
+        else:
+            selected = discovered
+
+        # Files with no test cases are scripts, running them would only run their side effects
+        selected = [f for f in selected if tests.info(f).tests]
+        if not selected:
+            return "No tests found (looked for test_*.py, *_test.py and tests.py with test functions or TestCase classes)"
+
+        to_run, changed, fingerprints = tests.select(selected, bool(rerun_all))
+        results: dict[str, list[dict[str, Any]]] = {}
+        problem = ""
+        seconds = 0.0
+        if to_run:
+            ran, problem, seconds = _run(base, to_run)
+            for test_file in to_run:
+                if test_file in ran:
+                    results[test_file] = ran[test_file]
+                    tests.record(test_file, fingerprints[test_file], ran[test_file])
+                else:
+                    # Not recorded, so it runs again next time
+                    results[test_file] = [{"file": test_file, "id": test_file, "outcome": "error", "seconds": 0.0,
+                                           "message": problem or "the test runner produced no results"}]
+
+    except Exception as e:
+        return f"Error: {e}"
+
+    reused = {f: tests.last_run[f][1] for f in selected if f not in results and f in tests.last_run}
+    return _summary(selected, to_run, changed, results, reused, seconds)
+
+
+def _run(base: Path, to_run: list[str]) -> tuple[dict[str, list[dict[str, Any]]], str, float]:
+    # Results go to a file outside the working directory so tests printing to stdout can't corrupt them
+    fd, results_path = tempfile.mkstemp(prefix="run_tests-", suffix=".jsonl")
+    os.close(fd)
+    stdout = output_capture.BoundedOutput("stdout")
+    stderr = output_capture.BoundedOutput("stderr")
+    command = [_WORKER_SCRIPT, results_path, *to_run]
+    try:
+        try:
+            if config.PYTHON_WORKERS and worker_pool.available():
+                returncode, timed_out, cpu = worker_pool.POOL.run(command, str(base), config.RUN_TESTS_TIMEOUT, stdout, stderr)
+            else:
+                returncode, timed_out, cpu = output_capture.run_process([sys.executable, *command], str(base),
+                                                                         config.RUN_TESTS_TIMEOUT, stdout, stderr)
+            tracing.annotate(cpu_ms=round(cpu * 1000, 3), output_bytes=stdout.total + stderr.total, test_files=len(to_run))
+        finally:
+            # Tests may have changed files without touching directory mtimes
+            read_cache.CACHE.invalidate_listings()
+            dir_index.INDEX.clear()
+            code_index.mark_stale()
+
+        ran: dict[str, list[dict[str, Any]]] = {}
+        done = set()
+        with open(results_path, encoding="utf-8") as f:
+            for line in f:
+                if line.endswith("\n"):
+                    record = json.loads(line)
+                    if record.get("done"):
+                        done.add(record["file"])
+                    else:
+                        ran.setdefault(record["file"], []).append(record)
+    finally:
+        os.unlink(results_path)
+
+    # A file cut short by a timeout or a crash is incomplete, it is reported as an error instead
+    ran = {f: ran.get(f, []) for f in to_run if f in done}
+    problem = ""
+    if timed_out:
+        problem = f"timed out after {config.RUN_TESTS_TIMEOUT} seconds"
+    elif returncode != 0:
+        problem = f"test runner exited with code {returncode}: {stderr.text()}"
+    return ran, problem, sum(r["seconds"] for records in ran.values() for r in records)
+
+
+def _summary(selected: list[str], to_run: list[str], changed: set[str], results: dict[str, list[dict[str, Any]]],
+             reused: dict[str, list[dict[str, Any]]], seconds: float) -> str:
+    counts = {"passed": 0, "failed": 0, "error": 0, "skipped": 0}
+    records = [(r, False) for rs in results.values() for r in rs] + [(r, True) for rs in reused.values() for r in rs]
+    for record, _ in records:
+        counts[record["outcome"]] = counts.get(record["outcome"], 0) + 1
+
+    header = (f"{counts['passed']} passed, {counts['failed']} failed, {counts['error']} errors, "
+              f"{counts['skipped']} skipped in {len(selected)} test file{'s' if len(selected) != 1 else ''}")
+    if not to_run:
+        header += " (nothing changed since the last run)"
+    elif reused:
+        header += f" (ran {len(to_run)} in {seconds:.2f}s, {len(reused)} unchanged since the last run)"
+    else:
+        header += f" ({seconds:.2f}s)"
+    lines = [header]
+    if changed:
+        shown = sorted(changed)
+        lines.append("Changed since the last run: " + ", ".join(shown[:10]) + (f" and {len(shown) - 10} more" if len(shown) > 10 else ""))
+
+    failures = [(r, old) for r, old in records if r["outcome"] in ("failed", "error")]
+    for record, old in failures[:config.RUN_TESTS_MAX_FAILURES]:
+        lines.append("")
+        lines.append(f"{record['outcome'].upper()} {record['id']} ({record['seconds']:.3f}s)" + (" [from the last run]" if old else ""))
+        lines += ["    " + line for line in record["message"].splitlines()]
+    if len(failures) > config.RUN_TESTS_MAX_FAILURES:
+        lines.append(f"\n[...{len(failures) - config.RUN_TESTS_MAX_FAILURES} more failures not shown]")
+
+    slowest = sorted((r for r, _ in records if r["seconds"] >= config.RUN_TESTS_SLOW_SECONDS), key=lambda r: r["seconds"], reverse=True)
+    if slowest[:config.RUN_TESTS_SLOWEST]:
+        lines.append("")
+        lines.append(f"Slow (over {config.RUN_TESTS_SLOW_SECONDS}s): " + ", ".join(f"{r['id']} {r['seconds']:.3f}s" for r in slowest[:config.RUN_TESTS_SLOWEST]))
+    return "\n".join(lines)
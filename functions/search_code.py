@@ -0,0 +1,97 @@
+"""
+All of the relevant information with regards to the search_code function.
+This function will search the files of the working directory for a substring or regular expression.
+"""
+
+import re
+from pathlib import Path
+from google.genai import types
+import code_index
+import config
+
+
+schema_search_code: types.FunctionDeclaration = types.FunctionDeclaration(
+    name="search_code",
+    description="Searches every text file in the working directory for a substring or regular expression and returns "
+                "matching lines as path:line: text. Use this to find where something is defined or used instead of "
+                "reading files one by one.",
+    parameters=types.Schema(
+        type=types.Type.OBJECT,
+        properties={
+            "query": types.Schema(
+                type=types.Type.STRING,
+                description="The text to find. Treated literally unless regex is true.",
+            ),
+            "regex": types.Schema(
+                type=types.Type.BOOLEAN,
+                description="Treat query as a Python regular expression. Defaults to false.",
+            ),
+            "ignore_case": types.Schema(
+                type=types.Type.BOOLEAN,
+                description="Match regardless of case. Defaults to false.",
+            ),
+            "directory": types.Schema(
+                type=types.Type.STRING,
+                description="Only search below this directory, relative to the working directory. Defaults to all of it.",
+            ),
+            "max_results": types.Schema(
+                type=types.Type.INTEGER,
+                description="Maximum number of matching lines to return.",
+            ),
+        },
+        required=["query"],
+    ),
+)
+
+
+def search_code(working_directory: str, query: str, regex: bool=False, ignore_case: bool=False,
+                directory: str=".", max_results: int | None=None) -> str:
+    '''
+    A function to search the working directory through its trigram index
+    Returns: One "path:line: text" per matching line, a note if there are none, or Error
+
+    :param working_directory: The base directory we are working from
+    :param query: Substring or regular expression to find
+    :param regex: Optional, treat query as a regular expression
+    :param ignore_case: Optional, case-insensitive matching
+    :param directory: Optional directory to restrict the search to
+    :param max_results: Optional cap on matching lines, defaults to config.SEARCH_MAX_RESULTS
+    '''
+    try:
+        base = Path(working_directory).resolve()
+        target = (base / directory).resolve(strict=False)
+
+        if target != base and base not in target.parents:
+            return f'Error: Cannot search "{directory}" as it is outside the permitted working directory'
+
+        if not target.is_dir():
+            return f'Error: "{directory}" is not a directory'
+
+        if not query:
+            return "Error: query must not be empty"
+
+        try:
+            pattern = re.compile(query if regex else re.escape(query), re.IGNORECASE if ignore_case else 0)
+        except re.error as e:
+            return f"Error: Invalid regular expression: {e}"
+
+        # Gemini sends JSON numbers, which may arrive as floats
+        limit = max(int(max_results), 1) if max_results else config.SEARCH_MAX_RESULTS
+        prefix = "" if target == base else target.relative_to(base).as_posix() + "/"
+
+        index = code_index.index_for(base)
+        matches, more = index.search(pattern, code_index.required_literals(query, regex), limit, prefix)
+
+        if not matches:
+            return f'No matches for "{query}"'
+        lines = [f"{m.path}:{m.line}: {m.text}" for m in matches]
+        result = "\n".join(lines)
+        if len(result) > config.MAX_CHARS:
+            result = result[:config.MAX_CHARS].rsplit("\n", 1)[0]
+            more = True
+        if more:
+            result += f"\n[...More matches not shown, narrow the query or directory]"
+        return result
+
+    except Exception as e:
+        return f"Error: {e}"
@@ -2,8 +2,19 @@
 All of the relevant information with regards to the write_file function.
 This function will write content of a file to a directory
 """
+import contextlib
+import os
+import stat
+import tempfile
 from pathlib import Path
 from google.genai import types
+import code_index
+import dir_index
+import read_cache
+
+# mkstemp creates files 0600, new files should get the usual mode instead
+_UMASK = os.umask(0)
+os.umask(_UMASK)
 
 
 schema_write_file: types.FunctionDeclaration = types.FunctionDeclaration(
@@ -46,11 +57,36 @@ def write_file(working_directory: str, file_path, content: str) -> str:
             return f'Error: Cannot write to "{file_path}" as it is a directory'
     
         target.parent.mkdir(parents=True, exist_ok=True)
-
-        with open(target, "w", encoding='utf-8') as f:
-            f.write(content)
+        write_atomic(target, content)
 
     except Exception as e:
         return f"Error: {e}"
 
     return f'Successfully wrote to "{file_path}" ({len(content)} characters written)'
+
+
+def write_atomic(target: Path, content: str) -> None:
+    '''
+    Replaces target with content through a temp file and a rename, so readers (and a crash) only ever see the
+    old or the new file. An existing file keeps its permissions. The caches that know about target are updated.
+
+    :param target: Resolved path to write, its parent must exist
+    :param content: The complete new content
+    '''
+    fd, tmp = tempfile.mkstemp(dir=target.parent, prefix=f".{target.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8", newline="") as f:
+            f.write(content)
+        try:
+            os.chmod(tmp, stat.S_IMODE(os.stat(target).st_mode))
+        except FileNotFoundError:
+            os.chmod(tmp, 0o666 & ~_UMASK)
+        os.replace(tmp, target)
+    except BaseException:
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(tmp)
+        raise
+
+    read_cache.CACHE.invalidate(target)
+    dir_index.INDEX.update(target)
+    code_index.update(target)
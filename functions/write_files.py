@@ -0,0 +1,88 @@
+"""
+All of the relevant information with regards to the write_files function.
+This function will write several files in one call.
+"""
+
+import contextvars
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+from google.genai import types
+import config
+from functions.write_file import write_file
+
+
+schema_write_files: types.FunctionDeclaration = types.FunctionDeclaration(
+    name="write_files",
+    description="Writes several files in one call, creating or overwriting each of them, constrained to the "
+                "working directory. Use this instead of several write_file calls. Each file is written on its own: "
+                "one failing does not stop the others.",
+    parameters=types.Schema(
+        type=types.Type.OBJECT,
+        properties={
+            "files": types.Schema(
+                type=types.Type.ARRAY,
+                description="The files to write.",
+                items=types.Schema(
+                    type=types.Type.OBJECT,
+                    properties={
+                        "file_path": types.Schema(
+                            type=types.Type.STRING,
+                            description="The file path that we are going to write to.",
+                        ),
+                        "content": types.Schema(
+                            type=types.Type.STRING,
+                            description="The content to write to the file.",
+                        ),
+                    },
+                    required=["file_path", "content"],
+                ),
+            ),
+        },
+        required=["files"],
+    ),
+)
+
+
+def write_files(working_directory: str, files: list[dict[str, Any]]) -> str:
+    '''
+    A function to write several files in working directory at once
+    Returns: One line per file with the write_file result, in the order given
+
+    :param working_directory: The base of our working area
+    :param files: List of {"file_path", "content"}
+    '''
+    try:
+        if not files:
+            return "Error: No files given"
+        if len(files) > config.READ_FILES_MAX_FILES:
+            return f"Error: At most {config.READ_FILES_MAX_FILES} files can be written in one call, got {len(files)}"
+
+        # Writes to the same path stay in order on one thread, so the last one wins as it would serially
+        groups: dict[str, list[int]] = {}
+        for i, entry in enumerate(files):
+            groups.setdefault(os.path.normpath(str(entry.get("file_path", ""))), []).append(i)
+
+        results = [""] * len(files)
+
+        def write_group(indexes: list[int]) -> None:
+            for i in indexes:
+                entry = files[i]
+                if "file_path" not in entry or "content" not in entry:
+                    results[i] = "Error: each file needs a file_path and content"
+                    continue
+                results[i] = write_file(working_directory, entry["file_path"], entry["content"])
+
+        workers = min(len(groups), config.MAX_TOOL_WORKERS)
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="write_files") as pool:
+            futures = [pool.submit(contextvars.copy_context().run, write_group, indexes) for indexes in groups.values()]
+            for future in futures:
+                future.result()
+
+    except Exception as e:
+        return f"Error: {e}"
+
+    written = sum(1 for r in results if not r.startswith("Error"))
+    lines = [f"Wrote {written} of {len(files)} files"]
+    lines += [f'- "{entry.get("file_path")}": {result}' for entry, result in zip(files, results)]
+    return "\n".join(lines)
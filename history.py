@@ -0,0 +1,160 @@
+"""
+Conversation history for the agent loop.
+Tracks an estimated token cost per message and compacts old tool output so the prompt stays under config.MAX_PROMPT_TOKENS.
+"""
+
+import json
+import re
+from typing import Any
+
+from google.genai import types
+
+import config
+import read_cache
+import tool_executor
+
+# What get_file_content / get_files_info return instead of content the model already has
+_UNCHANGED_NOTICE = re.compile(r'(File|Directory) ".*" is unchanged since your last (read|listing) of it', re.DOTALL)
+
+
+def estimate_tokens(content: types.Content) -> int:
+    '''
+    Cheap local estimate of how many prompt tokens a message costs
+    Returns: Approximate token count (serialized characters / config.CHARS_PER_TOKEN)
+
+    :param content: A message in the conversation
+    '''
+    serialized = json.dumps(content.model_dump(mode="json", exclude_none=True), ensure_ascii=False)
+    return max(1, len(serialized) // config.CHARS_PER_TOKEN)
+
+
+class ConversationHistory:
+    '''
+    Holds the messages sent to Gemini on every iteration.
+    compact() rewrites stale tool results in place (reads superseded by a later write or re-read),
+    then, if the estimate is still over budget, shortens and finally drops the oldest tool exchanges.
+    The first user message and the most recent config.HISTORY_KEEP_RECENT messages are never elided or dropped.
+    '''
+
+    def __init__(self, token_budget: int = config.MAX_PROMPT_TOKENS, keep_recent: int = config.HISTORY_KEEP_RECENT):
+        self.token_budget = token_budget
+        self.keep_recent = keep_recent
+        self.messages: list[types.Content] = []
+        self.tokens_saved = 0
+        self._costs: list[int] = []
+        # Ratio of real prompt tokens (from usage metadata) to our estimate
+        self._scale = 1.0
+
+    def append(self, content: types.Content) -> None:
+        self.messages.append(content)
+        self._costs.append(estimate_tokens(content))
+
+    def token_count(self) -> int:
+        '''
+        Returns: Estimated prompt tokens for the current history, calibrated against the last observed prompt
+        '''
+        return int(sum(self._costs) * self._scale)
+
+    def observe(self, prompt_tokens: int | None) -> None:
+        '''
+        Calibrates the estimate using the prompt_token_count Gemini reported for the current history.
+        The reported count also covers the system prompt and tool declarations, so the scale errs high.
+        '''
+        estimated = sum(self._costs)
+        if prompt_tokens and estimated:
+            self._scale = max(1.0, prompt_tokens / estimated)
+
+    def compact(self) -> int:
+        '''
+        Shrinks the history until it fits the token budget
+        Returns: Estimated tokens saved by this pass
+        '''
+        before = self.token_count()
+        self._drop_superseded()
+
+        if self.token_count() > self.token_budget:
+            self._elide_old_results()
+
+        if self.token_count() > self.token_budget:
+            self._drop_old_exchanges()
+
+        saved = before - self.token_count()
+        self.tokens_saved += saved
+        return saved
+
+    def _protected(self, index: int) -> bool:
+        return index == 0 or index >= len(self.messages) - self.keep_recent
+
+    def _tool_exchanges(self) -> list[tuple[int, int, types.FunctionCall, types.Part]]:
+        '''
+        Pairs every function response with the call that produced it
+        Returns: [(response message index, part index, function call, response part)] oldest first
+        '''
+        exchanges = []
+        for i in range(1, len(self.messages)):
+            calls = [p.function_call for p in (self.messages[i - 1].parts or []) if p.function_call]
+            responses = [(j, p) for j, p in enumerate(self.messages[i].parts or []) if p.function_response]
+            for call, (j, part) in zip(calls, responses):
+                exchanges.append((i, j, call, part))
+        return exchanges
+
+    def _replace_result(self, index: int, part: types.Part, summary: str) -> None:
+        part.function_response.response = {"result": summary}
+        self._costs[index] = estimate_tokens(self.messages[index])
+        # The model can no longer see the old content, so a repeat read must return it in full
+        read_cache.CACHE.forget_delivered()
+
+    def _drop_superseded(self) -> None:
+        exchanges = self._tool_exchanges()
+        for n, (i, _, call, part) in enumerate(exchanges):
+            access = tool_executor.call_access(call)
+            # The newest results have not been shown to the model yet
+            if i == len(self.messages) - 1 or access.kind != "read" or _is_summary(part):
+                continue
+            for _, _, later, later_part in exchanges[n + 1:]:
+                later_access = tool_executor.call_access(later)
+                rewritten = later_access.kind == "write" and tool_executor.conflicts(access, later_access)
+                # A repeat read answered with the read cache's "unchanged" notice points back at this result
+                reread = (later.name == call.name and (later.args or {}) == (call.args or {})
+                          and not _is_unchanged_notice(later_part))
+                if rewritten or reread:
+                    reason = "modified" if rewritten else "read again"
+                    self._replace_result(i, part, f"[Superseded: {call.name}({_format_args(call.args)}) was {reason} later in this session]")
+                    break
+
+    def _elide_old_results(self) -> None:
+        for i, _, call, part in self._tool_exchanges():
+            if self.token_count() <= self.token_budget:
+                return
+            if self._protected(i) or _is_summary(part):
+                continue
+            result = str((part.function_response.response or {}).get("result", ""))
+            preview = result[:config.HISTORY_PREVIEW_CHARS].replace("\n", " ")
+            self._replace_result(i, part, f"[Elided old {call.name} output ({len(result)} chars), began: {preview}]")
+
+    def _drop_old_exchanges(self) -> None:
+        # A model turn with function calls must stay next to its responses, so they are removed as a pair
+        i = 1
+        while self.token_count() > self.token_budget and i + 1 < len(self.messages) - self.keep_recent:
+            has_calls = any(p.function_call for p in (self.messages[i].parts or []))
+            has_responses = any(p.function_response for p in (self.messages[i + 1].parts or []))
+            if has_calls and has_responses:
+                del self.messages[i:i + 2]
+                del self._costs[i:i + 2]
+                read_cache.CACHE.forget_delivered()
+            else:
+                i += 1
+
+
+def _is_summary(part: types.Part) -> bool:
+    result = (part.function_response.response or {}).get("result")
+    return isinstance(result, str) and (result.startswith("[Superseded:") or result.startswith("[Elided old"))
+
+
+def _is_unchanged_notice(part: types.Part) -> bool:
+    result = (part.function_response.response or {}).get("result")
+    return isinstance(result, str) and _UNCHANGED_NOTICE.fullmatch(result) is not None
+
+
+def _format_args(args: dict[str, Any] | None) -> str:
+    return ", ".join(f"{k}={v!r}" for k, v in (args or {}).items() if k != "content")
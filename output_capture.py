@@ -0,0 +1,152 @@
+"""
+Bounded, incremental capture of subprocess output.
+Pipes are drained as the process runs; only the first and last few KB of each stream are kept,
+so memory stays flat however much a script prints. In verbose mode output can also be echoed live.
+"""
+
+import os
+import select
+import subprocess
+import threading
+from collections.abc import Callable
+from typing import BinaryIO
+
+import config
+
+_live = False
+_echo_lock = threading.Lock()
+
+
+def set_live(enabled: bool) -> None:
+    '''
+    Turns live echo of subprocess output to the console on or off (main enables it with --verbose)
+    '''
+    global _live
+    _live = enabled
+
+
+class BoundedOutput:
+    '''
+    Keeps the first head_bytes and the last tail_bytes of a stream and counts everything in between.
+    '''
+
+    def __init__(self, label: str, head_bytes: int = config.OUTPUT_HEAD_BYTES, tail_bytes: int = config.OUTPUT_TAIL_BYTES):
+        self.label = label
+        self.head_bytes = head_bytes
+        self.tail_bytes = tail_bytes
+        self.total = 0
+        self._head = bytearray()
+        self._tail = bytearray()
+        self._partial_line = b""
+
+    def feed(self, chunk: bytes) -> None:
+        self.total += len(chunk)
+        if _live:
+            self._echo(chunk)
+
+        room = self.head_bytes - len(self._head)
+        if room > 0:
+            self._head += chunk[:room]
+            chunk = chunk[room:]
+        if chunk:
+            self._tail += chunk
+            # Trim in batches so a stream of tiny writes doesn't shift the buffer every time
+            if len(self._tail) > 2 * self.tail_bytes:
+                del self._tail[:-self.tail_bytes]
+
+    def _echo(self, chunk: bytes) -> None:
+        lines = (self._partial_line + chunk).split(b"\n")
+        self._partial_line = lines.pop()
+        if lines:
+            with _echo_lock:
+                for line in lines:
+                    print(f"  [{self.label}] {line.decode('utf-8', errors='replace')}", flush=True)
+
+    def text(self) -> str:
+        '''
+        Returns: The captured output, with a marker where bytes were elided
+        '''
+        tail = bytes(self._tail[-self.tail_bytes:]) if self.tail_bytes else b""
+        elided = self.total - len(self._head) - len(tail)
+        head = self._head.decode("utf-8", errors="replace")
+        if elided <= 0:
+            return head + tail.decode("utf-8", errors="replace")
+        return head + f"\n[... {elided} bytes elided ...]\n" + tail.decode("utf-8", errors="replace")
+
+
+def _pump(open_stream: Callable[[], BinaryIO], sink: BoundedOutput) -> None:
+    with open_stream() as stream:
+        read = getattr(stream, "read1", stream.read)
+        while chunk := read(config.OUTPUT_CHUNK_BYTES):
+            sink.feed(chunk)
+
+
+def start_pump(open_stream: Callable[[], BinaryIO], sink: BoundedOutput) -> threading.Thread:
+    '''
+    Drains a stream into sink on a background thread until EOF
+    Returns: The started thread
+
+    :param open_stream: Returns the readable binary stream, called on the thread (opening a FIFO may block)
+    :param sink: Where the output goes
+    '''
+    thread = threading.Thread(target=_pump, args=(open_stream, sink), daemon=True, name=f"pump-{sink.label}")
+    thread.start()
+    return thread
+
+
+def finish_pumps(pumps: list[threading.Thread]) -> None:
+    # A background process the script left behind can hold the pipe open, don't wait on it forever
+    for pump in pumps:
+        pump.join(timeout=config.OUTPUT_DRAIN_TIMEOUT)
+
+
+def script_env() -> dict[str, str]:
+    '''
+    Returns: This process's environment without the API key, for every process that runs the agent's scripts
+    '''
+    return {k: v for k, v in os.environ.items() if k != config.API_KEY_LOCATION}
+
+
+def run_process(command: list[str], cwd: str, timeout: float, stdout: BoundedOutput, stderr: BoundedOutput) -> tuple[int, bool, float]:
+    '''
+    Runs a command, streaming its output into bounded buffers
+    Returns: (exit code, timed out, CPU seconds used by the process)
+
+    :param command: The full command line
+    :param cwd: Directory to run in
+    :param timeout: Seconds before the process is killed
+    :param stdout: Sink for standard output
+    :param stderr: Sink for standard error
+    '''
+    process = subprocess.Popen(command, cwd=cwd, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                               env=script_env())
+    pumps = [start_pump(lambda: process.stdout, stdout), start_pump(lambda: process.stderr, stderr)]
+    timed_out, cpu = _wait(process, timeout)
+    finish_pumps(pumps)
+    return process.returncode, timed_out, cpu
+
+
+def _wait(process: subprocess.Popen, timeout: float) -> tuple[bool, float]:
+    # wait4 reports this child's own CPU time; RUSAGE_CHILDREN would mix in every other tool running concurrently
+    if not (hasattr(os, "wait4") and hasattr(os, "pidfd_open")):
+        timed_out = False
+        try:
+            process.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            timed_out = True
+            process.kill()
+            process.wait()
+        return timed_out, 0.0
+
+    pidfd = os.pidfd_open(process.pid)
+    try:
+        ready, _, _ = select.select([pidfd], [], [], timeout)
+    finally:
+        os.close(pidfd)
+    timed_out = not ready
+    if timed_out:
+        process.kill()
+    _, status, usage = os.wait4(process.pid, 0)
+    # We reaped the child ourselves, so tell Popen not to wait on it again
+    process.returncode = os.waitstatus_to_exitcode(status)
+    return timed_out, usage.ru_utime + usage.ru_stime
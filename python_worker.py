@@ -0,0 +1,122 @@
+"""
+Warm interpreter used by worker_pool. Stdlib only, and it never imports anything from this repo,
+so the scripts it runs see the same sys.modules / sys.path they would under a plain `python script.py`.
+
+Protocol: one JSON job per line on stdin, one JSON reply per line on stdout.
+Each job runs in a forked child via runpy, so every script starts from the same fresh module state.
+"""
+
+import io
+import json
+import os
+import runpy
+import select
+import signal
+import sys
+import time
+import traceback
+
+# sys.path as a fresh interpreter would see it, minus this script's own directory
+BASE_PATH = sys.path[1:]
+
+
+def _run_child(job: dict) -> None:
+    os.setsid()
+    # stdout/stderr are FIFOs the parent is already reading from, open them first so it never waits on us
+    stdout = os.open(job["stdout"], os.O_WRONLY)
+    stderr = os.open(job["stderr"], os.O_WRONLY)
+    stdin = os.open(os.devnull, os.O_RDONLY)
+    os.dup2(stdin, 0)
+    os.dup2(stdout, 1)
+    os.dup2(stderr, 2)
+    for fd in (stdin, stdout, stderr):
+        os.close(fd)
+    os.chdir(job["cwd"])
+
+    sys.stdin = io.TextIOWrapper(io.FileIO(0, "r", closefd=False), encoding="utf-8")
+    sys.stdout = io.TextIOWrapper(io.FileIO(1, "w", closefd=False), encoding="utf-8")
+    sys.stderr = io.TextIOWrapper(io.FileIO(2, "w", closefd=False), encoding="utf-8", line_buffering=True)
+
+    script = job["script"]
+    sys.argv = [script] + job["args"]
+    sys.path[:] = [os.path.dirname(script)] + BASE_PATH
+
+    code = 0
+    try:
+        runpy.run_path(script, run_name="__main__")
+    except SystemExit as e:
+        if e.code is None:
+            code = 0
+        elif isinstance(e.code, int):
+            code = e.code
+        else:
+            print(e.code, file=sys.stderr)
+            code = 1
+    except BaseException:
+        traceback.print_exc()
+        code = 1
+    finally:
+        for stream in (sys.stdout, sys.stderr):
+            try:
+                stream.flush()
+            except Exception:
+                pass
+    os._exit(code & 0xFF)
+
+
+def _wait(pid: int, timeout: float) -> tuple[int, bool, float]:
+    '''
+    Waits for the child, killing its whole process group once timeout passes
+    Returns: (exit code, timed out, CPU seconds used by the child)
+    '''
+    deadline = time.monotonic() + timeout
+    pidfd = os.pidfd_open(pid) if hasattr(os, "pidfd_open") else None
+    try:
+        while True:
+            done, status, usage = os.wait4(pid, os.WNOHANG)
+            if done:
+                return os.waitstatus_to_exitcode(status), False, usage.ru_utime + usage.ru_stime
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            if pidfd is not None:
+                select.select([pidfd], [], [], remaining)
+            else:
+                time.sleep(min(remaining, 0.005))
+    finally:
+        if pidfd is not None:
+            os.close(pidfd)
+
+    try:
+        os.killpg(pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+    _, status, usage = os.wait4(pid, 0)
+    return os.waitstatus_to_exitcode(status), True, usage.ru_utime + usage.ru_stime
+
+
+def serve() -> None:
+    for module in sys.argv[1:]:
+        __import__(module)
+
+    reply = sys.stdout
+    for line in sys.stdin:
+        job = json.loads(line)
+        reply.flush()
+        sys.stderr.flush()
+        pid = os.fork()
+        if pid == 0:
+            # Whatever happens the child must never fall back into this loop
+            try:
+                _run_child(job)
+            except BaseException:
+                traceback.print_exc()
+            finally:
+                os._exit(1)
+        returncode, timed_out, cpu = _wait(pid, job["timeout"])
+        reply.write(json.dumps({"returncode": returncode, "timed_out": timed_out, "cpu_s": cpu}) + "\n")
+        reply.flush()
+
+
+if __name__ == "__main__":
+    serve()
@@ -0,0 +1,141 @@
+"""
+Ranged reads of large files through mmap.
+A sparse line index (newline counts per fixed-size block) is built lazily per file version,
+so reading a line range costs O(range + block) instead of reading the file from the start.
+"""
+
+import mmap
+import threading
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+from pathlib import Path
+
+import config
+
+
+class LineIndex:
+    '''
+    Cumulative newline counts at every config.LINE_INDEX_BLOCK boundary of one file version.
+    Only as many blocks as a request needs are counted; memory is 8 bytes per block.
+    '''
+
+    def __init__(self, size: int):
+        self.size = size
+        # _newlines_before[i] is the number of newlines before byte i * LINE_INDEX_BLOCK
+        self._newlines_before = array("Q", [0])
+        self._complete = size == 0
+        self._lock = threading.Lock()
+
+    def _extend(self, mm: mmap.mmap, newline_count: int) -> None:
+        block = config.LINE_INDEX_BLOCK
+        while not self._complete and self._newlines_before[-1] < newline_count:
+            start = (len(self._newlines_before) - 1) * block
+            end = min(start + block, self.size)
+            self._newlines_before.append(self._newlines_before[-1] + mm[start:end].count(b"\n"))
+            self._complete = end >= self.size
+
+    def line_start(self, mm: mmap.mmap, line: int) -> int | None:
+        '''
+        Returns: Byte offset where a 0-based line starts, or None if the file has fewer lines
+
+        :param mm: The mapped file this index was built for
+        :param line: 0-based line number
+        '''
+        if line <= 0:
+            return 0
+        with self._lock:
+            self._extend(mm, line)
+            counts = self._newlines_before
+            if counts[-1] < line:
+                return None
+            # The line starts right after newline number `line`, which falls inside this block
+            b = bisect_left(counts, line) - 1
+
+        pos = b * config.LINE_INDEX_BLOCK
+        for _ in range(line - counts[b]):
+            pos = mm.find(b"\n", pos) + 1
+        return pos if pos < self.size else None
+
+
+_indexes: OrderedDict[tuple[str, int, int], LineIndex] = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+def _index_for(target: Path, mtime_ns: int, size: int) -> LineIndex:
+    key = (str(target), mtime_ns, size)
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            index = _indexes[key] = LineIndex(size)
+        _indexes.move_to_end(key)
+        while len(_indexes) > config.LINE_INDEX_FILES:
+            _indexes.popitem(last=False)
+    return index
+
+
+def _char_boundary(mm: mmap.mmap, pos: int, size: int) -> int:
+    # Back off so a multi-byte UTF-8 sequence is not split across two reads
+    start = pos
+    while pos < size and pos > start - 3 and mm[pos] & 0xC0 == 0x80:
+        pos -= 1
+    return pos
+
+
+def _char_end(mm: mmap.mmap, pos: int, size: int) -> int:
+    # Just past the UTF-8 sequence that starts at pos
+    pos += 1
+    while pos < size and mm[pos] & 0xC0 == 0x80:
+        pos += 1
+    return pos
+
+
+def read_range(target: Path, display_path: str, offset: int | None = None, length: int | None = None,
+               start_line: int | None = None, end_line: int | None = None) -> str:
+    '''
+    Reads part of a file, by byte offset or by 1-based inclusive line range
+    Returns: The decoded text, followed by a note on how to continue when more content follows
+
+    :param target: Resolved path of the file
+    :param display_path: Path as the model gave it, used in notes
+    :param offset: Byte offset to start from (ignored when start_line is given)
+    :param length: Maximum bytes to return, capped at config.MAX_CHARS
+    :param start_line: First line to return, 1-based
+    :param end_line: Last line to return, inclusive
+    '''
+    stat = target.stat()
+    size = stat.st_size
+    cap = min(length, config.MAX_CHARS) if length and length > 0 else config.MAX_CHARS
+
+    if size == 0:
+        return ""
+
+    with open(target, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        if start_line is not None:
+            index = _index_for(target, stat.st_mtime_ns, size)
+            start = index.line_start(mm, max(start_line, 1) - 1)
+            if start is None:
+                return f'Error: "{display_path}" has fewer than {start_line} lines'
+            stop = size
+            if end_line is not None and end_line >= start_line:
+                stop = index.line_start(mm, end_line)
+                stop = size if stop is None else stop
+        else:
+            start = min(max(offset or 0, 0), size)
+            stop = size
+
+        end = min(stop, start + cap)
+        if end < stop:
+            end = _char_boundary(mm, end, size)
+            if end <= start:
+                # length is shorter than the character at start: return that whole character, so the next read moves on
+                end = _char_end(mm, start, stop)
+        text = mm[start:end].decode("utf-8", errors="replace")
+
+    if end < stop:
+        text += f'\n[...Range of "{display_path}" truncated at {cap} bytes, continue with offset={end}]'
+    elif start_line is not None and end < size:
+        text += f'\n[...More lines follow in "{display_path}", continue with start_line={(end_line or start_line) + 1}]'
+    elif start_line is None and end < size:
+        text += f'\n[...More content follows in "{display_path}", continue with offset={end}]'
+    return text
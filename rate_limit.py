@@ -0,0 +1,268 @@
+"""
+Rate-limit-aware wrapper around the Gemini client.
+Every model call first reserves capacity from shared token buckets (requests/min and tokens/min from config),
+and retryable failures (429, 5xx, dropped connections) are retried with jittered exponential backoff.
+"""
+
+import asyncio
+import random
+import threading
+import time
+from collections.abc import Callable, Iterator
+from typing import Any
+
+import httpx
+from google.genai import errors, types
+
+import config
+import tracing
+from history import estimate_tokens
+
+RETRYABLE_CODES: frozenset[int] = frozenset({408, 429, 500, 502, 503, 504})
+
+
+class TokenBucket:
+    '''
+    Refills at rate_per_minute up to capacity. reserve() always succeeds and lets the balance go negative,
+    returning how long the caller must wait before its reservation is covered. That keeps callers in FIFO
+    order without a queue, and works the same from threads and from the event loop.
+    '''
+
+    def __init__(self, rate_per_minute: float, capacity: float | None = None, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else rate_per_minute
+        self._clock = clock
+        self._level = self.capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self._level = min(self.capacity, self._level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, amount: float) -> float:
+        '''
+        Takes amount from the bucket
+        Returns: Seconds to wait before the reservation is covered (0 when capacity is available)
+        '''
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            self._refill()
+            # A single request larger than the bucket can never be covered, cap it at a full bucket
+            self._level -= min(amount, self.capacity)
+            return 0.0 if self._level >= 0 else -self._level / self.rate
+
+    def adjust(self, amount: float) -> None:
+        '''
+        Returns (positive) or takes (negative) capacity after the fact, e.g. when real usage differs from the estimate
+        '''
+        if self.rate <= 0:
+            return
+        with self._lock:
+            self._refill()
+            self._level = min(self.capacity, self._level + amount)
+
+
+class RequestScheduler:
+    '''
+    Shared request and token budgets plus queueing/retry metrics for every client in the process.
+    '''
+
+    def __init__(self, requests_per_minute: float = config.REQUESTS_PER_MINUTE,
+                 tokens_per_minute: float = config.TOKENS_PER_MINUTE, clock: Callable[[], float] = time.monotonic):
+        self.requests = TokenBucket(requests_per_minute, clock=clock)
+        self.tokens = TokenBucket(tokens_per_minute, clock=clock)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.queued = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.retries = 0
+        self.failures = 0
+
+    def reserve(self, estimated_tokens: int) -> float:
+        '''
+        Returns: Seconds the caller should wait before sending a request of this estimated size
+        '''
+        wait = max(self.requests.reserve(1), self.tokens.reserve(estimated_tokens))
+        tracing.count("queued_ms", round(wait * 1000, 3))
+        with self._lock:
+            self.calls += 1
+            if wait > 0:
+                self.queued += 1
+                self.total_wait += wait
+                self.max_wait = max(self.max_wait, wait)
+        return wait
+
+    def settle(self, estimated_tokens: int, response: Any) -> None:
+        '''
+        Corrects the token bucket with the real usage reported by the response
+        '''
+        usage = getattr(response, "usage_metadata", None)
+        actual = getattr(usage, "total_token_count", None) if usage is not None else None
+        if actual:
+            self.tokens.adjust(estimated_tokens - actual)
+
+    def record_retry(self, wait: float) -> None:
+        tracing.count("retries")
+        with self._lock:
+            self.retries += 1
+            self.total_wait += wait
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+
+    def reset_stats(self) -> None:
+        '''
+        Zeroes the counters stats() reports; the buckets keep their balance, so limits still span the reset
+        '''
+        with self._lock:
+            self.calls = 0
+            self.queued = 0
+            self.total_wait = 0.0
+            self.max_wait = 0.0
+            self.retries = 0
+            self.failures = 0
+
+    def stats(self) -> str:
+        return (
+            f"Scheduler: {self.calls} calls, {self.queued} queued, {self.retries} retries, {self.failures} failures, "
+            f"waited {self.total_wait:.2f}s total ({self.max_wait:.2f}s max)"
+        )
+
+
+SCHEDULER = RequestScheduler()
+
+
+def is_retryable(error: BaseException) -> bool:
+    if isinstance(error, errors.APIError):
+        return error.code in RETRYABLE_CODES
+    # The client's own transport failures (refused connects, read timeouts, dropped streams) come from httpx
+    return isinstance(error, (ConnectionError, TimeoutError, httpx.TransportError))
+
+
+def backoff_delay(attempt: int) -> float:
+    '''
+    Full-jitter exponential backoff
+    Returns: Random delay in [0, min(BACKOFF_MAX, BACKOFF_BASE * 2**attempt)]
+    '''
+    return random.uniform(0, min(config.BACKOFF_MAX, config.BACKOFF_BASE * 2 ** attempt))
+
+
+def _estimate(contents: Any) -> int:
+    if isinstance(contents, types.Content):
+        contents = [contents]
+    if isinstance(contents, list):
+        return sum(estimate_tokens(c) if isinstance(c, types.Content) else len(str(c)) // config.CHARS_PER_TOKEN for c in contents)
+    return len(str(contents)) // config.CHARS_PER_TOKEN
+
+
+class _Models:
+    def __init__(self, models: Any, scheduler: RequestScheduler, sleep: Callable[[float], None]):
+        self._models = models
+        self._scheduler = scheduler
+        self._sleep = sleep
+
+    def generate_content(self, **kwargs: Any) -> Any:
+        estimated = _estimate(kwargs.get("contents"))
+        for attempt in range(config.MAX_RETRIES + 1):
+            self._sleep(self._scheduler.reserve(estimated))
+            try:
+                response = self._models.generate_content(**kwargs)
+            except Exception as e:
+                if not is_retryable(e) or attempt == config.MAX_RETRIES:
+                    self._scheduler.record_failure()
+                    raise
+                delay = backoff_delay(attempt)
+                self._scheduler.record_retry(delay)
+                self._sleep(delay)
+                continue
+            self._scheduler.settle(estimated, response)
+            return response
+
+    def generate_content_stream(self, **kwargs: Any) -> Iterator[Any]:
+        # A stream can only be retried before it has produced anything
+        estimated = _estimate(kwargs.get("contents"))
+        for attempt in range(config.MAX_RETRIES + 1):
+            self._sleep(self._scheduler.reserve(estimated))
+            started = False
+            last = None
+            try:
+                for chunk in self._models.generate_content_stream(**kwargs):
+                    started = True
+                    last = chunk
+                    yield chunk
+            except Exception as e:
+                if started or not is_retryable(e) or attempt == config.MAX_RETRIES:
+                    self._scheduler.record_failure()
+                    raise
+                delay = backoff_delay(attempt)
+                self._scheduler.record_retry(delay)
+                self._sleep(delay)
+                continue
+            self._scheduler.settle(estimated, last)
+            return
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._models, name)
+
+
+class _AsyncModels:
+    def __init__(self, models: Any, scheduler: RequestScheduler):
+        self._models = models
+        self._scheduler = scheduler
+
+    async def generate_content(self, **kwargs: Any) -> Any:
+        estimated = _estimate(kwargs.get("contents"))
+        for attempt in range(config.MAX_RETRIES + 1):
+            await asyncio.sleep(self._scheduler.reserve(estimated))
+            try:
+                response = await self._models.generate_content(**kwargs)
+            except Exception as e:
+                if not is_retryable(e) or attempt == config.MAX_RETRIES:
+                    self._scheduler.record_failure()
+                    raise
+                delay = backoff_delay(attempt)
+                self._scheduler.record_retry(delay)
+                await asyncio.sleep(delay)
+                continue
+            self._scheduler.settle(estimated, response)
+            return response
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._models, name)
+
+
+class _Aio:
+    def __init__(self, aio: Any, scheduler: RequestScheduler):
+        self.models = _AsyncModels(aio.models, scheduler)
+        self._aio = aio
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._aio, name)
+
+
+class RateLimitedClient:
+    '''
+    Drop-in wrapper for genai.Client: client.models.generate_content(_stream) and client.aio.models.generate_content
+    go through the scheduler, everything else is passed straight to the wrapped client.
+    '''
+
+    def __init__(self, client: Any, scheduler: RequestScheduler = SCHEDULER, sleep: Callable[[float], None] = time.sleep):
+        self._client = client
+        self.scheduler = scheduler
+        self.models = _Models(client.models, scheduler, sleep)
+        self._aio: _Aio | None = None
+
+    @property
+    def aio(self) -> _Aio:
+        # Built lazily, the async side of the real client is only created when first used
+        if self._aio is None:
+            self._aio = _Aio(self._client.aio, self.scheduler)
+        return self._aio
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._client, name)
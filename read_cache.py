@@ -0,0 +1,111 @@
+"""
+Per-session cache for the read-only tools (get_file_content, get_files_info).
+Entries are keyed on the resolved path plus its mtime_ns/size, so a changed file never hits a stale entry.
+"""
+
+import threading
+from collections import OrderedDict
+from collections.abc import Callable
+from pathlib import Path
+from typing import Hashable
+
+import config
+import tracing
+
+
+class ReadCache:
+    '''
+    LRU cache of tool results bounded by a byte budget.
+    The first two elements of every key are (kind, resolved path as str), which is what invalidation matches on.
+    Also remembers which versions have already been handed to the model, so a repeat read can be answered
+    with a short "unchanged" notice instead of the full content.
+    '''
+
+    def __init__(self, max_bytes: int = config.READ_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[tuple[Hashable, ...], tuple[str, int]] = OrderedDict()
+        self._bytes = 0
+        self._delivered: set[tuple[Hashable, ...]] = set()
+        self._lock = threading.Lock()
+
+    def fetch(self, key: tuple[Hashable, ...], load: Callable[[], str]) -> tuple[str, bool]:
+        '''
+        Returns the cached value for key, loading and storing it on a miss
+        Returns: (value, True if this exact version was already returned earlier in the session)
+
+        :param key: (kind, resolved path, ...version and parameters)
+        :param load: Produces the value on a miss, exceptions propagate and nothing is cached
+        '''
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                tracing.count("cache_hits")
+                delivered = key in self._delivered
+                self._delivered.add(key)
+                return entry[0], delivered
+            self.misses += 1
+        tracing.count("cache_misses")
+
+        value = load()
+        size = len(value.encode("utf-8", errors="replace"))
+
+        with self._lock:
+            delivered = key in self._delivered
+            self._delivered.add(key)
+            if size <= self.max_bytes and key not in self._entries:
+                self._entries[key] = (value, size)
+                self._bytes += size
+                while self._bytes > self.max_bytes:
+                    _, (_, evicted) = self._entries.popitem(last=False)
+                    self._bytes -= evicted
+        return value, delivered
+
+    def invalidate(self, target: Path) -> None:
+        '''
+        Drops everything cached for target and the listings of every directory above it
+
+        :param target: Resolved path that was just written
+        '''
+        changed = str(target)
+        ancestors = {str(p) for p in target.parents}
+        with self._lock:
+            stale = [k for k in self._entries if k[1] == changed or (k[0] == "listing" and k[1] in ancestors)]
+            for key in stale:
+                self._bytes -= self._entries.pop(key)[1]
+            self._delivered = {k for k in self._delivered if k[1] != changed and k[1] not in ancestors}
+
+    def invalidate_listings(self) -> None:
+        '''
+        Drops every directory listing. Used after running code, which can change file sizes without touching
+        directory mtimes. File contents validate themselves against mtime/size and are kept.
+        '''
+        with self._lock:
+            stale = [k for k in self._entries if k[0] == "listing"]
+            for key in stale:
+                self._bytes -= self._entries.pop(key)[1]
+            self._delivered = {k for k in self._delivered if k[0] != "listing"}
+
+    def forget_delivered(self) -> None:
+        '''
+        Forgets what the model has already seen, e.g. after old results were removed from the history
+        '''
+        with self._lock:
+            self._delivered.clear()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._delivered.clear()
+            self._bytes = 0
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> str:
+        return f"Read cache: {self.hits} hits, {self.misses} misses, {len(self._entries)} entries ({self._bytes} bytes)"
+
+
+CACHE = ReadCache()
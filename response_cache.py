@@ -0,0 +1,192 @@
+"""
+Record/replay cache for model calls.
+Responses are stored on disk under a hash of (model, generation config incl. system prompt and tool declarations,
+message history). Record mode fills the cache from the live client, replay mode serves only from disk.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections.abc import Iterator
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any
+
+from google.genai import types
+
+import config
+import tracing
+
+MODES: tuple[str, ...] = config.RESPONSE_CACHE_MODES
+
+
+class ReplayMiss(RuntimeError):
+    '''
+    Raised in replay mode when a request was never recorded
+    '''
+
+
+def _dump(value: Any) -> Any:
+    if hasattr(value, "model_dump"):
+        return value.model_dump(mode="json", exclude_none=True)
+    if isinstance(value, list):
+        return [_dump(v) for v in value]
+    return value
+
+
+def _strip_tool_results(contents: list[Any]) -> list[Any]:
+    # Keeps which tool answered but not what it said, for sessions whose tool output varies run to run
+    stripped = []
+    for content in contents:
+        if isinstance(content, dict):
+            parts = [
+                {"function_response": {"name": p["function_response"].get("name")}} if "function_response" in p else p
+                for p in content.get("parts", [])
+            ]
+            content = {**content, "parts": parts}
+        stripped.append(content)
+    return stripped
+
+
+def request_key(model: str, contents: Any, llm_config: Any, include_tool_results: bool = True) -> str:
+    '''
+    Returns: sha256 hex digest identifying a request
+
+    :param model: Model name
+    :param contents: Message history sent to the model
+    :param llm_config: GenerateContentConfig (system prompt + tool declarations)
+    :param include_tool_results: False leaves function response payloads out of the key
+    '''
+    history = _dump(contents if isinstance(contents, list) else [contents])
+    if not include_tool_results:
+        history = _strip_tool_results(history)
+    payload = {"model": model, "config": _dump(llm_config), "contents": history}
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+class ResponseStore:
+    '''
+    One JSON file per request key, written atomically so concurrent sessions can share a directory.
+    '''
+
+    def __init__(self, directory: str = config.RESPONSE_CACHE_DIR):
+        self.directory = Path(directory)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.json"
+
+    def load(self, key: str) -> list[types.GenerateContentResponse] | None:
+        '''
+        Returns: The recorded responses (one, or every chunk of a stream), or None on a miss
+        '''
+        path = self._path(key)
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            tracing.annotate(response_cache="miss")
+            return None
+        with self._lock:
+            self.hits += 1
+        tracing.annotate(response_cache="hit")
+        return [types.GenerateContentResponse.model_validate(r) for r in data["responses"]]
+
+    def save(self, key: str, model: str, responses: list[types.GenerateContentResponse]) -> None:
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        data = {"model": model, "responses": [_dump(r) for r in responses]}
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp, path)
+
+    def stats(self) -> str:
+        return f"Response cache: {self.hits} hits, {self.misses} misses ({self.directory})"
+
+
+class _Models:
+    def __init__(self, owner: "CachingClient", models: Any):
+        self._owner = owner
+        self._models = models
+
+    def generate_content(self, *, model: str, contents: Any, config: Any = None) -> types.GenerateContentResponse:
+        key = self._owner.key(model, contents, config)
+        cached = self._owner.store.load(key)
+        if cached is not None:
+            return cached[0]
+        self._owner.check_live(key)
+        response = self._models.generate_content(model=model, contents=contents, config=config)
+        self._owner.store.save(key, model, [response])
+        return response
+
+    def generate_content_stream(self, *, model: str, contents: Any, config: Any = None) -> Iterator[types.GenerateContentResponse]:
+        key = self._owner.key(model, contents, config)
+        cached = self._owner.store.load(key)
+        if cached is not None:
+            yield from cached
+            return
+        self._owner.check_live(key)
+        chunks = []
+        for chunk in self._models.generate_content_stream(model=model, contents=contents, config=config):
+            chunks.append(chunk)
+            yield chunk
+        self._owner.store.save(key, model, chunks)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._models, name)
+
+
+class _AsyncModels:
+    def __init__(self, owner: "CachingClient", models: Any):
+        self._owner = owner
+        self._models = models
+
+    async def generate_content(self, *, model: str, contents: Any, config: Any = None) -> types.GenerateContentResponse:
+        key = self._owner.key(model, contents, config)
+        cached = self._owner.store.load(key)
+        if cached is not None:
+            return cached[0]
+        self._owner.check_live(key)
+        response = await self._models.generate_content(model=model, contents=contents, config=config)
+        self._owner.store.save(key, model, [response])
+        return response
+
+
+class CachingClient:
+    '''
+    Wraps a client (or None in replay mode) so generate_content calls are served from / recorded to a ResponseStore.
+
+    :param client: The client to record from, may be None when mode is "replay"
+    :param mode: "record" (serve hits, record misses) or "replay" (serve hits, raise ReplayMiss on a miss)
+    :param store: Where responses live, defaults to config.RESPONSE_CACHE_DIR
+    :param include_tool_results: False keys requests without function response payloads
+    '''
+
+    def __init__(self, client: Any, mode: str = "record", store: ResponseStore | None = None,
+                 include_tool_results: bool = config.RESPONSE_CACHE_KEY_TOOL_RESULTS):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"CachingClient mode must be record or replay, not {mode!r}")
+        if client is None and mode != "replay":
+            raise ValueError("A live client is required to record")
+        self.mode = mode
+        self.store = store or ResponseStore()
+        self.include_tool_results = include_tool_results
+        self._client = client
+        self.models = _Models(self, client.models if client is not None else None)
+        self.aio = SimpleNamespace(models=_AsyncModels(self, client.aio.models if client is not None else None))
+
+    def key(self, model: str, contents: Any, llm_config: Any) -> str:
+        return request_key(model, contents, llm_config, self.include_tool_results)
+
+    def check_live(self, key: str) -> None:
+        if self.mode == "replay":
+            raise ReplayMiss(f"No recorded response for request {key} in {self.store.directory}")
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._client, name)
@@ -0,0 +1,295 @@
+"""
+Token budgets for tool results, and compact encodings that fit more into them.
+Every result is first re-encoded for its tool (listings as a table, search matches grouped by file, repeated
+tracebacks and repeated lines folded), which keeps all of its information. Only a result still over its tool's
+budget, or a turn whose results together exceed the turn budget, loses lines from the middle.
+File contents are never re-encoded: the model copies text out of them verbatim for apply_edit.
+Tokens are estimated the way history.estimate_tokens does (serialized characters / config.CHARS_PER_TOKEN).
+"""
+
+import json
+import re
+import threading
+from collections.abc import Callable
+
+import config
+
+_TRACEBACK = "Traceback (most recent call last):"
+_LISTING = re.compile(r"- (.+): file_size=(\d+), is_dir=(True|False)")
+_MATCH = re.compile(r"([^:\n]+):(\d+): ?(.*)")
+_FAILURE = re.compile(r"(FAILED|ERROR) \S+ \(", re.MULTILINE)
+
+
+def estimate_tokens(text: str) -> int:
+    '''
+    Returns: Approximate tokens text costs as a function response value
+    '''
+    return max(1, len(json.dumps(text, ensure_ascii=False)) // config.CHARS_PER_TOKEN)
+
+
+# --- encodings: each takes a result and returns an equivalent, shorter one (or the same text) ---
+
+def tabular_listing(text: str) -> str:
+    '''
+    get_files_info lines ("- pkg/a.py: file_size=120, is_dir=False") as a two-column table; directories end
+    with "/" and have no size. Any other line (paging notices) is kept as it is.
+    '''
+    lines = text.split("\n")
+    rows = []
+    for line in lines:
+        match = _LISTING.fullmatch(line)
+        if match is None:
+            rows.append(line)
+        elif match[3] == "True":
+            rows.append(f"{match[1]}/")
+        else:
+            rows.append(f"{match[1]}\t{match[2]}")
+    if rows == lines:
+        return text
+    return "path\tbytes (directories end with /)\n" + "\n".join(rows)
+
+
+def grouped_matches(text: str) -> str:
+    '''
+    search_code lines ("pkg/a.py:12: text") grouped under one header per file
+    '''
+    out = []
+    current = None
+    for line in text.split("\n"):
+        match = _MATCH.fullmatch(line)
+        if match is None:
+            out.append(line)
+            current = None
+            continue
+        if match[1] != current:
+            current = match[1]
+            out.append(f"{current}:")
+        out.append(f"  {match[2]}: {match[3]}")
+    return "\n".join(out)
+
+
+def _indent(line: str) -> int:
+    return len(line) - len(line.lstrip(" "))
+
+
+def _is_header(line: str) -> bool:
+    # Python's own header (after an "STDERR: " prefix too) or a run_tests failure, whose traceback is indented
+    return line.endswith(_TRACEBACK) or _FAILURE.match(line) is not None
+
+
+def _split_traceback(body: list[str]) -> tuple[tuple[tuple[str, ...], ...], list[str]]:
+    # Frames are a 'File "..."' line plus the deeper source and ^^^ lines under it, the rest is the exception
+    frames: list[list[str]] = []
+    rest: list[str] = []
+    for line in body:
+        if line.lstrip().startswith('File "'):
+            frames.append([line])
+        elif frames and not rest and _indent(line) > _indent(frames[-1][0]):
+            frames[-1].append(line)
+        else:
+            rest.append(line)
+    return tuple(tuple(frame) for frame in frames), rest
+
+
+def deduplicated_tracebacks(text: str) -> str:
+    '''
+    A traceback whose frames match an earlier one's keeps only its header and exception, and the leading frames
+    a traceback shares with the previous one (test runner and framework frames) are counted instead of repeated.
+    '''
+    if _TRACEBACK not in text and _FAILURE.search(text) is None:
+        return text
+    lines = text.split("\n")
+    out = []
+    seen: set[tuple[tuple[str, ...], ...]] = set()
+    previous: tuple[tuple[str, ...], ...] = ()
+    i = 0
+    while i < len(lines):
+        line = lines[i]
+        out.append(line)
+        i += 1
+        if not _is_header(line):
+            continue
+        indent = _indent(line)
+        end = i
+        while end < len(lines) and lines[end].strip() and _indent(lines[end]) > indent:
+            end += 1
+        # Python ends its traceback with the exception at the header's own indentation
+        if line.endswith(_TRACEBACK) and end < len(lines) and lines[end].strip():
+            end += 1
+        frames, rest = _split_traceback(lines[i:end])
+        marker = " " * (_indent(frames[0][0]) if frames else indent + 2)
+        if frames and frames in seen:
+            out.append(f"{marker}[Same frames as a traceback above]")
+        else:
+            seen.add(frames)
+            shared = 0
+            while shared < min(len(frames), len(previous)) - 1 and frames[shared] == previous[shared]:
+                shared += 1
+            if shared > 1:
+                out.append(f"{marker}[{shared} frames as in the traceback above]")
+            else:
+                shared = 0
+            for frame in frames[shared:]:
+                out.extend(frame)
+            previous = frames
+        out.extend(rest)
+        i = end
+    return "\n".join(out)
+
+
+def folded_repeats(text: str) -> str:
+    '''
+    Runs of three or more identical lines become the line once and a count
+    '''
+    lines = text.split("\n")
+    out = []
+    i = 0
+    while i < len(lines):
+        end = i + 1
+        while end < len(lines) and lines[end] == lines[i]:
+            end += 1
+        out.append(lines[i])
+        if end - i >= 3:
+            out.append(f"[Previous line repeated {end - i - 1} more times]")
+        elif end - i == 2:
+            out.append(lines[i])
+        i = end
+    return "\n".join(out)
+
+
+ENCODINGS: dict[str, tuple[Callable[[str], str], ...]] = {
+    "get_files_info": (tabular_listing,),
+    "search_code": (grouped_matches,),
+    "run_python_file": (deduplicated_tracebacks, folded_repeats),
+    "run_tests": (deduplicated_tracebacks, folded_repeats),
+}
+
+
+def truncated(text: str, budget: int) -> str:
+    '''
+    Returns: text cut to about budget tokens, keeping whole lines from the start and the end (where errors and
+    summaries usually are) around a marker saying how much was left out
+    '''
+    if estimate_tokens(text) <= budget:
+        return text
+    # Measured as estimate_tokens measures: escaped, with "\n" between lines. Leave room for the marker, then
+    # split what is left two thirds head, one third tail
+    chars = max(budget * config.CHARS_PER_TOKEN - 120, 0)
+    lines = text.split("\n")
+    cost = [len(json.dumps(line, ensure_ascii=False)) for line in lines]
+    head: list[str] = []
+    used = 0
+    for line, size in zip(lines, cost):
+        if used + size > chars * 2 // 3:
+            break
+        head.append(line)
+        used += size
+    tail: list[str] = []
+    for index in range(len(lines) - 1, len(head) - 1, -1):
+        if used + cost[index] > chars:
+            break
+        tail.append(lines[index])
+        used += cost[index]
+    tail.reverse()
+    omitted = lines[len(head):len(lines) - len(tail)]
+    if not head and not tail:
+        # One huge line: keep its start
+        return text[:chars] + f"\n[... {len(text) - chars} characters omitted to fit the tool result budget]"
+    marker = (f"[... {len(omitted)} lines (~{estimate_tokens(chr(10).join(omitted))} tokens) omitted to fit the "
+              f"tool result budget]")
+    return "\n".join(head + [marker] + tail)
+
+
+def tool_budget(function_name: str) -> int:
+    return config.TOOL_RESULT_TOKENS_BY_TOOL.get(function_name, config.TOOL_RESULT_TOKENS)
+
+
+class ResultBudget:
+    '''
+    Fits tool results into their budgets and keeps per-tool totals of what that saved
+    '''
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        # tool -> [calls, bytes before, bytes after, tokens before, tokens after]
+        self._totals: dict[str, list[int]] = {}
+
+    def fit(self, function_name: str, result: str, budget: int | None = None) -> str:
+        '''
+        Returns: result in its compact encoding, cut to the tool's budget if it is still over it
+
+        :param function_name: Tool that produced the result
+        :param result: The tool's output
+        :param budget: Tokens allowed, defaults to the tool's budget
+        '''
+        if not isinstance(result, str):
+            return result
+        fitted = result
+        if config.COMPACT_TOOL_RESULTS and not fitted.startswith("Error:"):
+            for encode in ENCODINGS.get(function_name, ()):
+                fitted = encode(fitted)
+        fitted = truncated(fitted, tool_budget(function_name) if budget is None else budget)
+        self._count(function_name, result, fitted)
+        return fitted
+
+    def fit_turn(self, results: list[tuple[str, str]], budget: int | None = None) -> list[str]:
+        '''
+        Shares a turn's budget between its results: the small ones keep everything, the large ones split what
+        is left evenly and are cut to their share.
+        Returns: The results, in the same order
+
+        :param results: (tool name, already fitted result) per call
+        :param budget: Tokens allowed for all of them together, defaults to config.TURN_RESULT_TOKENS
+        '''
+        budget = config.TURN_RESULT_TOKENS if budget is None else budget
+        costs = [estimate_tokens(text) for _, text in results]
+        if sum(costs) <= budget:
+            return [text for _, text in results]
+        shares = {}
+        left = budget
+        order = sorted(range(len(results)), key=costs.__getitem__)
+        for position, index in enumerate(order):
+            shares[index] = min(costs[index], left // (len(order) - position))
+            left -= shares[index]
+        fitted = []
+        for index, (name, text) in enumerate(results):
+            if costs[index] <= shares[index]:
+                fitted.append(text)
+                continue
+            cut = truncated(text, max(shares[index], 1))
+            self._count(name, text, cut, call=False)
+            fitted.append(cut)
+        return fitted
+
+    def _count(self, function_name: str, before: str, after: str, call: bool = True) -> None:
+        with self._lock:
+            totals = self._totals.setdefault(function_name, [0, 0, 0, 0, 0])
+            if call:
+                totals[0] += 1
+                totals[1] += len(before.encode("utf-8", errors="replace"))
+                totals[3] += estimate_tokens(before)
+            else:
+                # A turn cut shrinks a result that was already counted
+                totals[2] -= len(before.encode("utf-8", errors="replace"))
+                totals[4] -= estimate_tokens(before)
+            totals[2] += len(after.encode("utf-8", errors="replace"))
+            totals[4] += estimate_tokens(after)
+
+    def stats(self) -> str:
+        with self._lock:
+            rows = sorted(self._totals.items())
+        if not rows:
+            return "Tool results: none"
+        lines = ["Tool results (saved by compact encodings and budgets):"]
+        for name, (calls, bytes_in, bytes_out, tokens_in, tokens_out) in rows:
+            lines.append(f"  {name:<18} calls={calls:<4} bytes {bytes_in:,} -> {bytes_out:,} "
+                         f"(saved {bytes_in - bytes_out:,}), tokens ~{tokens_in:,} -> ~{tokens_out:,} "
+                         f"(saved ~{tokens_in - tokens_out:,})")
+        return "\n".join(lines)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._totals.clear()
+
+
+BUDGET = ResultBudget()
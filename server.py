@@ -0,0 +1,239 @@
+"""
+Long-running agent server on a local Unix socket, so requests skip process startup and reuse warm state: the
+client and its connection pool, tool modules and declarations, the read, listing and search caches, and (with
+config.PYTHON_WORKERS) the warm Python workers.
+main.py --server sends it a prompt, and --session continues a conversation saved by sessions.py.
+Requests are JSON lines; the server answers with {"out": text} lines (everything the run prints) and a final
+{"done": true, ...} or {"error": message}. Requests run one at a time.
+Usage: python server.py [--socket PATH] [--cache off|record|replay]
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import socket
+import socketserver
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, BinaryIO, TextIO
+
+import config
+
+
+class _Output:
+    '''
+    Text stream that forwards everything written to it to the client as {"out": text} lines
+    '''
+
+    def __init__(self, wfile: BinaryIO):
+        self._wfile = wfile
+
+    def write(self, text: str) -> int:
+        if text:
+            _send(self._wfile, {"out": text})
+        return len(text)
+
+    def flush(self) -> None:
+        self._wfile.flush()
+
+
+def _send(wfile: BinaryIO, message: dict[str, Any]) -> None:
+    wfile.write(json.dumps(message).encode("utf-8") + b"\n")
+    wfile.flush()
+
+
+class AgentServer(socketserver.ThreadingUnixStreamServer):
+    '''
+    Holds the warm state, builds it once at startup
+
+    :param path: Socket path
+    :param cache_mode: Response cache mode for the shared client, one of config.RESPONSE_CACHE_MODES
+    :param client: Client to share instead of building one (tests and benchmarks pass a fake)
+    '''
+
+    daemon_threads = True
+
+    def __init__(self, path: str, cache_mode: str = config.RESPONSE_CACHE_MODE, client: Any = None):
+        import agent
+        import tool_registry
+        import worker_pool
+
+        started = time.perf_counter()
+        self.agent = agent
+        self.cache_mode = cache_mode
+        self.client = client if client is not None else agent.build_client(cache_mode)
+        # Import every tool and build the declarations now rather than on the first request
+        for name in tool_registry.TOOL_NAMES:
+            tool_registry.TOOLS[name]
+        agent.build_llm_config()
+        if config.PYTHON_WORKERS and worker_pool.available():
+            worker_pool.POOL.warm()
+        self.warm_ms = (time.perf_counter() - started) * 1000
+        self.requests = 0
+        # Printed output is captured by swapping sys.stdout, which is process wide, so runs take turns
+        self.lock = threading.Lock()
+        super().__init__(path, _Handler)
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    server: AgentServer
+
+    def handle(self) -> None:
+        try:
+            line = self.rfile.readline()
+            if not line.strip():
+                # A connection that sends nothing (a liveness probe) gets nothing back
+                return
+            request = json.loads(line)
+            op = request.get("op", "run")
+            if op == "run" and not isinstance(request.get("prompt"), str):
+                _send(self.wfile, {"error": "A run request needs a prompt"})
+            elif op == "run":
+                self._run(request)
+            elif op == "stats":
+                _send(self.wfile, {"done": True, "stats": self._stats()})
+            elif op == "shutdown":
+                _send(self.wfile, {"done": True})
+                threading.Thread(target=self.server.shutdown).start()
+            else:
+                _send(self.wfile, {"error": f"Unknown op: {op}"})
+        except json.JSONDecodeError as e:
+            _send(self.wfile, {"error": f"Request is not JSON: {e}"})
+        except (BrokenPipeError, ConnectionResetError):
+            # The client went away, nothing left to tell it
+            pass
+
+    def _run(self, request: dict[str, Any]) -> None:
+        import output_capture
+        import rate_limit
+        import read_cache
+        import result_budget
+        import tracing
+
+        agent = self.server.agent
+        with self.server.lock:
+            started = time.perf_counter()
+            self.server.requests += 1
+            # What an earlier request's model has seen says nothing about this conversation
+            read_cache.CACHE.forget_delivered()
+            # The run's summary (and the stats op until the next run) only counts this request
+            tracing.TRACER.reset()
+            rate_limit.SCHEDULER.reset_stats()
+            result_budget.BUDGET.clear()
+            try:
+                with contextlib.redirect_stdout(_Output(self.wfile)):
+                    text = agent.run(
+                        request["prompt"], verbose=request.get("verbose", False),
+                        stream=request.get("stream", config.STREAM_RESPONSES), trace=request.get("trace"),
+                        session=request.get("session"), client=self.server.client,
+                    )
+            except (BrokenPipeError, ConnectionResetError):
+                raise
+            except Exception as e:
+                _send(self.wfile, {"error": f"{type(e).__name__}: {e}"})
+                return
+            finally:
+                output_capture.set_live(False)
+            _send(self.wfile, {"done": True, "text": text, "ms": round((time.perf_counter() - started) * 1000, 3)})
+
+    def _stats(self) -> str:
+        import rate_limit
+        import read_cache
+        import result_budget
+
+        lines = [
+            f"Agent server: {self.server.requests} requests, warm in {self.server.warm_ms:.0f}ms, cache mode {self.server.cache_mode}",
+            read_cache.CACHE.stats(),
+            "Last request:",
+            rate_limit.SCHEDULER.stats(),
+            result_budget.BUDGET.stats(),
+        ]
+        return "\n".join(lines)
+
+
+def submit(request: dict[str, Any], path: str = config.SERVER_SOCKET, out: TextIO | None = None) -> dict[str, Any]:
+    '''
+    Sends one request to a running server and copies its output to out as it arrives
+    Returns: The final message ({"done": true, ...} or {"error": ...})
+    Raises: ConnectionError if no server is listening at path
+
+    :param request: {"op": "run", "prompt": ..., optional "session", "verbose", "stream", "trace"}, or
+        {"op": "stats"} / {"op": "shutdown"}
+    :param path: Socket path of the server
+    :param out: Where the run's output goes, defaults to sys.stdout
+    '''
+    out = out or sys.stdout
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        try:
+            sock.connect(path)
+        except (FileNotFoundError, ConnectionRefusedError) as e:
+            raise ConnectionError(f"No agent server at {path} (start one with: python server.py)") from e
+        sock.sendall(json.dumps(request).encode("utf-8") + b"\n")
+        with sock.makefile("rb") as rfile:
+            for line in rfile:
+                message = json.loads(line)
+                if "out" in message:
+                    out.write(message["out"])
+                    out.flush()
+                else:
+                    return message
+    finally:
+        sock.close()
+    return {"error": "The server closed the connection before answering"}
+
+
+def _claim(path: str) -> None:
+    # A socket file nobody listens on is left over from a server that died, anything else is in use
+    if not os.path.exists(path):
+        return
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+    except (ConnectionRefusedError, FileNotFoundError):
+        os.unlink(path)
+        return
+    finally:
+        probe.close()
+    raise RuntimeError(f"An agent server is already listening at {path}")
+
+
+def serve(path: str = config.SERVER_SOCKET, cache_mode: str = config.RESPONSE_CACHE_MODE) -> None:
+    '''
+    Runs the server until it is sent {"op": "shutdown"} or interrupted
+
+    :param path: Socket path to listen on
+    :param cache_mode: Response cache mode for the shared client
+    '''
+    _claim(path)
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    server = AgentServer(path, cache_mode)
+    print(f"Agent server listening on {path} (warm in {server.warm_ms:.0f}ms)", file=sys.stderr, flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(path)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Keep the agent warm behind a local socket")
+    parser.add_argument("--socket", default=config.SERVER_SOCKET, help="Unix socket to listen on")
+    parser.add_argument("--cache", choices=config.RESPONSE_CACHE_MODES, default=config.RESPONSE_CACHE_MODE,
+                        help="Record model responses to disk, or replay them without calling the API")
+    args = parser.parse_args()
+    try:
+        serve(args.socket, args.cache)
+    except RuntimeError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Conversations saved to disk, so a later run (or the agent server) can continue one by its session id.
+One JSON file per session in config.SESSION_DIR, holding the history's messages as the API would send them
+(after compaction), written atomically.
+"""
+
+import json
+import os
+import re
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+from google.genai import types
+
+import config
+from history import ConversationHistory
+
+_SESSION_ID = re.compile(r"[A-Za-z0-9_.-]{1,64}")
+
+
+def new_id() -> str:
+    return uuid.uuid4().hex[:12]
+
+
+def _path(session_id: str) -> Path:
+    # Ids become file names, so nothing that could leave the session directory
+    if not _SESSION_ID.fullmatch(session_id) or session_id.strip(".") == "":
+        raise ValueError(f"Invalid session id {session_id!r}: use letters, digits, '.', '_' and '-'")
+    return Path(config.SESSION_DIR) / f"{session_id}.json"
+
+
+def exists(session_id: str) -> bool:
+    return _path(session_id).is_file()
+
+
+def load(session_id: str) -> ConversationHistory:
+    '''
+    Returns: The saved conversation, or an empty history for a session that was never saved
+    Raises: ValueError for an invalid session id
+
+    :param session_id: Id given to save
+    '''
+    history = ConversationHistory()
+    try:
+        data = json.loads(_path(session_id).read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return history
+    for message in data["messages"]:
+        history.append(types.Content.model_validate(message))
+    return history
+
+
+def save(session_id: str, history: ConversationHistory) -> Path:
+    '''
+    Writes the conversation so far, replacing any earlier save of the session
+    Returns: Path of the session file
+    Raises: ValueError for an invalid session id
+
+    :param session_id: Id to save under
+    :param history: Conversation to save
+    '''
+    path = _path(session_id)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    data = {
+        "id": session_id,
+        "updated": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "messages": [content.model_dump(mode="json", exclude_none=True) for content in history.messages],
+    }
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+    return path
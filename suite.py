@@ -0,0 +1,196 @@
+"""
+Test discovery and change-based test selection for run_tests.
+Test files are parsed, not imported, to find their test cases and the local modules they import (transitively),
+so after an edit only the test files that can reach a changed module are run again.
+"""
+
+import ast
+import os
+import re
+import threading
+from pathlib import Path
+from typing import Any, NamedTuple
+
+import config
+import dir_index
+
+TEST_FILE = re.compile(r"^(test_.*|.*_test|tests?)\.py$")
+
+
+class ModuleInfo(NamedTuple):
+    imports: frozenset[str]
+    tests: tuple[str, ...]
+
+
+def _is_test_case(node: ast.ClassDef) -> bool:
+    return node.name.startswith("Test") or any(
+        (isinstance(b, ast.Name) and b.id.endswith("TestCase")) or (isinstance(b, ast.Attribute) and b.attr.endswith("TestCase"))
+        for b in node.bases
+    )
+
+
+def parse_module(path: Path, module: str, is_package: bool) -> ModuleInfo:
+    '''
+    Reads the imports and test cases of one Python file without running it
+    Returns: ModuleInfo(absolute dotted names imported, test ids as "Class::method" or "function")
+
+    :param path: File to parse
+    :param module: Its dotted module name, used to resolve relative imports
+    :param is_package: True for an __init__.py
+    '''
+    tree = ast.parse(path.read_bytes(), filename=str(path))
+    package = module if is_package else module.rpartition(".")[0]
+    imports: set[str] = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            imports.update(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            base = node.module or ""
+            if node.level:
+                parts = package.split(".") if package else []
+                parts = parts[:len(parts) - (node.level - 1)] if node.level > 1 else parts
+                base = ".".join(p for p in [*parts, base] if p)
+            if base:
+                imports.add(base)
+            # "from pkg import calculator" may name a submodule
+            imports.update(f"{base}.{alias.name}" if base else alias.name for alias in node.names if alias.name != "*")
+
+    tests = []
+    for node in tree.body:
+        if isinstance(node, ast.ClassDef) and _is_test_case(node):
+            tests += [f"{node.name}::{item.name}" for item in node.body
+                      if isinstance(item, (ast.FunctionDef, ast.AsyncFunctionDef)) and item.name.startswith("test")]
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) and node.name.startswith("test"):
+            tests.append(node.name)
+    return ModuleInfo(frozenset(imports), tuple(tests))
+
+
+def module_name(relative: str) -> tuple[str, bool]:
+    '''
+    Returns: (dotted module name, is a package) for a path relative to the root, e.g. "pkg/calculator.py"
+    '''
+    parts = relative[:-3].split("/")
+    if parts[-1] == "__init__":
+        return ".".join(parts[:-1]), True
+    return ".".join(parts), False
+
+
+class Suite:
+    '''
+    Test files of one working directory, the local modules each depends on, and what was true at the last run.
+    '''
+
+    def __init__(self, root: Path):
+        self.root = root
+        self._lock = threading.Lock()
+        self._parsed: dict[str, tuple[int, int, ModuleInfo]] = {}
+        # Test file -> fingerprints of its dependencies when it last ran, and the results of that run
+        self.last_run: dict[str, tuple[dict[str, tuple[int, int] | None], list[dict[str, Any]]]] = {}
+
+    def discover(self) -> list[str]:
+        '''
+        Returns: Relative paths of every test file (test_*.py, *_test.py, tests.py, test.py), sorted
+        '''
+        return sorted(
+            relative for relative, entry in dir_index.INDEX.walk(str(self.root), None, config.LISTING_SKIP_DIRS)
+            if not entry.is_dir and TEST_FILE.match(entry.name)
+        )
+
+    def _fingerprint(self, relative: str) -> tuple[int, int] | None:
+        try:
+            st = os.stat(self.root / relative)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def info(self, relative: str) -> ModuleInfo:
+        '''
+        Returns: Parsed imports and tests of a file, cached until it changes (empty if it can't be parsed)
+        '''
+        fingerprint = self._fingerprint(relative)
+        with self._lock:
+            cached = self._parsed.get(relative)
+        if cached is not None and fingerprint is not None and cached[:2] == fingerprint:
+            return cached[2]
+        module, is_package = module_name(relative)
+        try:
+            info = parse_module(self.root / relative, module, is_package)
+        except (OSError, SyntaxError, ValueError):
+            info = ModuleInfo(frozenset(), ())
+        if fingerprint is not None:
+            with self._lock:
+                self._parsed[relative] = (*fingerprint, info)
+        return info
+
+    def _resolve(self, dotted: str, importer: str) -> list[str]:
+        # A module and the packages above it all run on import; the importer's own directory is
+        # searched too, since running a test file directly puts it on sys.path
+        found = []
+        for prefix in {"", importer.rpartition("/")[0]}:
+            parts = dotted.split(".")
+            for n in range(1, len(parts) + 1):
+                stem = "/".join(p for p in [prefix, *parts[:n]] if p)
+                for candidate in (f"{stem}.py", f"{stem}/__init__.py"):
+                    if (self.root / candidate).is_file():
+                        found.append(candidate)
+        return found
+
+    def dependencies(self, test_file: str) -> set[str]:
+        '''
+        Returns: The test file plus every local module it can import, directly or not, and the conftest.py files above it
+        '''
+        seen = {test_file}
+        pending = [test_file]
+        while pending:
+            current = pending.pop()
+            for dotted in self.info(current).imports:
+                for found in self._resolve(dotted, current):
+                    if found not in seen:
+                        seen.add(found)
+                        pending.append(found)
+        parts = test_file.split("/")[:-1]
+        for n in range(len(parts) + 1):
+            conftest = "/".join([*parts[:n], "conftest.py"])
+            if (self.root / conftest).is_file():
+                seen.add(conftest)
+        return seen
+
+    def select(self, test_files: list[str], rerun_all: bool) -> tuple[list[str], set[str], dict[str, dict]]:
+        '''
+        Decides which test files must run
+        Returns: (files to run, changed files that caused it, current fingerprints of each file's dependencies)
+        '''
+        to_run = []
+        changed: set[str] = set()
+        current: dict[str, dict] = {}
+        for test_file in test_files:
+            fingerprints = {dep: self._fingerprint(dep) for dep in self.dependencies(test_file)}
+            current[test_file] = fingerprints
+            previous = self.last_run.get(test_file)
+            if rerun_all or previous is None:
+                to_run.append(test_file)
+                continue
+            moved = {dep for dep, fp in fingerprints.items() if previous[0].get(dep) != fp}
+            moved |= previous[0].keys() - fingerprints.keys()
+            if moved:
+                to_run.append(test_file)
+                changed |= moved
+        return to_run, changed, current
+
+    def record(self, test_file: str, fingerprints: dict, results: list[dict[str, Any]]) -> None:
+        self.last_run[test_file] = (fingerprints, results)
+
+
+_SUITES: dict[str, Suite] = {}
+_SUITES_LOCK = threading.Lock()
+
+
+def suite_for(root: Path) -> Suite:
+    '''
+    Returns: The session's Suite for a resolved working directory
+    '''
+    with _SUITES_LOCK:
+        suite = _SUITES.get(str(root))
+        if suite is None:
+            suite = _SUITES[str(root)] = Suite(root)
+        return suite
@@ -0,0 +1,178 @@
+"""
+Test runner started by run_tests in the working directory, like a script run by run_python_file.
+Stdlib only and it never imports anything from this repo. Files with plain pytest-style tests go through
+pytest when it is installed; everything else runs with unittest, or as plain calls when pytest is missing.
+
+Usage: python suite_worker.py RESULTS_FILE TEST_FILE [TEST_FILE ...]
+Writes one JSON record per test to RESULTS_FILE as it finishes: {"file", "id", "outcome", "seconds", "message"},
+then {"file", "done": true} once every test of a file has run.
+"""
+
+import importlib.util
+import inspect
+import json
+import os
+import sys
+import time
+import traceback
+import unittest
+
+# Keep the end of a traceback, where the assertion is
+_MESSAGE_LINES = 12
+_MESSAGE_CHARS = 1500
+
+
+def _message(exc_info) -> str:
+    lines = "".join(traceback.format_exception(*exc_info)).rstrip().splitlines()
+    text = "\n".join(lines[-_MESSAGE_LINES:])
+    return text[-_MESSAGE_CHARS:]
+
+
+class _Recorder:
+    def __init__(self, out, test_file: str):
+        self.out = out
+        self.file = test_file
+
+    def __call__(self, test_id: str, outcome: str, seconds: float, message: str = "") -> None:
+        record = {"file": self.file, "id": test_id, "outcome": outcome, "seconds": round(seconds, 6), "message": message}
+        self.out.write(json.dumps(record) + "\n")
+        self.out.flush()
+
+
+class _Result(unittest.TestResult):
+    '''
+    Records each test as it finishes, with its own wall time.
+    '''
+
+    def __init__(self, record: _Recorder):
+        super().__init__()
+        self.record = record
+        self._started = 0.0
+
+    def _id(self, test) -> str:
+        name = getattr(test, "_testMethodName", None)
+        return f"{self.record.file}::{type(test).__name__}::{name}" if name else f"{self.record.file}::{test.id()}"
+
+    def _elapsed(self) -> float:
+        return time.perf_counter() - self._started
+
+    def startTest(self, test):
+        super().startTest(test)
+        self._started = time.perf_counter()
+
+    def addSuccess(self, test):
+        self.record(self._id(test), "passed", self._elapsed())
+
+    def addFailure(self, test, err):
+        self.record(self._id(test), "failed", self._elapsed(), _message(err))
+
+    def addError(self, test, err):
+        self.record(self._id(test), "error", self._elapsed(), _message(err))
+
+    def addSkip(self, test, reason):
+        self.record(self._id(test), "skipped", self._elapsed(), reason)
+
+    def addExpectedFailure(self, test, err):
+        self.record(self._id(test), "passed", self._elapsed())
+
+    def addUnexpectedSuccess(self, test):
+        self.record(self._id(test), "failed", self._elapsed(), "unexpected success")
+
+
+def _import(test_file: str):
+    name = test_file[:-3].replace("/", ".")
+    # As when the file is run directly, its own directory is importable too
+    directory = os.path.dirname(os.path.abspath(test_file))
+    if directory not in sys.path:
+        sys.path.insert(1, directory)
+    spec = importlib.util.spec_from_file_location(name, os.path.abspath(test_file))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def _plain_tests(module) -> list[tuple[str, object, type | None]]:
+    # pytest-style tests: test_* functions and methods of Test* classes that aren't unittest cases
+    found = []
+    for name, value in vars(module).items():
+        if getattr(value, "__module__", None) != module.__name__:
+            continue
+        if name.startswith("test") and inspect.isfunction(value):
+            found.append((name, value, None))
+        elif name.startswith("Test") and inspect.isclass(value) and not issubclass(value, unittest.TestCase):
+            found += [(f"{name}::{attr}", getattr(value, attr), value)
+                      for attr in vars(value) if attr.startswith("test") and callable(getattr(value, attr))]
+    return found
+
+
+def _run_plain(tests, record: _Recorder) -> None:
+    for test_id, fn, cls in tests:
+        started = time.perf_counter()
+        try:
+            if cls is not None:
+                instance = cls()
+                if hasattr(instance, "setup_method"):
+                    instance.setup_method(fn)
+                fn = getattr(instance, fn.__name__)
+            if any(p.default is p.empty for p in inspect.signature(fn).parameters.values()):
+                record(f"{record.file}::{test_id}", "skipped", 0.0, "needs pytest fixtures, pytest is not installed")
+                continue
+            fn()
+            record(f"{record.file}::{test_id}", "passed", time.perf_counter() - started)
+        except AssertionError:
+            record(f"{record.file}::{test_id}", "failed", time.perf_counter() - started, _message(sys.exc_info()))
+        except Exception:
+            record(f"{record.file}::{test_id}", "error", time.perf_counter() - started, _message(sys.exc_info()))
+
+
+class _PytestPlugin:
+    def __init__(self, record: _Recorder):
+        self.record = record
+
+    def pytest_runtest_logreport(self, report):
+        # Failures in setup/teardown are errors, the call phase decides everything else
+        if report.when == "call" or (report.when != "call" and (report.failed or report.skipped)):
+            outcome = report.outcome if report.when == "call" or report.skipped else "error"
+            message = str(report.longrepr)[-_MESSAGE_CHARS:] if report.longrepr else ""
+            self.record(report.nodeid, outcome, report.duration, message)
+
+
+def _run_file(test_file: str, out) -> None:
+    record = _Recorder(out, test_file)
+    started = time.perf_counter()
+    try:
+        module = _import(test_file)
+    except BaseException:
+        record(test_file, "error", time.perf_counter() - started, _message(sys.exc_info()))
+        return
+
+    plain = _plain_tests(module)
+    if plain:
+        try:
+            import pytest
+        except ImportError:
+            pytest = None
+        if pytest is not None:
+            pytest.main([test_file, "-q", "-p", "no:cacheprovider"], plugins=[_PytestPlugin(record)])
+            return
+        _run_plain(plain, record)
+
+    suite = unittest.defaultTestLoader.loadTestsFromModule(module)
+    suite.run(_Result(record))
+
+
+def main() -> None:
+    results, *test_files = sys.argv[1:]
+    # Tests import from the working directory, never from wherever this script lives
+    here = os.path.dirname(os.path.abspath(__file__))
+    sys.path[:] = [os.getcwd()] + [p for p in sys.path if os.path.abspath(p or ".") != here]
+    with open(results, "a", encoding="utf-8") as out:
+        for test_file in test_files:
+            _run_file(test_file, out)
+            out.write(json.dumps({"file": test_file, "done": True}) + "\n")
+            out.flush()
+
+
+if __name__ == "__main__":
+    main()
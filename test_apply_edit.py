@@ -0,0 +1,25 @@
+from functions.apply_edit import apply_edit
+from functions.get_file_content import get_file_content
+from functions.write_file import write_file
+
+print(write_file("calculator", "edit_me.py", "def add(a, b):\n    return a + b\n\n\ndef sub(a, b):\n    return a - b\n"))
+
+print(apply_edit("calculator", "edit_me.py", [{"search": "    return a + b\n", "replace": "    # plain addition\n    return a + b\n"}]))
+print(apply_edit("calculator", "edit_me.py", [
+    {"search": "def sub(a, b):", "replace": "def subtract(a, b):"},
+    {"search": "(a, b)", "replace": "(x, y)", "replace_all": True},
+]))
+print(get_file_content("calculator", "edit_me.py"))
+
+# Anchors are validated and nothing is written when any edit fails
+print(apply_edit("calculator", "edit_me.py", [{"search": "return a", "replace": "return x"}]))
+print(apply_edit("calculator", "edit_me.py", [{"search": "def add(x, y):", "replace": "def add(x, y, z):"},
+                                                {"search": "def missing():", "replace": ""}]))
+print(apply_edit("calculator", "edit_me.py", [{"search": "return  a + b", "replace": "return x + y"}]))
+print(apply_edit("calculator", "edit_me.py", [{"search": "return a + b", "replace": "return a + b"}]))
+print(apply_edit("calculator", "does_not_exist.py", [{"search": "a", "replace": "b"}]))
+print(apply_edit("calculator", "../main.py", [{"search": "a", "replace": "b"}]))
+print(get_file_content("calculator", "edit_me.py"))
+
+import os
+os.remove("calculator/edit_me.py")
@@ -0,0 +1,36 @@
+import asyncio
+import io
+import json
+import time
+from types import SimpleNamespace
+from google.genai import types
+import batch
+
+
+def response(*parts):
+    return types.GenerateContentResponse(
+        candidates=[types.Candidate(content=types.Content(role="model", parts=list(parts)))],
+        usage_metadata=types.GenerateContentResponseUsageMetadata(prompt_token_count=100, candidates_token_count=10),
+    )
+
+
+class FakeAsyncModels:
+    async def generate_content(self, model, contents, config):
+        await asyncio.sleep(0.2)
+        prompt = contents[0].parts[0].text
+        if len(contents) == 1:
+            return response(types.Part(function_call=types.FunctionCall(
+                name="write_file", args={"file_path": "note.txt", "content": prompt})))
+        return response(types.Part(text=f"done: {prompt}"))
+
+
+client = SimpleNamespace(aio=SimpleNamespace(models=FakeAsyncModels()))
+tasks = [{"id": f"t{n}", "prompt": f"task {n}"} for n in range(10)]
+output = io.StringIO()
+
+start = time.perf_counter()
+records = asyncio.run(batch.run_batch(tasks, output, concurrency=5, client=client))
+print(f"10 tasks x 2 model calls of 0.2s with concurrency 5 took {time.perf_counter() - start:.2f}s")
+for line in output.getvalue().splitlines()[:3]:
+    print(json.loads(line))
+print(sorted(r["result"] for r in records))
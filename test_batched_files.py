@@ -0,0 +1,34 @@
+import os
+from types import SimpleNamespace
+import config
+import tool_executor
+from functions.read_files import budgets, read_files
+from functions.write_files import write_files
+
+# Small files are returned whole, what they leave over goes to the large one
+print(budgets([100, 200, 50000], total=30000, per_file=10000))
+print(budgets([40000, 50000, 60000], total=30000, per_file=10000))
+
+print(read_files("calculator", ["main.py", "pkg/render.py", "pkg/does_not_exist.py", "../main.py"]))
+print(read_files("calculator", ["main.py", "tests.py"], max_chars_per_file=80))
+
+config.READ_FILES_TOTAL_CHARS = 1500
+print(read_files("calculator", ["lorem.txt", "pkg/calculator.py"]))
+config.READ_FILES_TOTAL_CHARS = 3 * config.MAX_CHARS
+
+print(write_files("calculator", [
+    {"file_path": "batch/one.txt", "content": "first"},
+    {"file_path": "batch/two.txt", "content": "second"},
+    {"file_path": "batch/one.txt", "content": "first, rewritten"},
+    {"file_path": "../escape.txt", "content": "nope"},
+]))
+print(read_files("calculator", ["batch/one.txt", "batch/two.txt"]))
+for name in ("one.txt", "two.txt"):
+    os.remove(f"calculator/batch/{name}")
+os.rmdir("calculator/batch")
+
+# The scheduler sees every path a batched call touches
+call = SimpleNamespace(name="write_files", args={"files": [{"file_path": "a.py", "content": ""}, {"file_path": "pkg/b.py", "content": ""}]})
+print(tool_executor.call_access(call))
+read = SimpleNamespace(name="read_files", args={"file_paths": ["pkg/b.py", "main.py"]})
+print(tool_executor.conflicts(tool_executor.call_access(call), tool_executor.call_access(read)))
@@ -4,4 +4,8 @@ from functions.get_files_info import get_files_info
 print (get_files_info("calculator","."))
 print (get_files_info("calculator","pkg"))
 print (get_files_info("calculator","/bin"))
-print (get_files_info("calculator","../"))
\ No newline at end of file
+print (get_files_info("calculator","../"))
+print (get_files_info("calculator", ".", recursive=True, extensions=[".py"]))
+print (get_files_info("calculator", ".", recursive=True, pattern="pkg/*.py"))
+print (get_files_info("calculator", ".", recursive=True, max_depth=1, limit=3))
+print (get_files_info("calculator", ".", recursive=True, max_depth=1, limit=3, offset=3))
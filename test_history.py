@@ -0,0 +1,61 @@
+from google.genai import types
+from history import ConversationHistory
+
+
+def call(name, **args):
+    return types.Content(role="model", parts=[types.Part(function_call=types.FunctionCall(name=name, args=args))])
+
+def result(name, text):
+    return types.Content(role="user", parts=[types.Part.from_function_response(name=name, response={"result": text})])
+
+
+history = ConversationHistory(token_budget=100000, keep_recent=2)
+history.append(types.Content(role="user", parts=[types.Part(text="fix the bug in main.py")]))
+history.append(call("get_file_content", file_path="main.py"))
+history.append(result("get_file_content", "x" * 8000))
+history.append(call("write_file", file_path="main.py", content="fixed"))
+history.append(result("write_file", 'Successfully wrote to "main.py" (5 characters written)'))
+history.append(call("get_file_content", file_path="pkg/render.py"))
+history.append(result("get_file_content", "y" * 8000))
+
+print(f"Before: ~{history.token_count()} tokens")
+print(f"Saved: ~{history.compact()} tokens, now ~{history.token_count()}")
+print(history.messages[2].parts[0].function_response.response)
+print(f"Unseen read kept intact: {len(history.messages[6].parts[0].function_response.response['result'])} chars")
+
+history = ConversationHistory(token_budget=500, keep_recent=2)
+history.append(types.Content(role="user", parts=[types.Part(text="read everything")]))
+for n in range(5):
+    history.append(call("get_file_content", file_path=f"file{n}.txt"))
+    history.append(result("get_file_content", "z" * 4000))
+print(f"Over budget: ~{history.token_count()} tokens, {len(history.messages)} messages")
+history.compact()
+print(f"After compaction: ~{history.token_count()} tokens, {len(history.messages)} messages")
+print(history.messages[-1].parts[0].function_response.response["result"][:20])
+
+# With the read cache's unchanged notice on, a repeat read carries no content, so the first read must stay
+import shutil
+import tempfile
+
+import config
+import read_cache
+from functions.get_file_content import get_file_content
+
+root = tempfile.mkdtemp(prefix="history-notice-")
+with open(f"{root}/main.py", "w") as f:
+    f.write("print('hello')\n")
+config.READ_CACHE_UNCHANGED_NOTICE = True
+read_cache.CACHE.clear()
+history = ConversationHistory(token_budget=100000, keep_recent=2)
+history.append(types.Content(role="user", parts=[types.Part(text="look at main.py twice")]))
+for _ in range(2):
+    history.append(call("get_file_content", file_path="main.py"))
+    history.append(result("get_file_content", get_file_content(root, "main.py")))
+history.append(call("get_files_info", directory="."))
+history.append(result("get_files_info", "- main.py: file_size=15, is_dir=False"))
+history.compact()
+print(history.messages[2].parts[0].function_response.response["result"])
+print(history.messages[4].parts[0].function_response.response["result"])
+config.READ_CACHE_UNCHANGED_NOTICE = False
+read_cache.CACHE.clear()
+shutil.rmtree(root)
@@ -0,0 +1,33 @@
+import os
+import tempfile
+import tracemalloc
+import config
+from functions.run_python_file import run_python_file
+from worker_pool import POOL
+
+chatty = "import sys\nprint('first line')\nfor i in range(200):\n    sys.stdout.write(str(i % 10) * 1_000_000)\nprint()\nprint('last line')\nprint('oops', file=sys.stderr)\n"
+endless = "import sys, time\nprint('started', flush=True)\nwhile True:\n    sys.stdout.write('spam\\n' * 10000)\n"
+
+with tempfile.TemporaryDirectory() as tmp:
+    with open(os.path.join(tmp, "chatty.py"), "w") as f:
+        f.write(chatty)
+    with open(os.path.join(tmp, "endless.py"), "w") as f:
+        f.write(endless)
+
+    timeout = config.TIMEOUT
+    config.TIMEOUT = 2
+    for workers in (0, 1):
+        config.PYTHON_WORKERS = workers
+        tracemalloc.start()
+        result = run_python_file(tmp, "chatty.py")
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"workers={workers}: {len(result)} chars returned for ~200MB of output, peak memory {peak / 1024:.0f} KiB")
+        print(result[:60].replace("\n", " | "), "...", result[-120:].replace("\n", " | "))
+
+        result = run_python_file(tmp, "endless.py")
+        print(result.splitlines()[0], "|", result.splitlines()[2][:40], "|", [l for l in result.splitlines() if "elided" in l])
+
+    POOL.close()
+    config.PYTHON_WORKERS = 0
+    config.TIMEOUT = timeout
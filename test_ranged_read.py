@@ -0,0 +1,42 @@
+import os
+import tempfile
+import time
+import tracemalloc
+from functions.get_file_content import get_file_content
+
+print(get_file_content("calculator", "main.py", start_line=5, end_line=7))
+print(get_file_content("calculator", "main.py", offset=0, length=40))
+print(get_file_content("calculator", "main.py", start_line=500))
+
+# A length shorter than one character still returns that character, so paging always moves forward
+with tempfile.TemporaryDirectory() as tmp:
+    with open(os.path.join(tmp, "emoji.txt"), "w", encoding="utf-8") as f:
+        f.write("a\U0001F600b")
+    print(get_file_content(tmp, "emoji.txt", offset=1, length=2))
+    print(get_file_content(tmp, "emoji.txt", offset=5, length=1))
+
+# ~300MB log with 5M numbered lines, read from the middle and the end
+with tempfile.TemporaryDirectory() as tmp:
+    lines_total = 5_000_000
+    with open(os.path.join(tmp, "big.log"), "w") as f:
+        for chunk_start in range(0, lines_total, 100_000):
+            f.write("".join(f"line {n:08d} " + "x" * 45 + "\n" for n in range(chunk_start, chunk_start + 100_000)))
+    print(f"big.log is {os.path.getsize(os.path.join(tmp, 'big.log')) // 2**20} MiB")
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    middle = get_file_content(tmp, "big.log", start_line=40_000, end_line=40_200)
+    cold = time.perf_counter() - start
+    start = time.perf_counter()
+    tail = get_file_content(tmp, "big.log", start_line=4_999_990, end_line=4_999_995)
+    warm = time.perf_counter() - start
+    by_offset = get_file_content(tmp, "big.log", offset=250_000_000, length=120)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(middle.splitlines()[0], "...", middle.splitlines()[-1])
+    print(f"{len(middle.splitlines())} lines, first range read in {cold * 1000:.1f}ms")
+    print(tail.splitlines()[0], "...", tail.splitlines()[-1])
+    print(f"Range near the end read in {warm * 1000:.1f}ms")
+    print(by_offset)
+    print(f"Peak Python memory across all reads: {peak / 1024:.0f} KiB (file is ~300 MiB)")
@@ -0,0 +1,56 @@
+import asyncio
+import time
+import httpx
+import config
+from fake_client import FakeClient, text_response
+from rate_limit import RateLimitedClient, RequestScheduler
+
+config.BACKOFF_BASE = 0.01
+
+# Two injected 429s then a 503, the wrapper retries through all of them
+fake = FakeClient(lambda contents: text_response("ok"), latency=0.01, failures=[429, 429, 503])
+client = RateLimitedClient(fake, RequestScheduler())
+print(client.models.generate_content(model="m", contents=[], config=None).text)
+print(client.scheduler.stats())
+
+# A dropped connection raised by the HTTP client is retried too
+attempts = []
+def flaky(contents):
+    attempts.append(1)
+    if len(attempts) == 1:
+        raise httpx.ConnectError("connection refused")
+    return text_response("ok after reconnect")
+client = RateLimitedClient(FakeClient(flaky), RequestScheduler())
+print(client.models.generate_content(model="m", contents=[], config=None).text)
+print(client.scheduler.stats())
+
+# Non-retryable errors surface immediately
+fake = FakeClient(lambda contents: text_response("ok"), failures=[400])
+client = RateLimitedClient(fake, RequestScheduler())
+try:
+    client.models.generate_content(model="m", contents=[], config=None)
+except Exception as e:
+    print(f"Raised: {type(e).__name__} {e.code}")
+print(client.scheduler.stats())
+
+# 30 requests/min: the first 30 go out at once, the next 10 are paced 2s apart on a simulated clock
+now = [0.0]
+def fake_sleep(seconds):
+    now[0] += seconds
+scheduler = RequestScheduler(requests_per_minute=30, clock=lambda: now[0])
+client = RateLimitedClient(FakeClient(lambda contents: text_response("ok")), scheduler, sleep=fake_sleep)
+for _ in range(40):
+    client.models.generate_content(model="m", contents=[], config=None)
+print(f"40 requests at 30/min finished at t={now[0]:.0f}s")
+print(scheduler.stats())
+
+# Async side, many concurrent agents sharing one scheduler with injected latency and a 429
+async def many():
+    fake = FakeClient(lambda contents: text_response("ok"), latency=0.05, failures=[None, 429, None, 429])
+    client = RateLimitedClient(fake, RequestScheduler())
+    start = time.perf_counter()
+    results = await asyncio.gather(*[client.aio.models.generate_content(model="m", contents=[], config=None) for _ in range(20)])
+    print(f"20 concurrent async calls: {len(results)} ok in {time.perf_counter() - start:.2f}s, {client.scheduler.stats()}")
+
+asyncio.run(many())
+config.BACKOFF_BASE = 1.0
@@ -0,0 +1,22 @@
+import config
+import read_cache
+from functions.get_file_content import get_file_content
+from functions.get_files_info import get_files_info
+from functions.write_file import write_file
+
+print(get_file_content("calculator", "main.py")[:40])
+print(get_file_content("calculator", "main.py")[:40])
+print(get_files_info("calculator", "pkg"))
+print(get_files_info("calculator", "pkg"))
+print(read_cache.CACHE.stats())
+
+config.READ_CACHE_UNCHANGED_NOTICE = True
+print(get_file_content("calculator", "main.py"))
+print(get_files_info("calculator", "pkg"))
+
+# Writing invalidates the file and the listings above it
+print(write_file("calculator", "pkg/morelorem.txt", "lorem ipsum dolor sit amet"))
+print(get_file_content("calculator", "pkg/morelorem.txt"))
+print(get_files_info("calculator", "pkg"))
+print(read_cache.CACHE.stats())
+config.READ_CACHE_UNCHANGED_NOTICE = False
@@ -0,0 +1,45 @@
+import tempfile
+import time
+from google.genai import types
+import agent
+from history import ConversationHistory
+from fake_client import FakeClient, call_response, text_response
+from response_cache import CachingClient, ReplayMiss, ResponseStore
+
+
+def responder(contents):
+    if len(contents) == 1:
+        return call_response([("get_file_content", {"file_path": "main.py", "length": 20})])
+    return text_response("main.py imports the calculator")
+
+
+llm_config = agent.build_llm_config()
+prompt = [types.Content(role="user", parts=[types.Part(text="what does main.py do?")])]
+
+
+def session(client):
+    history = ConversationHistory()
+    for content in prompt:
+        history.append(content)
+    for _ in range(5):
+        turn = agent.blocking_turn(client, history.messages, llm_config)
+        if not agent.record_turn(history, turn):
+            return turn.text
+
+
+with tempfile.TemporaryDirectory() as tmp:
+    live = FakeClient(responder, latency=0.2)
+    recorder = CachingClient(live, mode="record", store=ResponseStore(tmp))
+    start = time.perf_counter()
+    print(session(recorder), f"(record: {time.perf_counter() - start:.2f}s, {live.calls} live calls)")
+
+    replayer = CachingClient(None, mode="replay", store=ResponseStore(tmp))
+    start = time.perf_counter()
+    print(session(replayer), f"(replay: {(time.perf_counter() - start) * 1000:.1f}ms)")
+    print(replayer.store.stats())
+
+    prompt = [types.Content(role="user", parts=[types.Part(text="something never recorded")])]
+    try:
+        session(replayer)
+    except ReplayMiss as e:
+        print(f"ReplayMiss: {str(e)[:60]}...")
@@ -0,0 +1,56 @@
+import shutil
+import tempfile
+from pathlib import Path
+from types import SimpleNamespace
+
+import code_index
+import config
+import result_budget
+from agent import call_function, fit_turn_results
+
+root = Path(tempfile.mkdtemp(prefix="result-budget-"))
+(root / "pkg").mkdir()
+(root / "pkg" / "calc.py").write_text("def add(a, b):\n    return a + b\n\ndef sub(a, b):\n    return a - b\n")
+(root / "noisy.py").write_text(
+    "import traceback\n"
+    "def fail(n):\n    raise ValueError(n)\n"
+    "for i in range(5):\n    print('retrying...')\n"
+    "    try:\n        fail(i)\n    except ValueError:\n        traceback.print_exc()\n"
+)
+(root / "test_calc.py").write_text(
+    "import unittest\nfrom pkg.calc import add\n"
+    "def check(x):\n    assert add(x, 0) == 0, x\n"
+    "class T(unittest.TestCase):\n"
+    "    def test_one(self): check(1)\n    def test_two(self): check(2)\n"
+)
+
+
+def call(name, **args):
+    part = SimpleNamespace(name=name, args=args)
+    return call_function(part, working_directory=str(root), quiet=True).parts[0]
+
+
+print(call("get_files_info", directory=".").function_response.response["result"])
+print(call("search_code", query="return").function_response.response["result"])
+print(call("run_python_file", file_path="noisy.py").function_response.response["result"])
+print(call("run_tests").function_response.response["result"])
+print("File contents unchanged:", call("get_file_content", file_path="pkg/calc.py").function_response.response["result"]
+      == (root / "pkg" / "calc.py").read_text())
+
+print(result_budget.folded_repeats("a\nb\nb\nc\nc\nc\nc"))
+print(result_budget.truncated("\n".join(f"line {n}" for n in range(1000)), 60))
+
+# Two large results in one turn share what the turn budget allows
+(root / "big.py").write_text("for n in range(3000):\n    print('row', n)\n")
+parts = [call("run_python_file", file_path="big.py"), call("get_files_info", directory="pkg")]
+print([result_budget.estimate_tokens(p.function_response.response["result"]) for p in parts])
+old = config.TURN_RESULT_TOKENS
+config.TURN_RESULT_TOKENS = 500
+fitted = fit_turn_results(parts)
+config.TURN_RESULT_TOKENS = old
+print([result_budget.estimate_tokens(p.function_response.response["result"]) for p in fitted])
+print(fitted[1] is parts[1])
+
+print(result_budget.BUDGET.stats())
+code_index.forget(root.resolve())
+shutil.rmtree(root)
@@ -0,0 +1,50 @@
+import os
+import tempfile
+import time
+from pathlib import Path
+import config
+import suite
+from functions.run_tests import run_tests
+
+print(run_tests("calculator"))
+print(run_tests("calculator", ["../main.py"]))
+
+with tempfile.TemporaryDirectory() as root:
+    files = {
+        "pkg/__init__.py": "",
+        "pkg/mathy.py": "def double(x):\n    return 2 * x\n",
+        "pkg/words.py": "from . import mathy\n\ndef shout(s):\n    return s.upper() + '!' * mathy.double(1)\n",
+        "tests/test_mathy.py": "import unittest\nfrom pkg.mathy import double\n\nclass TestDouble(unittest.TestCase):\n"
+                               "    def test_double(self):\n        self.assertEqual(double(2), 4)\n",
+        "tests/test_words.py": "import time\nfrom pkg import words\n\ndef test_shout():\n    assert words.shout('hi') == 'HI!!'\n\n"
+                               "def test_slow():\n    time.sleep(0.15)\n",
+        "tests/test_script.py": "print('not a test file, only a script')\n",
+    }
+    for path, content in files.items():
+        os.makedirs(os.path.join(root, os.path.dirname(path)), exist_ok=True)
+        with open(os.path.join(root, path), "w") as f:
+            f.write(content)
+
+    # Imports are followed through packages and relative imports
+    tests = suite.suite_for(Path(root).resolve())
+    print(sorted(tests.dependencies("tests/test_words.py")))
+
+    print(run_tests(root))
+    print(run_tests(root))
+
+    # Only the test file that can reach the changed module runs again, and a failure shows its assertion
+    time.sleep(0.01)
+    with open(os.path.join(root, "pkg/words.py"), "a") as f:
+        f.write("\ndef shout(s):\n    return s.upper()\n")
+    print(run_tests(root))
+
+    # A change to a module both import reruns both
+    with open(os.path.join(root, "pkg/mathy.py"), "a") as f:
+        f.write("\n")
+    print(run_tests(root, ["tests"]))
+
+    config.RUN_TESTS_TIMEOUT = 1
+    with open(os.path.join(root, "tests/test_hang.py"), "w") as f:
+        f.write("import time\n\ndef test_hang():\n    time.sleep(5)\n")
+    print(run_tests(root, ["tests/test_hang.py"]))
+    config.RUN_TESTS_TIMEOUT = 120
@@ -0,0 +1,49 @@
+import shutil
+import tempfile
+from pathlib import Path
+
+import code_index
+from code_index import required_literals
+from functions.search_code import search_code
+from functions.write_file import write_file
+
+print(search_code("calculator", "def "))
+print(search_code("calculator", "CALCULATOR", ignore_case=True, directory="pkg"))
+print(search_code("calculator", r"self\.\w+\s*=", regex=True, max_results=3))
+print(search_code("calculator", "does not appear anywhere"))
+print(search_code("calculator", "(", regex=True))
+print(search_code("calculator", "x", directory="../"))
+
+# A written file is searchable right away
+print(write_file("calculator", "pkg/morelorem.txt", "lorem ipsum dolor sit amet, needle_in_haystack"))
+print(search_code("calculator", "needle_in_haystack"))
+print(write_file("calculator", "pkg/morelorem.txt", "lorem ipsum dolor sit amet"))
+print(search_code("calculator", "needle_in_haystack"))
+
+print(required_literals(r"def\s+evaluate\(self", True))
+print(required_literals(r"colou?r_map", True))
+print(required_literals(r"foo|bar", True))
+
+# Group extensions are syntax, not text; nothing inside a negative lookaround or an optional group is required
+for pattern in (r"(?:def) evaluate", r"(?P<name>def) evaluate", r"(?P<name>def)\s+(?P=name)", r"(?=def )def evaluate",
+                r"(?<=def )evaluate", r"(?!class)def evaluate", r"(?<!_)evaluate", r"(?i)DEF evaluate",
+                r"(?i:DEF) evaluate", r"(?#comment)def evaluate", r"(async )?def evaluate"):
+    print(pattern, required_literals(pattern, True))
+print(search_code("calculator", r"(?:def) evaluate", regex=True) == search_code("calculator", r"def evaluate", regex=True))
+print(search_code("calculator", r"(?<!_)def (?P<name>evaluate)\(", regex=True))
+
+# Escapes and classes are read the way re reads them, so no match is filtered out by a literal it doesn't contain
+for pattern in (r"\x41bcd", r"\u0041bcd", r"\101bcd", r"[^]]xyz", r"[\]a]bcd", r"(?x) A b c d", r"x(a|b)yz"):
+    print(pattern, required_literals(pattern, True))
+print(write_file("calculator", "pkg/morelorem.txt", "lorem ipsum Abcd wxyz ]bcd"))
+for pattern in (r"\x41bcd", r"[^]]xyz", r"[\]a]bcd"):
+    print(search_code("calculator", pattern, regex=True))
+print(write_file("calculator", "pkg/morelorem.txt", "lorem ipsum dolor sit amet"))
+
+# An index left behind by a root that was deleted without forget() (a crashed run) is pruned, live ones stay
+gone = Path(tempfile.mkdtemp(prefix="search-prune-")).resolve()
+(gone / "a.py").write_text("orphan = 1\n")
+print(search_code(str(gone), "orphan"))
+orphan = code_index._INDEXES.pop(str(gone)).directory
+shutil.rmtree(gone)
+print("Pruned:", code_index.prune(), orphan.exists(), code_index.index_for(Path("calculator").resolve()).directory.exists())
@@ -0,0 +1,52 @@
+import io
+import os
+import tempfile
+import threading
+
+import config
+import server
+import sessions
+from fake_client import FakeClient, call_response, text_response
+from rate_limit import RateLimitedClient
+
+scratch = tempfile.mkdtemp(prefix="agent-server-")
+config.SESSION_DIR = os.path.join(scratch, "sessions")
+path = os.path.join(scratch, "agent.sock")
+
+
+def responder(contents):
+    last = contents[-1].parts[0]
+    if last.function_response:
+        return text_response(f"main.py runs the calculator ({len(contents)} messages)")
+    if last.text == "what does main.py do?":
+        return call_response([("get_file_content", {"file_path": "main.py", "length": 40})])
+    return text_response(f"You first asked: {contents[0].parts[0].text!r} ({len(contents)} messages)")
+
+
+agent_server = server.AgentServer(path, client=RateLimitedClient(FakeClient(responder)))
+threading.Thread(target=agent_server.serve_forever, daemon=True).start()
+print(f"Warm in under a second: {agent_server.warm_ms < 1000}")
+
+out = io.StringIO()
+reply = server.submit({"op": "run", "prompt": "what does main.py do?", "session": ""}, path, out)
+print(out.getvalue().strip())
+print(reply["done"], reply["text"])
+session_id = out.getvalue().split("Session: ")[1].split()[0]
+print("Saved messages:", len(sessions.load(session_id).messages))
+
+reply = server.submit({"op": "run", "prompt": "and what did I ask before?", "session": session_id}, path, out=io.StringIO())
+print(reply["text"])
+print("Saved messages:", len(sessions.load(session_id).messages))
+
+# Per-request figures cover the last request only (one model call), not the three made so far
+stats = server.submit({"op": "stats"}, path)["stats"].splitlines()
+print(stats[0])
+print(next(line for line in stats if line.startswith("Scheduler:")))
+print(server.submit({"op": "run", "prompt": "hi", "session": "../escape"}, path, out=io.StringIO()))
+print(server.submit({"op": "shutdown"}, path))
+agent_server.server_close()
+
+try:
+    server.submit({"op": "stats"}, os.path.join(scratch, "missing.sock"))
+except ConnectionError as e:
+    print("ConnectionError:", e)
@@ -0,0 +1,32 @@
+import time
+from types import SimpleNamespace
+from google.genai import types
+import agent
+
+
+def chunk(*parts, usage=None):
+    return types.GenerateContentResponse(
+        candidates=[types.Candidate(content=types.Content(role="model", parts=list(parts)))],
+        usage_metadata=usage,
+    )
+
+
+class FakeModels:
+    def generate_content_stream(self, model, contents, config):
+        yield chunk(types.Part(text="Let me look "))
+        yield chunk(types.Part(text="at the files."))
+        yield chunk(types.Part(function_call=types.FunctionCall(name="get_files_info", args={"directory": "pkg"})))
+        # The model is still generating while the first tool runs
+        time.sleep(0.3)
+        yield chunk(
+            types.Part(function_call=types.FunctionCall(name="get_file_content", args={"file_path": "main.py", "length": 30})),
+            usage=types.GenerateContentResponseUsageMetadata(prompt_token_count=120, candidates_token_count=40),
+        )
+
+
+turn = agent.stream_turn(SimpleNamespace(models=FakeModels()), [], None, verbose=True)
+print(turn.contents[0].parts[0].text)
+print([p.function_call.name for p in turn.contents[0].parts if p.function_call])
+for result in turn.function_results:
+    print(result.parts[0].function_response.response)
+print(turn.usage_metadata.prompt_token_count, turn.usage_metadata.candidates_token_count)
@@ -0,0 +1,45 @@
+import time
+from types import SimpleNamespace
+from tool_executor import run_calls
+
+log = []
+
+def fake_run(call):
+    log.append(("start", call.name, call.args.get("file_path")))
+    time.sleep(0.2)
+    log.append(("end", call.name, call.args.get("file_path")))
+    return f"{call.name}({call.args})"
+
+calls = [
+    SimpleNamespace(name="get_file_content", args={"file_path": "main.py"}),
+    SimpleNamespace(name="get_file_content", args={"file_path": "pkg/calculator.py"}),
+    SimpleNamespace(name="get_files_info", args={"directory": "pkg"}),
+]
+
+start = time.perf_counter()
+print(run_calls(calls, fake_run))
+print(f"3 read-only calls took {time.perf_counter() - start:.2f}s (serial would be 0.60s)")
+
+# A script may rewrite any file, so reads around it keep their order
+log.clear()
+calls = [
+    SimpleNamespace(name="get_file_content", args={"file_path": "main.py"}),
+    SimpleNamespace(name="run_python_file", args={"file_path": "tests.py"}),
+    SimpleNamespace(name="get_file_content", args={"file_path": "main.py"}),
+]
+start = time.perf_counter()
+run_calls(calls, fake_run)
+print(f"Read, run, read took {time.perf_counter() - start:.2f}s (expected ~0.60s)")
+print(log)
+
+log.clear()
+calls = [
+    SimpleNamespace(name="write_file", args={"file_path": "lorem.txt", "content": "a"}),
+    SimpleNamespace(name="write_file", args={"file_path": "lorem.txt", "content": "b"}),
+    SimpleNamespace(name="get_file_content", args={"file_path": "lorem.txt"}),
+    SimpleNamespace(name="get_file_content", args={"file_path": "main.py"}),
+]
+start = time.perf_counter()
+print(run_calls(calls, fake_run))
+print(f"Writes to one path plus a read of it took {time.perf_counter() - start:.2f}s (expected ~0.60s)")
+print(log)
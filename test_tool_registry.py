@@ -0,0 +1,21 @@
+import sys
+
+import tool_registry
+import tool_executor
+
+print("google.genai imported by the registry:", "google.genai" in sys.modules)
+tools = tool_registry.dispatch()
+print("write_file" in tools, "rm_rf" in tools, len(tools))
+print("Tools imported after membership checks:", tool_registry.TOOLS.loaded())
+
+print(tools["get_files_info"]("calculator", "pkg")[:60])
+print("Tools imported after one dispatch:", tool_registry.TOOLS.loaded())
+
+names = [schema.name for schema in tool_registry.declarations()]
+print(names == list(tool_registry.TOOL_NAMES), names)
+print(len(tool_registry.TOOL_REGISTRY), tool_registry.TOOL_REGISTRY[0][1] is tools["get_files_info"])
+
+import main  # noqa: E402
+
+print("main.py imports the agent before parsing:", "agent" in sys.modules)
+print(main.build_parser().parse_args(["list files", "--cache", "replay"]))
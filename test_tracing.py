@@ -0,0 +1,44 @@
+import json
+import os
+import tempfile
+import config
+import tracing
+from fake_client import FakeClient, call_response, text_response
+from agent import blocking_turn, build_llm_config, record_turn
+from history import ConversationHistory
+from rate_limit import RateLimitedClient, RequestScheduler
+from google.genai import types
+
+config.BACKOFF_BASE = 0.01
+
+
+def responder(contents):
+    # Read a file twice (second read is a cache hit), run a script, then answer
+    if len(contents) == 1:
+        return call_response([("get_file_content", {"file_path": "main.py"}), ("get_file_content", {"file_path": "main.py"})])
+    if len(contents) == 3:
+        return call_response([("run_python_file", {"file_path": "tests.py"})])
+    return text_response("done")
+
+
+trace_path = os.path.join(tempfile.mkdtemp(), "trace.jsonl")
+tracing.TRACER.start(trace_path)
+
+client = RateLimitedClient(FakeClient(responder, latency=0.01, failures=[429]), RequestScheduler())
+history = ConversationHistory()
+history.append(types.Content(role="user", parts=[types.Part(text="check the calculator")]))
+llm_config = build_llm_config()
+with tracing.session("demo"):
+    for _ in range(5):
+        turn = blocking_turn(client, history.messages, llm_config)
+        if not record_turn(history, turn):
+            print(turn.text)
+            break
+
+tracing.TRACER.close()
+with open(trace_path) as f:
+    spans = [json.loads(line) for line in f]
+for span in spans:
+    fields = {k: v for k, v in span.items() if k not in ("run", "start")}
+    print(fields)
+print(tracing.TRACER.summary())
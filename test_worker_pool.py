@@ -0,0 +1,27 @@
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+import config
+from functions.run_python_file import run_python_file
+from worker_pool import POOL
+
+# Neither a warm worker nor the cold spawn hands the API key to the script
+os.environ[config.API_KEY_LOCATION] = "not-for-scripts"
+scratch = tempfile.mkdtemp(prefix="worker-env-")
+Path(scratch, "env.py").write_text(f"import os\nprint('key visible:', {config.API_KEY_LOCATION!r} in os.environ)\n")
+
+config.PYTHON_WORKERS = 0
+print("cold:", run_python_file(scratch, "env.py"))
+config.PYTHON_WORKERS = 2
+print("warm:", run_python_file(scratch, "env.py"))
+
+print(run_python_file("calculator", "main.py"))
+print(run_python_file("calculator", "main.py", ["3 + 5"]))
+print(run_python_file("calculator", "tests.py"))
+print(run_python_file("calculator", "../main.py"))
+
+POOL.close()
+config.PYTHON_WORKERS = 0
+shutil.rmtree(scratch)
@@ -0,0 +1,65 @@
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from types import SimpleNamespace
+
+import code_index
+import workspace
+from agent import call_function
+
+base = Path(tempfile.mkdtemp(prefix="workspace-base-"))
+(base / "pkg").mkdir()
+(base / "main.py").write_text("print('hello')\n")
+(base / "pkg" / "calc.py").write_text("VALUE = 1\n")
+(base / "pkg" / "other.py").write_text("OTHER = 2\n")
+
+
+def call(session, name, **args):
+    part = SimpleNamespace(name=name, args=args)
+    return call_function(part, working_directory=str(session.root), quiet=True).parts[0].function_response.response
+
+
+session = workspace.open_workspace(str(base), "t1")
+print("Files right after setup:", os.listdir(session.root))
+
+print(call(session, "get_file_content", file_path="pkg/calc.py"))
+print("Linked, not copied:", os.stat(session.root / "pkg/calc.py").st_ino == os.stat(base / "pkg/calc.py").st_ino)
+print("Files after one read:", sorted(p.relative_to(session.root).as_posix() for p in session.root.rglob("*")))
+
+listing = workspace.open_workspace(str(base), "t0")
+print(call(listing, "get_files_info"))
+print("Files after listing '.':", sorted(p.relative_to(listing.root).as_posix() for p in listing.root.rglob("*")))
+print(call(listing, "get_files_info", directory=".", recursive=True))
+print("Files after a recursive listing:", sorted(p.relative_to(listing.root).as_posix() for p in listing.root.rglob("*")))
+listing.close()
+
+print(call(session, "write_file", file_path="pkg/calc.py", content="VALUE = 2\n"))
+print(call(session, "write_file", file_path="pkg/new.py", content="NEW = 3\n"))
+print("Base untouched:", (base / "pkg/calc.py").read_text() == "VALUE = 1\n")
+print(session.diff())
+
+# A script that writes in place would write through a hardlink, so exec calls get private copies first
+(base / "edit.py").write_text("open('main.py', 'w').write('changed in place')\n")
+print(call(session, "run_python_file", file_path="edit.py"))
+print("Base main.py untouched by the script:", (base / "main.py").read_text() == "print('hello')\n")
+print(session.diff())
+print(session.stats())
+
+other = workspace.open_workspace(str(base), "t2")
+print(call(other, "write_file", file_path="pkg/calc.py", content="VALUE = 99\n"))
+print("Applied:", session.commit())
+print("Base after commit:", (base / "pkg/calc.py").read_text().strip(), (base / "main.py").read_text())
+try:
+    other.commit()
+except workspace.WorkspaceConflict as e:
+    print("Conflict:", e)
+print("Nothing left to commit:", session.diff())
+
+print(call(other, "search_code", query="VALUE"))
+index_dir = code_index.index_for(other.root).directory
+session.close()
+other.close()
+print("Closed:", session.root.exists(), other.root.exists())
+print("Search index dropped:", str(other.root) in code_index._INDEXES, index_dir.exists())
+shutil.rmtree(base)
@@ -0,0 +1,116 @@
+"""
+Concurrent dispatch for the tool calls returned in a single model turn.
+Read-only tools run side by side; a call that writes or runs code waits for every earlier call it could conflict with.
+"""
+
+import contextvars
+import os
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from collections.abc import Callable
+from typing import Any, NamedTuple
+
+import config
+import tool_registry
+
+
+class CallAccess(NamedTuple):
+    kind: str
+    paths: tuple[str, ...]
+
+
+def call_access(function_call_part: Any) -> CallAccess:
+    '''
+    Works out which paths a function call touches and how
+    Returns: CallAccess(kind, normalized relative paths)
+
+    :param function_call_part: A function call returned from Gemini (needs .name and .args)
+    '''
+    kind, path_args = tool_registry.access(function_call_part.name)
+    args = function_call_part.args or {}
+    paths = []
+    for arg in path_args:
+        # "files.file_path" names the file_path key of every object in the files list
+        arg, _, key = arg.partition(".")
+        value = args.get(arg, ".")
+        values = value if isinstance(value, (list, tuple)) else [value]
+        if key:
+            values = [v.get(key, ".") if isinstance(v, dict) else "." for v in values]
+        paths.extend(os.path.normpath(str(v)) for v in values)
+    return CallAccess(kind, tuple(paths))
+
+
+def _overlaps(a: str, b: str) -> bool:
+    if a == b or a == "." or b == ".":
+        return True
+    return a.startswith(b + os.sep) or b.startswith(a + os.sep)
+
+
+def conflicts(a: CallAccess, b: CallAccess) -> bool:
+    '''
+    Two calls conflict when at least one writes and they can see the same path.
+    Exec tools can read and write anything in the working directory, so they conflict with every call.
+    '''
+    if a.kind == "exec" or b.kind == "exec":
+        return True
+    if a.kind != "write" and b.kind != "write":
+        return False
+    return any(_overlaps(p, q) for p in a.paths for q in b.paths)
+
+
+class ToolCallScheduler:
+    '''
+    Runs function calls on a thread pool while keeping the results of a serial run.
+    Each call waits for the earlier calls it conflicts with, so writes to the same path keep their order
+    and a read issued after a write still sees the written content.
+    Futures are handed back in submission order, callers collect them in that order.
+    '''
+
+    def __init__(self, run: Callable[[Any], Any], max_workers: int = config.MAX_TOOL_WORKERS):
+        self._run = run
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tool")
+        self._submitted: list[tuple[CallAccess, Future]] = []
+
+    def submit(self, function_call_part: Any) -> Future:
+        '''
+        Schedules a call behind anything it conflicts with
+        Returns: Future resolving to run(function_call_part)
+
+        :param function_call_part: A function call returned from Gemini
+        '''
+        access = call_access(function_call_part)
+        depends_on = [f for prior, f in self._submitted if conflicts(prior, access)]
+        # Carry the caller's context (trace session, current span) onto the pool thread
+        context = contextvars.copy_context()
+        future = self._pool.submit(context.run, self._run_after, depends_on, function_call_part)
+        self._submitted.append((access, future))
+        return future
+
+    def _run_after(self, depends_on: list[Future], function_call_part: Any) -> Any:
+        # The pool hands out work in FIFO order, so anything we wait on has already started
+        wait(depends_on)
+        return self._run(function_call_part)
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=True)
+
+    def __enter__(self) -> "ToolCallScheduler":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.shutdown()
+
+
+def run_calls(function_call_parts: list[Any], run: Callable[[Any], Any]) -> list[Any]:
+    '''
+    Runs every call from one model turn
+    Returns: The results of run() in the original call order
+
+    :param function_call_parts: Function calls from a single Gemini response
+    :param run: Executes one call, e.g. main.call_function
+    '''
+    if not config.PARALLEL_TOOL_CALLS or len(function_call_parts) < 2:
+        return [run(part) for part in function_call_parts]
+
+    with ToolCallScheduler(run) as scheduler:
+        futures = [scheduler.submit(part) for part in function_call_parts]
+    return [f.result() for f in futures]
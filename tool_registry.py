@@ -1,32 +1,116 @@
 """
-Registry for all functions used as tools by the LLM 
+Registry for all functions used as tools by the LLM
+Nothing is imported up front: a tool's module (and google.genai, which every schema needs) is imported the
+first time the tool is dispatched, and the declarations are built the first time they are asked for.
 """
 
-from functions.get_files_info import schema_get_files_info, get_files_info
-from functions.get_file_content import schema_get_file_content, get_file_content
-from functions.run_python_file import schema_run_python_file, run_python_file
-from functions.write_file import schema_write_file, write_file
-from google.genai import types
-from collections.abc import Callable
-from typing import TypeAlias
+import importlib
+from collections.abc import Callable, Iterator, Mapping
+from functools import cache
+from typing import TYPE_CHECKING, TypeAlias
+
+if TYPE_CHECKING:
+    from google.genai import types
 
 ToolFn: TypeAlias = Callable[...,str]
 
-TOOL_REGISTRY: list[tuple[types.FunctionDeclaration, ToolFn]] = [
-    (schema_get_files_info, get_files_info),
-    (schema_get_file_content, get_file_content),
-    (schema_write_file, write_file),
-    (schema_run_python_file, run_python_file),
-]
+# Package holding the tools: functions/<name>.py defines schema_<name> and <name>
+TOOL_PACKAGE: str = "functions"
+
+# Declaration order, which is also the order the model sees them in
+TOOL_NAMES: tuple[str, ...] = (
+    "get_files_info",
+    "get_file_content",
+    "read_files",
+    "write_file",
+    "write_files",
+    "apply_edit",
+    "run_python_file",
+    "run_tests",
+    "search_code",
+)
+
+# How each tool touches the working directory: (access kind, argument names holding paths)
+# "arg.key" names the key holding the path in each object of a list argument.
+# "read" tools never modify anything, "write" tools modify the paths they are given,
+# "exec" tools run arbitrary code so they can observe any path in the working directory.
+TOOL_ACCESS: dict[str, tuple[str, tuple[str, ...]]] = {
+    "get_files_info": ("read", ("directory",)),
+    "get_file_content": ("read", ("file_path",)),
+    "read_files": ("read", ("file_paths",)),
+    "write_file": ("write", ("file_path",)),
+    "write_files": ("write", ("files.file_path",)),
+    "apply_edit": ("write", ("file_path",)),
+    "run_python_file": ("exec", ()),
+    "run_tests": ("exec", ()),
+    "search_code": ("read", ("directory",)),
+}
 
-def declarations() -> list[types.FunctionDeclaration]:
+
+class ToolTable(Mapping[str, ToolFn]):
     '''
-    Returns the schemas for any written functions
+    {function_name: fn} that imports a tool's module the first time the tool is looked up
+    Membership and iteration only consult TOOL_NAMES, so checking a name never imports anything.
     '''
-    return [schema for schema, fn in TOOL_REGISTRY]
 
-def dispatch() -> dict[str, ToolFn]:
+    def __init__(self) -> None:
+        self._loaded: dict[str, ToolFn] = {}
+
+    def __getitem__(self, name: str) -> ToolFn:
+        fn = self._loaded.get(name)
+        if fn is None:
+            if name not in TOOL_ACCESS:
+                raise KeyError(name)
+            module = importlib.import_module(f"{TOOL_PACKAGE}.{name}")
+            fn = self._loaded[name] = getattr(module, name)
+        return fn
+
+    def __contains__(self, name: object) -> bool:
+        return name in TOOL_ACCESS
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(TOOL_NAMES)
+
+    def __len__(self) -> int:
+        return len(TOOL_NAMES)
+
+    def loaded(self) -> list[str]:
+        '''
+        Returns the names of the tools whose modules have been imported so far
+        '''
+        return [name for name in TOOL_NAMES if name in self._loaded]
+
+
+TOOLS = ToolTable()
+
+
+@cache
+def _declarations() -> tuple["types.FunctionDeclaration", ...]:
+    return tuple(getattr(importlib.import_module(f"{TOOL_PACKAGE}.{name}"), f"schema_{name}") for name in TOOL_NAMES)
+
+
+def declarations() -> list["types.FunctionDeclaration"]:
+    '''
+    Returns the schemas for any written functions, importing the tool modules on the first call
+    '''
+    return list(_declarations())
+
+def dispatch() -> Mapping[str, ToolFn]:
     '''
-    Returns a dictionary containing {function_name: fn}
+    Returns a mapping of {function_name: fn}, each tool imported the first time it is looked up
     '''
-    return {schema.name: fn for schema, fn in TOOL_REGISTRY}
\ No newline at end of file
+    return TOOLS
+
+def access(function_name: str) -> tuple[str, tuple[str, ...]]:
+    '''
+    Returns how a tool touches the working directory as (kind, path argument names)
+    Unknown tools are reported as read-only, they are rejected before anything runs.
+    '''
+    return TOOL_ACCESS.get(function_name, ("read", ()))
+
+
+def __getattr__(name: str):
+    # The old eager [(schema, fn), ...] list; building it imports every tool, so it only exists when asked for
+    if name == "TOOL_REGISTRY":
+        return [(schema, TOOLS[schema.name]) for schema in _declarations()]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,172 @@
+"""
+Structured spans for the agent loop: one per model call and one per tool call.
+Spans are written as JSONL to a trace file and aggregated per (kind, name) for an end-of-run summary.
+Code running inside a span (tools, caches, the client wrappers) attaches numbers to it with annotate()/count().
+"""
+
+import json
+import threading
+import time
+import uuid
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, TextIO
+
+_current_span: ContextVar[dict[str, Any] | None] = ContextVar("current_span", default=None)
+_current_session: ContextVar[str | None] = ContextVar("current_session", default=None)
+
+# Numeric span fields that are summed in the summary
+SUMMED_FIELDS: tuple[str, ...] = (
+    "prompt_tokens", "response_tokens", "bytes_in", "bytes_out",
+    "cache_hits", "cache_misses", "cpu_ms", "queued_ms", "retries",
+)
+
+
+class Tracer:
+    '''
+    Disabled until start() is given a path; while disabled span() costs almost nothing.
+    Only aggregates are kept in memory, individual spans go straight to the file.
+    '''
+
+    def __init__(self):
+        self.run_id = uuid.uuid4().hex[:12]
+        self._file: TextIO | None = None
+        self._lock = threading.Lock()
+        self._next_id = 0
+        self._totals: dict[tuple[str, str], dict[str, float]] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self._file is not None
+
+    def start(self, path: str) -> None:
+        '''
+        Starts writing spans to path (appending, so several runs can share a file)
+        '''
+        self._file = open(path, "a", encoding="utf-8")
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def reset(self) -> None:
+        '''
+        Starts a new run with a new id and no totals, e.g. for each request of a long-running server
+        '''
+        with self._lock:
+            self.run_id = uuid.uuid4().hex[:12]
+            self._next_id = 0
+            self._totals.clear()
+
+    @contextmanager
+    def span(self, kind: str, name: str, **attrs: Any) -> Iterator[dict[str, Any]]:
+        '''
+        Times a block and records it as a span
+        Returns: (yields) the span dict, which the caller may add fields to
+
+        :param kind: "model" or "tool"
+        :param name: Model or tool name
+        :param attrs: Extra fields recorded on the span
+        '''
+        if not self.enabled:
+            yield {}
+            return
+
+        with self._lock:
+            self._next_id += 1
+            span_id = self._next_id
+        parent = _current_span.get()
+        record: dict[str, Any] = {
+            "run": self.run_id, "session": _current_session.get(), "span": span_id,
+            "parent": parent["span"] if parent else None,
+            "kind": kind, "name": name, "start": time.time(), **attrs,
+        }
+        token = _current_span.set(record)
+        started = time.perf_counter()
+        try:
+            yield record
+        except BaseException as e:
+            record["error"] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            record["wall_ms"] = round((time.perf_counter() - started) * 1000, 3)
+            _current_span.reset(token)
+            self._emit(record)
+
+    def _emit(self, record: dict[str, Any]) -> None:
+        line = json.dumps(record, default=str)
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.write(line + "\n")
+            self._file.flush()
+            totals = self._totals.setdefault((record["kind"], record["name"]), {"count": 0, "wall_ms": 0.0, "max_ms": 0.0})
+            totals["count"] += 1
+            totals["wall_ms"] += record["wall_ms"]
+            totals["max_ms"] = max(totals["max_ms"], record["wall_ms"])
+            for field in SUMMED_FIELDS:
+                if isinstance(record.get(field), (int, float)):
+                    totals[field] = totals.get(field, 0) + record[field]
+
+    def summary(self) -> str:
+        '''
+        Returns: One line per (kind, name), slowest total first
+        '''
+        with self._lock:
+            rows = sorted(self._totals.items(), key=lambda item: item[1]["wall_ms"], reverse=True)
+        lines = [f"Trace summary (run {self.run_id}):"]
+        for (kind, name), totals in rows:
+            extras = ", ".join(f"{field}={totals[field]:g}" for field in SUMMED_FIELDS if field in totals)
+            lines.append(
+                f"  {kind:<5} {name:<20} n={totals['count']:<4} total={totals['wall_ms']:9.1f}ms "
+                f"mean={totals['wall_ms'] / totals['count']:8.1f}ms max={totals['max_ms']:8.1f}ms"
+                + (f"  {extras}" if extras else "")
+            )
+        return "\n".join(lines)
+
+
+def annotate(**values: Any) -> None:
+    '''
+    Sets fields on the span the caller is running inside, if any
+    '''
+    span = _current_span.get()
+    if span is not None:
+        span.update(values)
+
+
+def count(field: str, n: float = 1) -> None:
+    '''
+    Adds n to a numeric field of the current span, if any
+    '''
+    span = _current_span.get()
+    if span is not None:
+        span[field] = span.get(field, 0) + n
+
+
+def usage(usage_metadata: Any) -> None:
+    '''
+    Records the token counts from a response's usage_metadata on the current span
+    '''
+    if usage_metadata is not None:
+        annotate(
+            prompt_tokens=usage_metadata.prompt_token_count or 0,
+            response_tokens=usage_metadata.candidates_token_count or 0,
+        )
+
+
+@contextmanager
+def session(session_id: str) -> Iterator[None]:
+    '''
+    Tags every span opened inside the block (including in tasks and threads started from it) with a session id
+    '''
+    token = _current_session.set(session_id)
+    try:
+        yield
+    finally:
+        _current_session.reset(token)
+
+
+TRACER = Tracer()
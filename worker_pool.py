@@ -0,0 +1,167 @@
+"""
+Pool of warm Python interpreters for run_python_file.
+Each worker is a python_worker.py process that forks a fresh child per script, so repeated runs skip
+interpreter startup and the imports listed in config.WORKER_PRELOAD.
+"""
+
+import atexit
+import json
+import os
+import queue
+import subprocess
+import sys
+import tempfile
+import threading
+from pathlib import Path
+from typing import IO
+
+import config
+import output_capture
+
+WORKER_SCRIPT = Path(__file__).resolve().parent / "python_worker.py"
+
+
+def available() -> bool:
+    return hasattr(os, "fork")
+
+
+class _Worker:
+    def __init__(self, preload: tuple[str, ...]):
+        # Scripts run by the agent should never see our API key
+        self.process = subprocess.Popen(
+            [sys.executable, str(WORKER_SCRIPT), *preload],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            text=True,
+            env=output_capture.script_env(),
+        )
+
+    def alive(self) -> bool:
+        return self.process.poll() is None
+
+    def run(self, job: dict) -> dict:
+        stdin: IO[str] = self.process.stdin
+        stdout: IO[str] = self.process.stdout
+        stdin.write(json.dumps(job) + "\n")
+        stdin.flush()
+        reply = stdout.readline()
+        if not reply:
+            raise RuntimeError("Python worker exited unexpectedly")
+        return json.loads(reply)
+
+    def close(self) -> None:
+        try:
+            self.process.stdin.close()
+            self.process.wait(timeout=1)
+        except Exception:
+            self.process.kill()
+
+
+class WorkerPool:
+    '''
+    Fixed-size set of warm workers, checked out one job at a time so concurrent tool calls each get their own.
+    Workers are started lazily on first use and replaced if one dies.
+    '''
+
+    def __init__(self, size: int | None = None, preload: tuple[str, ...] = config.WORKER_PRELOAD):
+        # None follows config.PYTHON_WORKERS at the time of use
+        self.size = size
+        self.preload = preload
+        self._idle: queue.LifoQueue[_Worker] = queue.LifoQueue()
+        self._started = 0
+        self._lock = threading.Lock()
+        self._all: list[_Worker] = []
+
+    def warm(self) -> None:
+        '''
+        Starts every worker now instead of on first use
+        '''
+        started = []
+        with self._lock:
+            while self._started < self._capacity():
+                started.append(self._start())
+        for worker in started:
+            self._idle.put(worker)
+
+    def _capacity(self) -> int:
+        return max(1, config.PYTHON_WORKERS if self.size is None else self.size)
+
+    def _start(self) -> _Worker:
+        # Caller holds self._lock
+        self._started += 1
+        worker = _Worker(self.preload)
+        self._all.append(worker)
+        return worker
+
+    def _checkout(self) -> _Worker:
+        while True:
+            with self._lock:
+                if self._idle.empty() and self._started < self._capacity():
+                    return self._start()
+            worker = self._idle.get()
+            if worker.alive():
+                return worker
+            self._discard(worker)
+
+    def run(self, command: list[str], cwd: str, timeout: float,
+            stdout: output_capture.BoundedOutput, stderr: output_capture.BoundedOutput) -> tuple[int, bool, float]:
+        '''
+        Runs a script in a warm worker, streaming its output into bounded buffers
+        Returns: (exit code, timed out, CPU seconds used by the script)
+
+        :param command: [script path, *args], the script path must be absolute
+        :param cwd: Directory the script runs in
+        :param timeout: Seconds before the script is killed
+        :param stdout: Sink for standard output
+        :param stderr: Sink for standard error
+        '''
+        worker = self._checkout()
+        try:
+            with tempfile.TemporaryDirectory(prefix="agent-run-") as tmp:
+                fifos = [os.path.join(tmp, "stdout"), os.path.join(tmp, "stderr")]
+                for fifo in fifos:
+                    os.mkfifo(fifo, 0o600)
+                # Opening a FIFO for reading blocks until the script's child opens it for writing
+                pumps = [
+                    output_capture.start_pump(lambda path=fifo: open(path, "rb", buffering=0), sink)
+                    for fifo, sink in zip(fifos, (stdout, stderr))
+                ]
+                job = {"script": command[0], "args": command[1:], "cwd": cwd, "stdout": fifos[0], "stderr": fifos[1], "timeout": timeout}
+                try:
+                    reply = worker.run(job)
+                finally:
+                    _release_readers(fifos, pumps)
+                    output_capture.finish_pumps(pumps)
+        except Exception:
+            self._discard(worker)
+            raise
+        self._idle.put(worker)
+        return reply["returncode"], reply["timed_out"], reply["cpu_s"]
+
+    def _discard(self, worker: _Worker) -> None:
+        worker.close()
+        with self._lock:
+            self._all.remove(worker)
+            self._started -= 1
+
+    def close(self) -> None:
+        with self._lock:
+            workers, self._all = self._all, []
+            self._started = 0
+        for worker in workers:
+            worker.close()
+        self._idle = queue.LifoQueue()
+
+
+def _release_readers(fifos: list[str], pumps: list[threading.Thread]) -> None:
+    # If the child died before opening its FIFOs, open and close the write end so the readers see EOF
+    for fifo, pump in zip(fifos, pumps):
+        if pump.is_alive():
+            try:
+                os.close(os.open(fifo, os.O_WRONLY | os.O_NONBLOCK))
+            except OSError:
+                pass
+
+
+POOL = WorkerPool()
+atexit.register(POOL.close)
@@ -0,0 +1,459 @@
+"""
+Copy-on-write workspaces, so concurrent sessions can edit the same base tree without seeing each other's writes.
+A workspace starts as an empty directory and is filled lazily, just before a tool call touches a path: files are
+hardlinked from the base (no data copied), a listed directory gets only its immediate entries (its subdirectories
+are created empty), and only recursive listings and searches bring in a whole subtree. Setup therefore costs
+nothing and a session only pays for the paths it uses. Writes go through write_atomic's rename, which swaps the
+link for a private file, so the base is never written through a link. Code run by exec tools could write in
+place, so the first exec call gives the session a private copy (a reflink where the filesystem supports it) of
+every file. That one call costs O(tree), about as much as copying the base, since a script can open any path.
+diff() lists what the session changed and commit() applies it to the base.
+"""
+
+import contextlib
+import errno
+import filecmp
+import os
+import re
+import shutil
+import stat
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, NamedTuple
+
+import code_index
+import config
+import dir_index
+import read_cache
+import tool_registry
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Tools that read every file below their directory argument
+_SUBTREE_TOOLS = frozenset({"search_code"})
+
+# ioctl that makes a file share (copy-on-write) the blocks of another, on btrfs, XFS and similar
+_FICLONE = 0x40049409
+
+
+class Change(NamedTuple):
+    path: str
+    # "added", "modified" or "deleted"
+    kind: str
+
+
+class WorkspaceConflict(RuntimeError):
+    '''
+    Raised by commit when the base changed under paths the session also changed
+    '''
+
+    def __init__(self, paths: list[str]):
+        super().__init__(f"base changed since the workspace read it: {', '.join(paths)}")
+        self.paths = paths
+
+
+def _stamp(st: os.stat_result) -> tuple[int, int, int]:
+    return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+
+def _clone(source: Path, target: Path) -> None:
+    # Private copy of source at target. An existing target may be a hardlink to source, and opening it for writing
+    # would write through to the base, so it is replaced through a temp file and a rename.
+    if not os.path.lexists(target):
+        _copy(source, target)
+        return
+    fd, tmp = tempfile.mkstemp(dir=target.parent, prefix=f".{target.name}.", suffix=".tmp")
+    os.close(fd)
+    try:
+        _copy(source, Path(tmp))
+        os.replace(tmp, target)
+    except BaseException:
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(tmp)
+        raise
+
+
+# Turned off by the first failed reflink, the filesystem won't do any better on the next file
+_reflinks = fcntl is not None
+
+
+def _copy(source: Path, target: Path) -> None:
+    global _reflinks
+    if _reflinks:
+        try:
+            with open(source, "rb") as src, open(target, "wb") as dst:
+                fcntl.ioctl(dst.fileno(), _FICLONE, src.fileno())
+            shutil.copystat(source, target)
+            return
+        except OSError:
+            _reflinks = False
+    shutil.copy2(source, target)
+
+
+def _link_or_clone(source: Path, target: Path) -> bool:
+    '''
+    Returns: True if target is now a hardlink to source, False if it had to be copied (another filesystem)
+    '''
+    try:
+        os.link(source, target)
+        return True
+    except OSError as e:
+        if e.errno not in (errno.EXDEV, errno.EPERM, errno.EMLINK):
+            raise
+    _clone(source, target)
+    return False
+
+
+def _noticed(target: Path) -> None:
+    # Same bookkeeping as a write: the caches must see a path that just appeared in the workspace
+    read_cache.CACHE.invalidate(target)
+    dir_index.INDEX.update(target)
+    code_index.update(target)
+
+
+def _noticed_tree() -> None:
+    # After bringing in a whole directory, cheaper than noticing each file
+    read_cache.CACHE.invalidate_listings()
+    code_index.mark_stale()
+
+
+def _is_temp(name: str) -> bool:
+    # write_atomic's and commit's temp files, only ever seen mid-write
+    return name.startswith(".") and name.endswith((".tmp", ".commit"))
+
+
+class Workspace:
+    '''
+    One session's copy-on-write view of a base directory, rooted at self.root
+    Pass str(workspace.root) to the tools as their working directory.
+    '''
+
+    def __init__(self, base: Path, root: Path):
+        self.base = base
+        self.root = root
+        self._lock = threading.RLock()
+        # relative path -> stamp of the base file when it was brought in (to spot base changes on commit)
+        self._seen: dict[str, tuple[int, int, int]] = {}
+        # Files that still share their inode with the base
+        self._linked: set[str] = set()
+        # Private copies made by isolate(): relative path -> (size, mtime_ns) right after the copy
+        self._copies: dict[str, tuple[int, int]] = {}
+        # Directories whose immediate entries are in the workspace, and those whose whole subtree is
+        self._listed: set[str] = set()
+        self._complete: set[str] = set()
+        self.isolated = False
+
+    def __enter__(self) -> "Workspace":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    # --- filling the workspace ---
+
+    def _relative(self, path: str) -> str | None:
+        # None for paths outside the workspace, the tool itself will refuse them
+        target = Path(os.path.normpath(self.root / path))
+        if target == self.root:
+            return "."
+        if self.root not in target.parents:
+            return None
+        return target.relative_to(self.root).as_posix()
+
+    def _ensure_dirs(self, relative: str) -> None:
+        parts = relative.split("/")[:-1] if relative != "." else []
+        for depth in range(1, len(parts) + 1):
+            directory = self.root.joinpath(*parts[:depth])
+            if not directory.is_dir():
+                directory.mkdir(exist_ok=True)
+
+    def _bring_file(self, relative: str, source: Path, st: os.stat_result, notice: bool = True) -> None:
+        if relative in self._seen:
+            # Already brought in once; if it is gone now the session deleted it, and that sticks
+            return
+        target = self.root / relative
+        self._seen[relative] = _stamp(st)
+        if os.path.lexists(target):
+            return
+        if stat.S_ISLNK(st.st_mode):
+            os.symlink(os.readlink(source), target)
+        elif self.isolated:
+            _clone(source, target)
+            self._copies[relative] = self._copy_stamp(target)
+        elif _link_or_clone(source, target):
+            self._linked.add(relative)
+        if notice:
+            _noticed(target)
+
+    @staticmethod
+    def _copy_stamp(target: Path) -> tuple[int, int]:
+        st = os.stat(target)
+        return (st.st_size, st.st_mtime_ns)
+
+    def materialize(self, path: str = ".", depth: int | None = 1) -> None:
+        '''
+        Brings a base path into the workspace: a file is linked, a directory gets its entries down to depth
+        levels (directories below that are created empty), and a path the base doesn't have only gets its parent
+        directories (so it can be written).
+
+        :param path: Path relative to the workspace root
+        :param depth: Levels of a directory to bring in, 1 for its immediate entries, None for its whole subtree
+        '''
+        relative = self._relative(path)
+        if relative is None:
+            return
+        with self._lock:
+            if relative in self._complete or any(parent in self._complete for parent in _ancestors(relative)):
+                return
+            self._ensure_dirs(relative)
+            source = self.base / relative
+            try:
+                st = os.lstat(source)
+            except OSError:
+                return
+            if not stat.S_ISDIR(st.st_mode):
+                self._bring_file(relative, source, st)
+                return
+            self._bring_tree(relative, depth)
+
+    def _bring_tree(self, top: str, depth: int | None = None) -> None:
+        stack = [(top, 1)]
+        brought = False
+        while stack:
+            relative, level = stack.pop()
+            if relative in self._complete:
+                continue
+            deeper = depth is None or level < depth
+            if relative in self._listed and not deeper:
+                continue
+            (self.root / relative).mkdir(parents=True, exist_ok=True)
+            prefix = "" if relative == "." else relative + "/"
+            with os.scandir(self.base / relative) as entries:
+                for entry in entries:
+                    if entry.name in config.WORKSPACE_IGNORE:
+                        continue
+                    name = prefix + entry.name
+                    if entry.is_dir(follow_symlinks=False):
+                        (self.root / name).mkdir(exist_ok=True)
+                        if deeper:
+                            stack.append((name, level + 1))
+                    else:
+                        self._bring_file(name, Path(entry.path), entry.stat(follow_symlinks=False), False)
+            brought = True
+            self._listed.add(relative)
+            if depth is None:
+                self._complete.add(relative)
+        if brought:
+            _noticed_tree()
+
+    def isolate(self) -> None:
+        '''
+        Gives the session a private copy of every base file, replacing the hardlinks. Needed before running code,
+        which may write a file in place instead of replacing it, and could open any path. The first call copies
+        the whole base tree (files the session already made private excepted), so it costs about a copytree
+        without reflinks; later calls only redo files a commit linked to the base again.
+        '''
+        with self._lock:
+            self.isolated = True
+            self._bring_tree(".")
+            for relative in sorted(self._linked):
+                target = self.root / relative
+                source = self.base / relative
+                with contextlib.suppress(FileNotFoundError):
+                    if os.stat(target).st_ino == os.stat(source).st_ino:
+                        _clone(source, target)
+                        self._copies[relative] = self._copy_stamp(target)
+            self._linked.clear()
+
+    def prepare(self, function_name: str, args: dict[str, Any]) -> None:
+        '''
+        Brings in what one tool call is about to touch, from its TOOL_ACCESS entry
+
+        :param function_name: Tool being called
+        :param args: Its arguments, as the model sent them
+        '''
+        kind, path_args = tool_registry.access(function_name)
+        if kind == "exec":
+            self.isolate()
+            return
+        depth = _depth(function_name, args)
+        paths = []
+        for name in path_args:
+            arg, _, key = name.partition(".")
+            value = args.get(arg, ".")
+            values = value if isinstance(value, list) else [value]
+            for item in values:
+                item = item.get(key) if key and isinstance(item, dict) else item
+                if isinstance(item, str):
+                    paths.append(item)
+        for path in paths or ["."]:
+            self.materialize(path, depth)
+
+    # --- diff and commit ---
+
+    def _files(self) -> dict[str, os.stat_result]:
+        files = {}
+        for directory, dirs, names in os.walk(self.root):
+            dirs[:] = [d for d in dirs if d not in config.WORKSPACE_IGNORE]
+            prefix = Path(directory).relative_to(self.root).as_posix()
+            prefix = "" if prefix == "." else prefix + "/"
+            for name in names:
+                files[prefix + name] = os.lstat(os.path.join(directory, name))
+        return files
+
+    def diff(self) -> list[Change]:
+        '''
+        Returns: What the session changed relative to the base, sorted by path. Costs a walk of the files the
+        session brought in; only files that are neither still linked nor untouched copies are compared.
+        '''
+        with self._lock:
+            files = self._files()
+            changes = []
+            for relative, st in files.items():
+                if stat.S_ISLNK(st.st_mode) or _is_temp(relative.rsplit("/", 1)[-1]):
+                    continue
+                source = self.base / relative
+                try:
+                    base_st = os.stat(source)
+                except OSError:
+                    changes.append(Change(relative, "added"))
+                    continue
+                if base_st.st_ino == st.st_ino and base_st.st_dev == st.st_dev:
+                    continue
+                if self._copies.get(relative) == (st.st_size, st.st_mtime_ns):
+                    continue
+                if not filecmp.cmp(source, self.root / relative, shallow=False):
+                    changes.append(Change(relative, "modified"))
+            for relative in self._seen:
+                if relative not in files and os.path.lexists(self.base / relative):
+                    changes.append(Change(relative, "deleted"))
+            return sorted(changes)
+
+    def commit(self, force: bool = False) -> list[Change]:
+        '''
+        Applies the session's changes to the base. A changed file is linked into the base with a rename, so
+        readers of the base see the old or the new file, never half of one.
+        Returns: The changes applied
+        Raises: WorkspaceConflict (and applies nothing) if the base changed under any of them, unless force
+
+        :param force: Overwrite base changes made since the session read the file
+        '''
+        with self._lock:
+            changes = self.diff()
+            if not force:
+                conflicts = [c.path for c in changes if self._base_moved(c.path)]
+                if conflicts:
+                    raise WorkspaceConflict(conflicts)
+            for change in changes:
+                source = self.root / change.path
+                target = self.base / change.path
+                if change.kind == "deleted":
+                    with contextlib.suppress(FileNotFoundError):
+                        os.unlink(target)
+                    self._seen.pop(change.path, None)
+                    _noticed(target)
+                    continue
+                target.parent.mkdir(parents=True, exist_ok=True)
+                tmp = target.parent / f".{target.name}.{os.getpid()}.{threading.get_ident()}.commit"
+                if _link_or_clone(source, tmp):
+                    self._linked.add(change.path)
+                os.replace(tmp, target)
+                self._copies.pop(change.path, None)
+                self._seen[change.path] = _stamp(os.stat(target))
+                _noticed(target)
+            return changes
+
+    def _base_moved(self, relative: str) -> bool:
+        try:
+            current = _stamp(os.stat(self.base / relative))
+        except OSError:
+            current = None
+        return current != self._seen.get(relative)
+
+    def export(self, target: Path) -> None:
+        '''
+        Moves the whole workspace, as private files, to target (which must not exist); the workspace is closed
+        '''
+        with self._lock:
+            self.isolate()
+            with _OPEN_LOCK:
+                _OPEN.pop(str(self.root), None)
+            code_index.forget(self.root)
+            shutil.move(str(self.root), target)
+
+    def close(self) -> None:
+        '''
+        Deletes the workspace directory, and its search index if search_code ran in it. Changes that were not
+        committed are lost.
+        '''
+        with _OPEN_LOCK:
+            _OPEN.pop(str(self.root), None)
+        code_index.forget(self.root)
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def stats(self) -> str:
+        with self._lock:
+            return (f"Workspace {self.root}: {len(self._seen)} files brought in, {len(self._linked)} linked, "
+                    f"{len(self._copies)} copied")
+
+
+def _depth(function_name: str, args: dict[str, Any]) -> int | None:
+    # Levels of a directory argument the call can see: a listing only its entries, a recursive listing down to
+    # its max_depth, a search everything below it
+    if function_name in _SUBTREE_TOOLS:
+        return None
+    if not args.get("recursive"):
+        return 1
+    try:
+        return max(int(args["max_depth"]), 1)
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def _ancestors(relative: str) -> list[str]:
+    parts = relative.split("/")
+    return ["."] + ["/".join(parts[:depth]) for depth in range(1, len(parts))]
+
+
+_OPEN: dict[str, Workspace] = {}
+_OPEN_LOCK = threading.Lock()
+
+
+def open_workspace(base: str = config.WORKING_DIR, session_id: str = "session") -> Workspace:
+    '''
+    Returns: A new, empty workspace over base, in config.WORKSPACE_DIR (or .workspaces next to base,
+    which keeps it on the base's filesystem so files can be hardlinked)
+
+    :param base: Directory the session works on
+    :param session_id: Part of the workspace directory's name
+    '''
+    base_path = Path(base).resolve()
+    parent = Path(config.WORKSPACE_DIR) if config.WORKSPACE_DIR else base_path.parent / ".workspaces"
+    parent.mkdir(parents=True, exist_ok=True)
+    name = re.sub(r"[^\w.-]", "_", f"{base_path.name}-{session_id}")
+    root = Path(tempfile.mkdtemp(prefix=f"{name}-", dir=parent)).resolve()
+    workspace = Workspace(base_path, root)
+    with _OPEN_LOCK:
+        _OPEN[str(root)] = workspace
+    return workspace
+
+
+def prepare(working_directory: str, function_name: str, args: dict[str, Any]) -> None:
+    '''
+    Brings in what a tool call is about to touch when working_directory is an open workspace; a plain
+    directory is left alone
+
+    :param working_directory: The working directory the tool is given
+    :param function_name: Tool being called
+    :param args: Its arguments, as the model sent them
+    '''
+    if not _OPEN:
+        return
+    with _OPEN_LOCK:
+        workspace = _OPEN.get(working_directory) or _OPEN.get(str(Path(working_directory).resolve()))
+    if workspace is not None:
+        workspace.prepare(function_name, args)